@@ -0,0 +1,69 @@
+"""Measures end-to-end client throughput against the protocol emulators
+
+Streams unpaced from a local ``JSONServer`` over TCP and a ``RegServer``
+over TCP and a pty, for each service, and reports the rate frames are
+received and decoded at. With corruption set, the register protocol
+streams also exercise the recovery from corrupt frames.
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from acconeer_utils.clients import SocketClient, UARTClient, configs
+from acconeer_utils.clients.emulator.json_server import JSONServer
+from acconeer_utils.clients.emulator.reg_server import RegServer
+
+
+CONFIG_CLASSES = [
+    configs.PowerBinServiceConfig,
+    configs.EnvelopeServiceConfig,
+    configs.IQServiceConfig,
+    configs.SparseServiceConfig,
+]
+
+
+def measure(client, config, num_frames):
+    client.start_streaming(config)
+    client.get_next()
+
+    t0 = perf_counter()
+    for _ in range(num_frames):
+        client.get_next()
+    dt = perf_counter() - t0
+
+    client.disconnect()
+    return num_frames / dt
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-n", "--num-frames", type=int, default=2000)
+    parser.add_argument("-d", "--num-depths", type=int, default=None)
+    parser.add_argument("-c", "--corruption", type=float, default=0.0)
+    args = parser.parse_args()
+
+    kwargs = dict(paced=False, num_depths=args.num_depths, seed=0)
+
+    print("{:>10} {:>10} {:>12}".format("service", "link", "frames/s"))
+    for config_class in CONFIG_CLASSES:
+        config = config_class()
+
+        with JSONServer(**kwargs) as server:
+            host, port = server.listen()
+            rate = measure(SocketClient(host, socket_port=port), config, args.num_frames)
+        print("{:>10} {:>10} {:>12.0f}".format(config.mode, "json tcp", rate))
+
+        for link in ["reg tcp", "reg pty"]:
+            with RegServer(corruption=args.corruption, **kwargs) as server:
+                if link == "reg tcp":
+                    host, port = server.listen()
+                    client = UARTClient(host, socket_port=port)
+                else:
+                    client = UARTClient(server.open_pty())
+
+                rate = measure(client, config, args.num_frames)
+            print("{:>10} {:>10} {:>12.0f}".format(config.mode, link, rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Measures the Python-side cost of libft4222 SPI reads and writes.
+
+The library functions are replaced by stubs that only report the transfer
+as complete, so what is left is the buffer handling around each call. The
+legacy versions allocate a fresh ctypes buffer per call, and reads copy it
+into a new bytearray which is then copied into the frame.
+"""
+
+from argparse import ArgumentParser
+import ctypes
+from timeit import repeat
+
+from acconeer_utils import libft4222
+
+
+def stub(*args):
+    args[-2]._obj.value = args[-3]
+    return libft4222.Status.OK.value
+
+
+def legacy_read(dev, num_bytes):
+    read_buffer = (ctypes.c_uint8 * num_bytes)()
+    size_transferred = ctypes.c_uint16()
+    status = libft4222.funs["FT4222_SPIMaster_SingleRead"](
+            dev.handle, read_buffer, num_bytes, ctypes.byref(size_transferred), True)
+    assert size_transferred.value == num_bytes
+    libft4222.check_status(status)
+    return bytearray(read_buffer)
+
+
+def legacy_read_write(dev, write_data):
+    num_bytes = len(write_data)
+    read_buffer = (ctypes.c_uint8 * num_bytes)()
+    write_buffer = (ctypes.c_uint8 * num_bytes)(*write_data)
+    size_transferred = ctypes.c_uint16()
+    status = libft4222.funs["FT4222_SPIMaster_SingleReadWrite"](
+            dev.handle, read_buffer, write_buffer, num_bytes, ctypes.byref(size_transferred), True)
+    assert size_transferred.value == num_bytes
+    libft4222.check_status(status)
+    return bytearray(read_buffer)
+
+
+def legacy_write(dev, data):
+    num_bytes = len(data)
+    write_buffer = (ctypes.c_uint8 * num_bytes)(*data)
+    size_transferred = ctypes.c_uint16()
+    status = libft4222.funs["FT4222_SPIMaster_SingleWrite"](
+            dev.handle, write_buffer, num_bytes, ctypes.byref(size_transferred), True)
+    assert size_transferred.value == num_bytes
+    libft4222.check_status(status)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    libft4222.funs = {
+        "FT4222_SPIMaster_SingleRead": stub,
+        "FT4222_SPIMaster_SingleWrite": stub,
+        "FT4222_SPIMaster_SingleReadWrite": stub,
+    }
+    dev = libft4222.Device()
+    frame = memoryview(bytearray(2**16))
+
+    def legacy_frame_read(n):
+        frame[:n] = legacy_read(dev, n)
+
+    cases = []
+    for n in [4, 2000, 16000]:
+        cases.append((
+            "read {} B into frame".format(n),
+            lambda n=n: legacy_frame_read(n),
+            lambda n=n: dev.spi_master_single_read_into(frame[:n]),
+            args.number,
+        ))
+
+    header = bytearray([0xF8, 3, 0, 0])
+    cases.append((
+        "write 4 B header",
+        lambda: legacy_write(dev, header),
+        lambda: dev.spi_master_single_write(header),
+        args.number,
+    ))
+    data = bytes(2000)
+    cases.append((
+        "write 2000 B bytes",
+        lambda: legacy_write(dev, data),
+        lambda: dev.spi_master_single_write(data),
+        args.number // 20,
+    ))
+
+    # a batched frame: two register reads and a 2000 B buffer read
+    tx = bytearray(2 * 8 + 4 + 2000)
+    rx = memoryview(bytearray(len(tx)))
+    cases.append((
+        "read_write 2020 B",
+        lambda: legacy_read_write(dev, tx),
+        lambda: dev.spi_master_single_read_write_into(tx, rx),
+        args.number // 20,
+    ))
+
+    print("{:>22} {:>12} {:>12}".format("", "legacy (us)", "now (us)"))
+    for name, legacy_fun, fun, number in cases:
+        times = []
+        for f in [legacy_fun, fun]:
+            dt = min(repeat(f, number=number, repeat=5))
+            times.append(dt / number * 1e6)
+
+        print("{:>22} {:>12.2f} {:>12.2f}".format(name, *times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measures the per-frame cost of decoding register protocol result info.
+
+A stream data segment with the sweep info registers of each mode (or all
+of its registers, with --all-regs) is unpacked and decoded the way
+``RegClient._recv_stream_data`` does it. For comparison, the same segment
+is also decoded the way it was done before the precompiled decoder tables,
+with one ``UnpackedRegVal`` per register and a linear search through dict
+value maps.
+"""
+
+from argparse import ArgumentParser
+from timeit import repeat
+
+from acconeer_utils.clients.reg import protocol, utils
+
+
+MODES = ["envelope", "iq", "sparse"]
+
+
+def get_regs(mode, all_regs):
+    if all_regs:
+        return [reg for reg in utils.get_regs_for_mode(mode) if reg.type in ["u", "i"]]
+
+    return utils.get_sweep_info_regs(mode)
+
+
+def make_segment(regs):
+    result_info = bytearray()
+    for reg in regs:
+        x = next(iter(reg.val_map.values())) if isinstance(reg.val_map, dict) else 0
+        result_info.append(reg.addr)
+        result_info.extend(x.to_bytes(protocol.REG_SIZE, protocol.BO))
+
+    buffer = bytes(2 * 1000)
+
+    segment = bytearray([protocol.STREAM_RESULT_INFO])
+    segment.extend(len(result_info).to_bytes(protocol.LEN_FIELD_SIZE, protocol.BO))
+    segment.extend(result_info)
+    segment.append(protocol.STREAM_BUFFER)
+    segment.extend(len(buffer).to_bytes(protocol.LEN_FIELD_SIZE, protocol.BO))
+    segment.extend(buffer)
+    return segment
+
+
+def decode(segment, mode):
+    packet = protocol.unpack_stream_data_segment(segment)
+    info, _ = protocol.decode_result_info(packet.result_info, mode)
+    return info
+
+
+def legacy_decode(segment, mode):
+    result_info = None
+    rest = segment
+    while len(rest) > 0:
+        part_type = rest[0]
+        data_start_index = 1+protocol.LEN_FIELD_SIZE
+        part_len = int.from_bytes(rest[1:data_start_index], protocol.BO)
+        data_end_index = data_start_index + part_len
+        part_data = rest[data_start_index:data_end_index]
+        rest = rest[data_end_index:]
+
+        if part_type == protocol.STREAM_RESULT_INFO:
+            s = protocol.ADDR_SIZE + protocol.REG_SIZE
+            result_info = []
+            for i in range(part_len // s):
+                addr = part_data[s*i]
+                enc_val = part_data[s*i+1:s*(i+1)]
+                result_info.append(protocol.UnpackedRegVal(addr, enc_val))
+
+    info = {}
+    for addr, enc_val in result_info:
+        reg = protocol.get_reg(addr, mode)
+        x = int.from_bytes(enc_val, protocol.BO, signed=(reg.type == "i"))
+        if isinstance(reg.val_map, protocol.EncFuns):
+            val = reg.val_map.decode_fun(x)
+        elif isinstance(reg.val_map, dict):
+            val = next(k for k, v in reg.val_map.items() if v == x)
+        else:
+            val = bool(x) if reg.type == "b" else x
+        info[reg.name] = val
+
+    return info
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    parser.add_argument("--all-regs", action="store_true", help="decode all registers of a mode")
+    args = parser.parse_args()
+
+    print("{:>10} {:>6} {:>12} {:>12}".format("mode", "regs", "legacy (us)", "now (us)"))
+    for mode in MODES:
+        regs = get_regs(mode, args.all_regs)
+        segment = make_segment(regs)
+        assert decode(segment, mode) == legacy_decode(segment, mode)
+
+        times = []
+        for fun in [legacy_decode, decode]:
+            dt = min(repeat(lambda: fun(segment, mode), number=args.number, repeat=5))
+            times.append(dt / args.number * 1e6)
+
+        print("{:>10} {:>6} {:>12.2f} {:>12.2f}".format(mode, len(regs), *times))
+
+
+if __name__ == "__main__":
+    main()
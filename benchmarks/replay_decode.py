@@ -0,0 +1,53 @@
+"""Measures how fast a capture file can be decoded
+
+Replays every session in a capture written by ``RecordingClient`` as fast as
+possible, once per output dtype, and reports the decode rate. With no
+hardware attached, this profiles the decoders against real traffic.
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+from acconeer_utils.clients import ReplayClient
+from acconeer_utils.clients.base import OUTPUT_DTYPES, ClientError
+
+
+def measure(path, output_dtype):
+    client = ReplayClient(path, output_dtype=output_dtype)
+    client.connect()
+    num_sessions = len(client.recorded_configs)
+
+    num_frames = 0
+    dt = 0
+    for _ in range(num_sessions):
+        client.setup_session()
+        client.start_streaming()
+
+        t0 = perf_counter()
+        while True:
+            try:
+                client.get_next()
+            except ClientError:
+                break
+            num_frames += 1
+
+        dt += perf_counter() - t0
+        client.stop_streaming()
+
+    client.disconnect()
+    return num_frames, dt
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("path", help="capture file")
+    args = parser.parse_args()
+
+    print("{:>8} {:>8} {:>12}".format("dtype", "frames", "frames/s"))
+    for output_dtype in OUTPUT_DTYPES:
+        num_frames, dt = measure(args.path, output_dtype)
+        print("{:>8} {:>8} {:>12.0f}".format(output_dtype, num_frames, num_frames / dt))
+
+
+if __name__ == "__main__":
+    main()
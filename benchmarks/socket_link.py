@@ -0,0 +1,77 @@
+"""Measures SocketLink receive throughput for JSON-framed payloads.
+
+A local TCP server streams frames in the ``json+binary`` format (a JSON
+header line followed by a binary payload) and the link is drained the same
+way as ``JSONClient._recv_frame`` does it, followed by ``np.frombuffer``.
+"""
+
+from argparse import ArgumentParser
+import json
+import socket
+import threading
+from time import time
+
+import numpy as np
+
+from acconeer_utils.clients import links
+
+
+FRAME_SIZES = [4 * 2**10, 64 * 2**10, 2**20]
+TOTAL_BYTES = 256 * 2**20
+
+
+def serve(server_sock, payload_size, num_frames):
+    conn, _ = server_sock.accept()
+    header = json.dumps({"status": "ok", "payload_size": payload_size}) + "\n"
+    frame = header.encode("ascii") + bytes(payload_size)
+    try:
+        for _ in range(num_frames):
+            conn.sendall(frame)
+    finally:
+        conn.close()
+
+
+def run(payload_size, num_frames):
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_sock.bind(("127.0.0.1", 0))
+    server_sock.listen(1)
+    port = server_sock.getsockname()[1]
+
+    class Link(links.SocketLink):
+        _PORT = port
+
+    thread = threading.Thread(target=serve, args=(server_sock, payload_size, num_frames))
+    thread.start()
+
+    link = Link("127.0.0.1")
+    link.connect()
+
+    t0 = time()
+    for _ in range(num_frames):
+        header = json.loads(str(link.recv_until(b"\n"), "ascii"))
+        payload = link.recv(header["payload_size"])
+        np.frombuffer(payload, dtype=">u2")
+    dt = time() - t0
+
+    thread.join()
+    server_sock.close()
+
+    return dt
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--total-mb", type=int, default=TOTAL_BYTES // 2**20)
+    args = parser.parse_args()
+
+    print("{:>10} {:>10} {:>12} {:>10}".format("frame", "frames", "frames/s", "MB/s"))
+    for size in FRAME_SIZES:
+        num_frames = max(1, args.total_mb * 2**20 // size)
+        dt = run(size, num_frames)
+        mb = num_frames * size / 2**20
+        print("{:>10} {:>10} {:>12.0f} {:>10.1f}".format(
+            size, num_frames, num_frames / dt, mb / dt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measures the CPU use of the SPI data ready wait modes.
+
+``SPICommProcess.get_next`` is run in this process against the modelled
+device of ``spi_frame_rate``, which produces a frame once per sweep period.
+Transfers are slept rather than busy-waited, as a blocking USB transfer
+would be. For each wait mode, the CPU time of the process relative to wall
+time is reported, with the number of status register reads per frame and
+the mean time from a frame being ready until it is detected.
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter, process_time
+
+from acconeer_utils.clients import links
+from acconeer_utils.clients.reg import client as reg_client
+
+from spi_frame_rate import ModelledDevice
+
+
+def measure(data_ready_wait, sweep_rate, args):
+    frame_pool = links.FramePool(2, reg_client.SPI_MAX_FRAME_SIZE)
+    proc = reg_client.SPICommProcess(None, None, frame_pool, args.batch, data_ready_wait)
+    proc.dev = proc.gpio_dev = dev = ModelledDevice(
+        "envelope",
+        args.buffer_length,
+        args.turnaround * 1e-6,
+        args.spi_clock * 1e6,
+        spin=False,
+        sweep_period=1/sweep_rate,
+    )
+    proc.set_mode_and_rate("envelope", sweep_rate)
+    proc.start_streaming()
+
+    num_frames = max(int(args.duration * sweep_rate), 1)
+    dev.num_status_reads = 0
+
+    cpu_t0 = process_time()
+    t0 = perf_counter()
+    for _ in range(num_frames):
+        proc.get_next()
+        with frame_pool.get():
+            pass
+
+    cpu = (process_time() - cpu_t0) / (perf_counter() - t0)
+    latency = sum(dev.latencies) / len(dev.latencies)
+    return cpu, dev.num_status_reads / num_frames, latency
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--sweep-rates", type=float, nargs="+", default=[30, 100, 200])
+    parser.add_argument("--buffer-length", type=int, default=2 * 1000, help="bytes per frame")
+    parser.add_argument("--turnaround", type=float, default=250, help="us per transfer")
+    parser.add_argument("--spi-clock", type=float, default=24, help="SPI clock in MHz")
+    parser.add_argument("--batch", action="store_true", help="use batched transactions")
+    parser.add_argument("-d", "--duration", type=float, default=2, help="seconds per run")
+    args = parser.parse_args()
+
+    reg_client.SPI_MAIN_CTRL_SLEEP = 0
+
+    print("{:>6} {:>10} {:>6} {:>14} {:>14}".format(
+        "rate", "wait", "cpu %", "status reads", "latency (ms)"))
+    for sweep_rate in args.sweep_rates:
+        for data_ready_wait in reg_client.SPI_DATA_READY_WAITS:
+            cpu, reads, latency = measure(data_ready_wait, sweep_rate, args)
+            print("{:>6.0f} {:>10} {:>6.1f} {:>14.1f} {:>14.3f}".format(
+                sweep_rate, data_ready_wait, 100 * cpu, reads, 1e3 * latency))
+
+
+if __name__ == "__main__":
+    main()
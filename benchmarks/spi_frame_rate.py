@@ -0,0 +1,164 @@
+"""Measures the frame rate the SPI streaming loop can sustain.
+
+``SPICommProcess.get_next`` is run in this process against a modelled
+FT4222 device, with and without batched transactions. Every SPI transfer
+costs a fixed USB turnaround plus the time to clock its bytes at the SPI
+clock, which is busy-waited so that the Python overhead of the loop is
+included in the result. The module always has data ready, so the result is
+the upper bound set by the host side.
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter, sleep
+
+from acconeer_utils.clients import links
+from acconeer_utils.clients.reg import client as reg_client
+from acconeer_utils.clients.reg import protocol
+
+
+class ModelledDevice:
+    """Modelled FT4222 with a module behind it
+
+    Transfers are busy-waited with ``spin``, and slept otherwise, like a
+    blocking USB transfer would. With a sweep period, a frame becomes ready
+    one period after the previous one and raises the interrupt input.
+    """
+
+    def __init__(self, mode, buffer_length, turnaround, spi_clock, spin=True, sweep_period=None):
+        self.mode = mode
+        self.buffer_length = buffer_length
+        self.turnaround = turnaround
+        self.byte_time = 8 / spi_clock
+        self.spin = spin
+        self.sweep_period = sweep_period
+        self.num_transfers = 0
+        self.num_status_reads = 0
+        self.latencies = []
+        self._pending = None
+        self._ready_t = 0
+        self._seen = False
+        self._triggered = False
+
+    def gpio_get_trigger_status(self, port):
+        return int(perf_counter() >= self._ready_t and not self._triggered)
+
+    def gpio_read_trigger_queue(self, port, max_num_events):
+        self._triggered = True
+        return []
+
+    def spi_master_single_write(self, data, is_end_transaction=True):
+        self._transfer(data)
+
+    def spi_master_single_read_into(self, buf, is_end_transaction=True):
+        buf[:] = self._transfer(bytes(len(buf)))
+
+    def spi_master_single_read_write_into(self, write_data, buf, is_end_transaction=True):
+        buf[:] = self._transfer(write_data)
+
+    def _transfer(self, tx):
+        t_end = perf_counter() + self.turnaround + len(tx) * self.byte_time
+        self.num_transfers += 1
+
+        rx = bytearray(len(tx))
+        i = 0
+        while i < len(tx):
+            if self._pending is None:
+                self._pending = (tx[i], tx[i+1])
+                i += 4
+                continue
+
+            request, addr = self._pending
+            self._pending = None
+            if request == protocol.BUF_READ_REQUEST:
+                i = len(tx)
+            elif request == protocol.REG_READ_REQUEST:
+                name = protocol.get_reg(addr, self.mode).name
+                if name == "status":
+                    val = self._read_status()
+                elif name == "output_data_buffer_length":
+                    val = self.buffer_length
+                else:
+                    val = 0
+                rx[i:i+protocol.REG_SIZE] = protocol.encode_reg_val(name, val, self.mode)
+                i += protocol.REG_SIZE
+            else:
+                self._write_reg(addr, tx[i:i+protocol.REG_SIZE])
+                i += protocol.REG_SIZE
+
+        if self.spin:
+            while perf_counter() < t_end:
+                pass
+        else:
+            sleep(max(t_end - perf_counter(), 0))
+
+        return rx
+
+    def _read_status(self):
+        self.num_status_reads += 1
+        now = perf_counter()
+        if now < self._ready_t:
+            return 0
+
+        if not self._seen:
+            self._seen = True
+            self.latencies.append(now - self._ready_t)
+
+        return protocol.STATUS_DATA_READY_MASK
+
+    def _write_reg(self, addr, enc_val):
+        if self.sweep_period is None or protocol.get_reg(addr).name != "main_control":
+            return
+
+        main_control = protocol.decode_reg_val("main_control", enc_val)
+        if main_control == "activate":
+            self._ready_t = perf_counter() + self.sweep_period
+        elif main_control == "clear_status" and perf_counter() >= self._ready_t:
+            self._ready_t += self.sweep_period
+            self._seen = False
+            self._triggered = False
+
+
+def measure(batch_transactions, args):
+    frame_pool = links.FramePool(2, reg_client.SPI_MAX_FRAME_SIZE)
+    proc = reg_client.SPICommProcess(None, None, frame_pool, batch_transactions)
+    proc.dev = dev = ModelledDevice(
+        args.mode,
+        args.buffer_length,
+        args.turnaround * 1e-6,
+        args.spi_clock * 1e6,
+    )
+    proc.set_mode_and_rate(args.mode, None)
+    proc.start_streaming()
+
+    dev.num_transfers = 0
+    t0 = perf_counter()
+    for _ in range(args.num_frames):
+        proc.get_next()
+        with frame_pool.get():
+            pass
+
+    dt = perf_counter() - t0
+    return args.num_frames / dt, dev.num_transfers / args.num_frames
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--mode", default="envelope", choices=["envelope", "iq", "sparse"])
+    parser.add_argument("--buffer-length", type=int, default=2 * 1000, help="bytes per frame")
+    parser.add_argument("--turnaround", type=float, default=250, help="us per transfer")
+    parser.add_argument("--spi-clock", type=float, default=24, help="SPI clock in MHz")
+    parser.add_argument("-n", "--num-frames", type=int, default=500)
+    args = parser.parse_args()
+
+    reg_client.SPI_MAIN_CTRL_SLEEP = 0
+
+    print("{:>8} {:>16} {:>10} {:>8}".format("batched", "transfers/frame", "frames/s", "MB/s"))
+    for batch_transactions in [False, True]:
+        rate, transfers = measure(batch_transactions, args)
+        mbps = rate * args.buffer_length / 1e6
+        print("{:>8} {:>16.1f} {:>10.0f} {:>8.2f}".format(
+            str(batch_transactions), transfers, rate, mbps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""Throughput benchmark suite for the clients
+
+Streams every combination of service mode, range length, sweep rate,
+client and decode path, and measures the rate frames are returned at, the
+raw sample data rate, the p50 and p99 ``get_next`` latency, the CPU usage of
+this process and the peak memory allocated per frame. The clients are:
+
+* ``mock`` - the mock client with a frame bank, so generation is nearly free
+* ``replay`` - a replay of frames recorded from the register protocol
+  emulator, which isolates the decode path
+* ``json`` - the JSON client against a local ``JSONServer``
+* ``reg`` - the register protocol client against a local ``RegServer``
+* ``device`` - a connected device, given with ``-s``, ``-u`` or ``--spi``
+
+A decode path is an output dtype, streamed with ``get_next``, optionally
+suffixed with ``-batch`` to stream with ``get_next_batch`` instead.
+
+By default frames are requested as fast as the client can return them, so
+the sweep rate only changes the config. With ``--paced``, the mock and
+emulator clients return frames at the sweep rate, like a device would, and
+the CPU usage and latency show the cost of keeping up.
+
+Results are written to a JSON file with ``run``, and two result files are
+compared with ``compare``, which exits with a non-zero status if any case
+regressed by more than the threshold::
+
+    python benchmarks/throughput.py run -o before.json
+    python benchmarks/throughput.py run -o after.json
+    python benchmarks/throughput.py compare before.json after.json
+"""
+
+from argparse import ArgumentParser
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+from time import perf_counter, process_time, strftime
+import tracemalloc
+
+import numpy as np
+
+from acconeer_utils import SDK_VERSION
+from acconeer_utils.clients import (
+    MockClient, RecordingClient, ReplayClient, SocketClient, SPIClient, UARTClient, configs)
+from acconeer_utils.clients.emulator.json_server import JSONServer
+from acconeer_utils.clients.emulator.reg_server import RegServer
+
+
+CONFIG_CLASSES = {
+    "power_bin": configs.PowerBinServiceConfig,
+    "envelope": configs.EnvelopeServiceConfig,
+    "iq": configs.IQServiceConfig,
+    "sparse": configs.SparseServiceConfig,
+}
+
+RAW_SAMPLE_BITS = {
+    "power_bin": 16,
+    "envelope": 16,
+    "iq": 32,
+    "sparse": 16,
+}
+
+CLIENTS = ["mock", "replay", "json", "reg", "device"]
+DECODE_PATHS = ["float64", "float32", "raw", "float64-batch", "float32-batch", "raw-batch"]
+KEY_FIELDS = ["mode", "range_length", "sweep_rate", "client", "decode_path"]
+RANGE_START = 0.2
+NUM_ALLOC_FRAMES = 50
+
+
+class Case:
+    def __init__(self, mode, range_length, sweep_rate, client, decode_path):
+        self.mode = mode
+        self.range_length = range_length
+        self.sweep_rate = sweep_rate
+        self.client = client
+        self.decode_path = decode_path
+
+    @property
+    def output_dtype(self):
+        return self.decode_path.split("-")[0]
+
+    @property
+    def batched(self):
+        return self.decode_path.endswith("-batch")
+
+    def make_config(self, sensors):
+        config = CONFIG_CLASSES[self.mode]()
+        config.sensor = sensors
+        config.range_interval = [RANGE_START, RANGE_START + self.range_length]
+        config.sweep_rate = self.sweep_rate
+        return config
+
+    def key(self):
+        return {k: getattr(self, k) for k in KEY_FIELDS}
+
+
+class ClientFactory:
+    """Creates the clients of the cases, starting the servers they need"""
+
+    def __init__(self, args, tmp_dir):
+        self.args = args
+        self.tmp_dir = tmp_dir
+        self.servers = []
+
+    def __call__(self, case, config):
+        kwargs = dict(output_dtype=case.output_dtype)
+        paced = self.args.paced
+
+        if case.client == "mock":
+            return MockClient(paced=paced, seed=0, frame_bank_size=64, **kwargs)
+        elif case.client == "replay":
+            path = self.record(case, config)
+            return ReplayClient(path, pace=paced, loop=True, **kwargs)
+        elif case.client == "json":
+            host, port = self.start(JSONServer(paced=paced, seed=0)).listen()
+            return SocketClient(host, socket_port=port, **kwargs)
+        elif case.client == "reg":
+            host, port = self.start(RegServer(paced=paced, seed=0)).listen()
+            return UARTClient(host, socket_port=port, **kwargs)
+        elif case.client == "device":
+            if self.args.socket_addr:
+                return SocketClient(self.args.socket_addr, **kwargs)
+            elif self.args.spi:
+                return SPIClient(**kwargs)
+            else:
+                return UARTClient(self.args.serial_port, **kwargs)
+
+        raise ValueError("unknown client {}".format(case.client))
+
+    def record(self, case, config):
+        path = os.path.join(self.tmp_dir, "{}.cap".format("_".join(map(str, case.key().values()))))
+
+        host, port = self.start(RegServer(paced=False, seed=0)).listen()
+        client = RecordingClient(UARTClient(host, socket_port=port), path)
+        client.start_streaming(config)
+        for _ in range(min(self.args.num_frames, 1000)):
+            client.get_next()
+        client.disconnect()
+        self.stop_servers()
+
+        return path
+
+    def start(self, server):
+        self.servers.append(server)
+        return server
+
+    def stop_servers(self):
+        for server in self.servers:
+            server.stop()
+
+        self.servers = []
+
+
+def measure(client, case, config, num_frames, batch_size):
+    session_info = client.start_streaming(config)
+    if case.batched:
+        get_next = lambda: client.get_next_batch(batch_size)  # noqa: E731
+        frames_per_call = batch_size
+    else:
+        get_next = client.get_next
+        frames_per_call = 1
+
+    _, data = get_next()  # warm up
+    num_samples = data.size // frames_per_call
+    if case.mode == "iq" and not np.iscomplexobj(data):
+        num_samples //= 2  # raw IQ frames have an axis of I/Q pairs
+
+    num_calls = max(num_frames // frames_per_call, 1)
+    latencies = np.empty(num_calls)
+
+    t0 = perf_counter()
+    c0 = process_time()
+    for i in range(num_calls):
+        t = perf_counter()
+        get_next()
+        latencies[i] = perf_counter() - t
+    dt = perf_counter() - t0
+    cpu = process_time() - c0
+
+    alloc = measure_alloc(get_next, max(NUM_ALLOC_FRAMES // frames_per_call, 1))
+    client.disconnect()
+
+    frame_rate = num_calls * frames_per_call / dt
+    latencies /= frames_per_call
+
+    return {
+        "data_length": session_info.get("data_length"),
+        "frames_per_s": frame_rate,
+        "mbit_per_s": frame_rate * num_samples * RAW_SAMPLE_BITS[case.mode] * 1e-6,
+        "latency_p50_ms": np.percentile(latencies, 50) * 1e3,
+        "latency_p99_ms": np.percentile(latencies, 99) * 1e3,
+        "cpu_percent": 100 * cpu / dt,
+        "alloc_kib_per_frame": alloc / frames_per_call / 2**10,
+    }
+
+
+def measure_alloc(get_next, num_calls):
+    """Returns the mean peak memory allocated while getting a frame, in bytes
+
+    The standard library can't count allocations, but tracemalloc tracks the
+    peak traced memory, which numpy reports its buffers to. Tracing is
+    restarted for each frame to reset the peak, as tracemalloc.reset_peak
+    needs Python 3.9.
+    """
+
+    peaks = []
+    for _ in range(num_calls):
+        tracemalloc.start()
+        try:
+            get_next()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        peaks.append(peak)
+
+    return float(np.mean(peaks))
+
+
+def run(args):
+    clients = args.clients
+    if not any([args.socket_addr, args.serial_port, args.spi]):
+        clients = [c for c in clients if c != "device"]
+
+    cases = [Case(*p) for p in itertools.product(
+        args.modes, args.range_lengths, args.sweep_rates, clients, args.decode_paths)]
+
+    results = []
+    fmt = "{:>10} {:>6} {:>6} {:>7} {:>14} {:>9} {:>8} {:>8} {:>8} {:>6} {:>8}"
+    print(fmt.format("mode", "range", "rate", "client", "decode path", "frames/s",
+                     "Mbit/s", "p50 ms", "p99 ms", "CPU%", "KiB/fr"))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        factory = ClientFactory(args, tmp_dir)
+
+        for case in cases:
+            config = case.make_config(args.sensors)
+            try:
+                client = factory(case, config)
+                result = measure(client, case, config, args.num_frames, args.batch_size)
+            finally:
+                factory.stop_servers()
+
+            result.update(case.key())
+            results.append(result)
+
+            print(fmt.format(
+                case.mode,
+                case.range_length,
+                case.sweep_rate,
+                case.client,
+                case.decode_path,
+                "{:.0f}".format(result["frames_per_s"]),
+                "{:.2f}".format(result["mbit_per_s"]),
+                "{:.3f}".format(result["latency_p50_ms"]),
+                "{:.3f}".format(result["latency_p99_ms"]),
+                "{:.0f}".format(result["cpu_percent"]),
+                "{:.1f}".format(result["alloc_kib_per_frame"]),
+            ))
+
+    output = {
+        "meta": {
+            "time": strftime("%Y-%m-%d %H:%M:%S"),
+            "sdk_version": SDK_VERSION,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "paced": args.paced,
+            "num_frames": args.num_frames,
+            "batch_size": args.batch_size,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.result) as f:
+        result = json.load(f)
+
+    def key(r):
+        return tuple(r[k] for k in KEY_FIELDS)
+
+    baseline_results = {key(r): r for r in baseline["results"]}
+
+    fmt = "{:>10} {:>6} {:>6} {:>7} {:>14} {:>10} {:>10} {:>8} {:>8}"
+    print(fmt.format(
+        "mode", "range", "rate", "client", "decode path", "frames/s", "baseline", "change",
+        "p99 chg"))
+
+    num_regressions = 0
+    for r in result["results"]:
+        b = baseline_results.get(key(r))
+        if b is None:
+            continue
+
+        change = r["frames_per_s"] / b["frames_per_s"] - 1
+        p99_change = r["latency_p99_ms"] / b["latency_p99_ms"] - 1
+        regressed = change < -args.threshold or p99_change > args.threshold
+        num_regressions += regressed
+
+        print(fmt.format(
+            *key(r),
+            "{:.0f}".format(r["frames_per_s"]),
+            "{:.0f}".format(b["frames_per_s"]),
+            "{:+.1%}".format(change),
+            "{:+.1%}".format(p99_change),
+        ) + (" <-- regression" if regressed else ""))
+
+    print("{} regression(s) beyond {:.0%}".format(num_regressions, args.threshold))
+    return 1 if num_regressions else 0
+
+
+def main():
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    run_parser.add_argument("--modes", nargs="+", choices=list(CONFIG_CLASSES),
+                            default=list(CONFIG_CLASSES))
+    run_parser.add_argument("--range-lengths", nargs="+", type=float, default=[0.2, 0.6])
+    run_parser.add_argument("--sweep-rates", nargs="+", type=float, default=[100])
+    run_parser.add_argument("--clients", nargs="+", choices=CLIENTS, default=CLIENTS)
+    run_parser.add_argument("--decode-paths", nargs="+", choices=DECODE_PATHS,
+                            default=["float64", "raw", "float64-batch"])
+    run_parser.add_argument("-n", "--num-frames", type=int, default=1000)
+    run_parser.add_argument("--batch-size", type=int, default=16)
+    run_parser.add_argument("--paced", action="store_true",
+                            help="pace the mock and emulated clients at the sweep rate")
+    run_parser.add_argument("--sensor", dest="sensors", type=int, nargs="+", default=[1])
+
+    device_group = run_parser.add_mutually_exclusive_group()
+    device_group.add_argument("-u", "--uart", dest="serial_port", metavar="port",
+                              help="also benchmark a device over uart")
+    device_group.add_argument("-s", "--socket", dest="socket_addr", metavar="address",
+                              help="also benchmark a device over socket")
+    device_group.add_argument("-spi", "--spi", action="store_true",
+                              help="also benchmark a device over spi")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("result")
+    compare_parser.add_argument("-t", "--threshold", type=float, default=0.1,
+                                help="relative change counted as a regression (default: 0.1)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import asyncio
+
+from acconeer_utils.clients import UARTClient, SPIClient, SocketClient
+from acconeer_utils.clients import configs
+from acconeer_utils import example_utils
+
+
+async def stream_sensor(client, sensor, num_sweeps):
+    config = configs.EnvelopeServiceConfig()
+    config.sensor = sensor
+    config.range_interval = [0.2, 0.3]
+    config.sweep_rate = 10
+
+    # stream() starts streaming (setting up the session with the given
+    # config) and yields (info, data) tuples. Leaving the loop does not
+    # stop streaming, disconnect takes care of that below.
+    i = 0
+    async for sweep_info, sweep_data in client.stream(config):
+        print("Sensor {}, sweep {}:\n".format(sensor, i+1), sweep_info, "\n", sweep_data, "\n")
+        i += 1
+        if i == num_sweeps:
+            break
+
+    await client.disconnect()
+
+
+def main():
+    args = example_utils.ExampleArgumentParser().parse_args()
+    example_utils.config_logging(args)
+
+    if args.socket_addr:
+        client = SocketClient(args.socket_addr)
+    elif args.spi:
+        client = SPIClient()
+    else:
+        port = args.serial_port or example_utils.autodetect_serial_port()
+        client = UARTClient(port)
+
+    # as_async gives an asyncio interface to the client. The socket client
+    # uses asyncio streams directly, while the UART and SPI clients are run
+    # in a worker thread. Any number of clients can be served by the same
+    # event loop, for example by gathering one stream_sensor per client.
+    async_client = client.as_async()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(stream_sensor(async_client, args.sensors, 3))
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
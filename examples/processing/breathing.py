@@ -111,6 +111,12 @@ class BreathingProcessor:
 
     def process(self, sweep):
         if self.sweep_index == 0:
+            # Keep the histories in the precision of the data
+            self.peak_history = self.peak_history.astype(sweep.dtype)
+            self.movement_history = self.movement_history.astype(sweep.real.dtype)
+            self.breath_history = self.breath_history.astype(sweep.real.dtype)
+            self.pulse_history = self.pulse_history.astype(sweep.real.dtype)
+
             self.lp_sweep = np.array(sweep)
             self.lp_env = np.abs(sweep)
             self.lp_peak_loc = np.argmax(self.lp_env)
@@ -152,6 +152,13 @@ class ButtonPressProcessor:
         self.buttonpress_length_sweeps = processing_config.buttonpress_length_s*self.f
 
     def process(self, sweep):
+        if self.sweep_index == 0:
+            # Keep the histories in the precision of the data
+            self.signal_history = self.signal_history.astype(sweep.dtype)
+            self.signal_lp_history = self.signal_lp_history.astype(sweep.dtype)
+            self.rel_dev_history = self.rel_dev_history.astype(sweep.dtype)
+            self.rel_dev_lp_history = self.rel_dev_lp_history.astype(sweep.dtype)
+
         # Sum the full sweep to a single number
         signal = np.mean(sweep)
 
@@ -299,10 +299,12 @@ class ObstacleDetectionProcessor:
                 }
                 self.fusion_handle.setup(fusion_params)
 
-            self.sweep_map = np.zeros((nr_sensors, len_range, self.fft_len), dtype="complex")
-            self.fft_bg = np.zeros((nr_sensors, len_range, self.fft_len))
-            self.fft_psd = np.zeros((nr_sensors, len_range, self.fft_len))
-            self.hamming_map = np.zeros((len_range, self.fft_len))
+            map_shape = (nr_sensors, len_range, self.fft_len)
+            float_dtype = sweep.real.dtype
+            self.sweep_map = np.zeros(map_shape, dtype=sweep.dtype)
+            self.fft_bg = np.zeros(map_shape, dtype=float_dtype)
+            self.fft_psd = np.zeros(map_shape, dtype=float_dtype)
+            self.hamming_map = np.zeros((len_range, self.fft_len), dtype=float_dtype)
 
             self.fusion_data = {
                 "fused_y": np.full((self.fusion_history, self.fusion_max_obstacles), np.nan),
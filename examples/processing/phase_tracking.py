@@ -88,6 +88,7 @@ class PhaseTrackingProcessor:
             com = 0
 
         if self.sweep_index == 0:
+            self.hist_pos = self.hist_pos.astype(ampl.dtype)
             self.lp_ampl = ampl
             self.lp_com = com
             plot_data = None
@@ -128,7 +129,7 @@ class PhaseTrackingProcessor:
         return plot_data
 
     def alpha(self, tau, dt):
-        return 1 - np.exp(-dt/tau)
+        return float(1 - np.exp(-dt/tau))
 
 
 class PGUpdater:
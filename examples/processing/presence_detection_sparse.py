@@ -222,7 +222,7 @@ class PresenceDetectionSparseProcessor:
         self.noise_sf = self.tc_to_sf(noise_tc, self.f)
 
         nd = self.noise_est_diff_order
-        self.noise_norm_factor = np.sqrt(np.sum(np.square(binom(nd, np.arange(nd + 1)))))
+        self.noise_norm_factor = float(np.sqrt(np.sum(np.square(binom(nd, np.arange(nd + 1))))))
 
         self.fast_lp_mean_subsweep = np.zeros(self.num_depths)
         self.slow_lp_mean_subsweep = np.zeros(self.num_depths)
@@ -260,13 +260,13 @@ class PresenceDetectionSparseProcessor:
             return 0.0
 
         cos_w = cos(2.0 * pi * (fc / fs))
-        return 2.0 - cos_w - sqrt(square(cos_w) - 4.0 * cos_w + 3.0)
+        return float(2.0 - cos_w - sqrt(square(cos_w) - 4.0 * cos_w + 3.0))
 
     def tc_to_sf(self, tc, fs):  # time constant to smoothing factor conversion
         if tc <= 0.0:
             return 0.0
 
-        return np.exp(-1.0 / (tc * fs))
+        return float(np.exp(-1.0 / (tc * fs)))
 
     def dynamic_sf(self, static_sf):
         return min(static_sf, 1.0 - 1.0 / (1.0 + self.sweep_index))
@@ -283,10 +283,10 @@ class PresenceDetectionSparseProcessor:
         assert ddof >= 0
         assert n > ddof
 
-        return np.mean(np.abs(a), axis=axis) * sqrt(n / (n - ddof))
+        return np.mean(np.abs(a), axis=axis) * (n / (n - ddof))**0.5
 
     def depth_filter(self, a):
-        b = np.ones(self.depth_filter_length) / self.depth_filter_length
+        b = np.ones(self.depth_filter_length, dtype=a.dtype) / self.depth_filter_length
 
         if a.size >= b.size:
             return np.correlate(a, b, mode="same")
@@ -304,6 +304,15 @@ class PresenceDetectionSparseProcessor:
         # For example, the "sweep" input parameter will be renamed to
         # "frame", and "mean_subsweep" will be renamed to "mean_sweep".
 
+        if self.sweep_index == 0:
+            # Keep the filter states in the precision of the data
+            self.fast_lp_mean_subsweep = self.fast_lp_mean_subsweep.astype(sweep.dtype)
+            self.slow_lp_mean_subsweep = self.slow_lp_mean_subsweep.astype(sweep.dtype)
+            self.lp_inter_dev = self.lp_inter_dev.astype(sweep.dtype)
+            self.lp_intra_dev = self.lp_intra_dev.astype(sweep.dtype)
+            self.lp_noise = self.lp_noise.astype(sweep.dtype)
+            self.presence_history = self.presence_history.astype(sweep.dtype)
+
         # Noise estimation
 
         nd = self.noise_est_diff_order
@@ -322,7 +331,7 @@ class PresenceDetectionSparseProcessor:
         norm_lp_intra_dev = np.divide(
                 self.lp_intra_dev,
                 self.lp_noise,
-                out=np.zeros(self.num_depths),
+                out=np.zeros_like(self.lp_intra_dev),
                 where=(self.lp_noise > 1.0),
                 )
 
@@ -116,10 +116,10 @@ def main():
         if args.socket_addr:
             client = SocketClient(args.socket_addr)
         elif args.spi:
-            client = SPIClient()
+            client = SPIClient(data_ready_wait="backoff")
         else:
             port = args.serial_port or example_utils.autodetect_serial_port()
-            client = UARTClient(port)
+            client = UARTClient(port, pipeline_reg_writes=True, connection_cache=True)
 
         # setup Camera date and time
         if os.name != 'nt':
@@ -354,7 +354,7 @@ class Processor:
         if tc <= 0.0:
             return 0.0
 
-        return np.exp(-1.0 / (tc * fs))
+        return float(np.exp(-1.0 / (tc * fs)))
 
     def dynamic_sf(self, static_sf):
         return min(static_sf, 1.0 - 1.0 / (1.0 + self.update_idx))
@@ -394,7 +394,8 @@ class Processor:
             est_vel = np.nan
 
         # print speed and distance
-        fft = np.fft.rfft(zero_mean_sweep.T * np.hanning(sweep.shape[0]), axis=1)
+        window = np.hanning(sweep.shape[0]).astype(sweep.dtype)
+        fft = np.fft.rfft(zero_mean_sweep.T * window, axis=1)
         abs_fft = np.abs(fft)
         max_depth_index, max_bin = np.unravel_index(abs_fft.argmax(), abs_fft.shape)
         depth = self.depths[max_depth_index]
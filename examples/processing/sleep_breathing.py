@@ -153,8 +153,8 @@ class PresenceDetectionProcessor:
         self.b, self.a = signal.butter(4, [v_low, v_high], btype="bandpass")
 
         # Exponential lowpass filter
-        self.alpha_iq = np.exp(-2 / (self.f_s * tau_iq))
-        self.alpha_phi = np.exp(-2 * self.f_low / self.f_s)
+        self.alpha_iq = float(np.exp(-2 / (self.f_s * tau_iq)))
+        self.alpha_phi = float(np.exp(-2 * self.f_low / self.f_s))
 
         # Parameter init
         self.sweeps_in_block = int(np.ceil(n_dft * self.f_s))
@@ -169,7 +169,9 @@ class PresenceDetectionProcessor:
     def process(self, sweep):
         if self.sweep_index == 0:
             delay_points = int(np.ceil(np.size(sweep) / self.D))
-            self.data_s_d_mat = np.zeros((self.sweeps_in_block, delay_points), dtype="complex")
+            mat_shape = (self.sweeps_in_block, delay_points)
+            self.data_s_d_mat = np.zeros(mat_shape, dtype=sweep.dtype)
+            self.phi_vec = self.phi_vec.astype(sweep.real.dtype)
             self.data_s_d_mat[self.sweep_index, :] = self.downsample(sweep, self.D)
 
             out_data = None
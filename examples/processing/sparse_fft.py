@@ -107,7 +107,8 @@ class Processor:
 
     def process(self, sweep):
         zero_mean_sweep = sweep - sweep.mean(axis=0, keepdims=True)
-        fft = np.fft.rfft(zero_mean_sweep.T * np.hanning(sweep.shape[0]), axis=1)
+        window = np.hanning(sweep.shape[0]).astype(sweep.dtype)
+        fft = np.fft.rfft(zero_mean_sweep.T * window, axis=1)
         abs_fft = np.abs(fft)
 
         # abs_fft is a matrix with dims abs_fft[depth, freq_bin]
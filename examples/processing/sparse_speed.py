@@ -181,12 +181,15 @@ class Processor:
         if tc <= 0.0:
             return 0.0
 
-        return np.exp(-1.0 / (tc * fs))
+        return float(np.exp(-1.0 / (tc * fs)))
 
     def dynamic_sf(self, static_sf):
         return min(static_sf, 1.0 - 1.0 / (1.0 + self.update_idx))
 
     def process(self, sweep):
+        if self.update_idx == 0:
+            self.nasd_history = self.nasd_history.astype(sweep.dtype)
+
         # Basic speed estimate
 
         zero_mean_sweep = sweep - sweep.mean(axis=0, keepdims=True)
@@ -244,7 +247,8 @@ class Processor:
         self.est_vel_history[-1] = est_vel
 
         if est_vel > 0.2:
-            fft = np.fft.rfft(zero_mean_sweep.T * np.hanning(sweep.shape[0]), axis=1)
+            window = np.hanning(sweep.shape[0]).astype(sweep.dtype)
+            fft = np.fft.rfft(zero_mean_sweep.T * window, axis=1)
             abs_fft = np.abs(fft)
             max_depth_index, max_bin = np.unravel_index(abs_fft.argmax(), abs_fft.shape)
             depth = self.depths[max_depth_index]
@@ -0,0 +1,28 @@
+import argparse
+import os
+
+from acconeer_utils.recording import convert_recording
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts recordings to the compact format")
+    parser.add_argument("files", nargs="+", help=".h5 or .npy recordings to convert")
+    parser.add_argument("-o", "--output-dir", help="directory to write to, else the input one")
+    parser.add_argument("--suffix", default="_compact", help="appended to the file names")
+    parser.add_argument("--gzip", action="store_true", help="compress the frames")
+    args = parser.parse_args()
+
+    for src in args.files:
+        root, _ = os.path.splitext(src)
+        if args.output_dir:
+            root = os.path.join(args.output_dir, os.path.basename(root))
+        dst = root + args.suffix + ".h5"
+
+        num_frames = convert_recording(src, dst, compression="gzip" if args.gzip else None)
+        src_size, dst_size = os.path.getsize(src), os.path.getsize(dst)
+        print("{} -> {}: {} frames, {:.1f} MB -> {:.1f} MB".format(
+            src, dst, num_frames, src_size * 1e-6, dst_size * 1e-6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from acconeer_utils.clients import SocketClient, SPIClient, UARTClient
+from acconeer_utils.clients import configs
+from acconeer_utils import example_utils
+from acconeer_utils.recording import Recorder, SegmentedRecorder
+
+
+def main():
+    parser = example_utils.ExampleArgumentParser()
+    parser.add_argument("-o", "--output", default="recording.h5", help="file to record to")
+    parser.add_argument("--compact", action="store_true",
+                        help="record the raw samples of the sensor, in half the space")
+    parser.add_argument("--segment-minutes", type=float,
+                        help="record to a directory of segments of this length")
+    parser.add_argument("--keep-gb", type=float,
+                        help="delete the oldest segments beyond this size")
+    args = parser.parse_args()
+    example_utils.config_logging(args)
+
+    if args.keep_gb and not args.segment_minutes:
+        parser.error("--keep-gb requires --segment-minutes")
+
+    # Metrics give each frame its receive time, which is recorded as its timestamp
+    if args.socket_addr:
+        client = SocketClient(args.socket_addr, metrics=True)
+    elif args.spi:
+        client = SPIClient(metrics=True)
+    else:
+        port = args.serial_port or example_utils.autodetect_serial_port()
+        client = UARTClient(port, metrics=True)
+
+    # The file can be loaded in the GUI, as a saved scan
+    client.squeeze = False
+    if args.compact:
+        client.output_dtype = "raw"
+
+    config = configs.EnvelopeServiceConfig()
+    config.sensor = args.sensors
+    config.range_interval = [0.2, 0.6]
+    config.sweep_rate = 30
+
+    session_info = client.start_streaming(config)
+
+    # Frames are written to the file as they arrive, so the recording can
+    # be as long as the disk allows
+    kwargs = dict(compression="gzip", raw=args.compact)
+    if args.segment_minutes:
+        # Segments are written to the output directory, and listed in its
+        # manifest. Each can also be loaded on its own.
+        recorder = SegmentedRecorder(
+            args.output,
+            config,
+            session_info,
+            max_segment_duration=60 * args.segment_minutes,
+            max_total_bytes=args.keep_gb and args.keep_gb * 1e9,
+            **kwargs,
+        )
+    else:
+        recorder = Recorder(args.output, config, session_info, **kwargs)
+
+    interrupt_handler = example_utils.ExampleInterruptHandler()
+    print("Recording to {}, press Ctrl-C to end session".format(args.output))
+
+    with recorder:
+        while not interrupt_handler.got_signal:
+            info, data = client.get_next()
+            recorder.append(info, data)
+
+    print("Recorded {} frames".format(recorder.num_frames))
+    print("Disconnecting...")
+    client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -238,12 +238,12 @@ class DataProcessing:
 
         self.sensor_config.sensor = matching_sensors
 
-        for i, data_step in enumerate(data):
+        for data_step in data:
             if info_available:
                 if not is_session_format_new:
-                    info = data[i]["info"]
+                    info = data_step["info"]
                 else:
-                    info = data[i]["info"][0]
+                    info = data_step["info"][0]
                 info["sequence_number"] -= sequence_offset
             else:
                 info = self.info.copy()
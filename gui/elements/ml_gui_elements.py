@@ -1147,10 +1147,19 @@ class FeatureSidePanel(QFrame):
         elif "calibration" in action:
             title = "Load session file for frame calibration"
 
+        file_types = "NumPy data files (*.npy)"
+        if "settings" not in action and "calibration" not in action:
+            file_types += ";; HDF5 data files (*.h5)"
+
         options = QtWidgets.QFileDialog.Options()
         options |= QtWidgets.QFileDialog.DontUseNativeDialog
         filename, _ = QtWidgets.QFileDialog.getOpenFileName(
-            self, title, "", "NumPy data files (*.npy)", options=options)
+            self, title, "", file_types, options=options)
+
+        if filename.endswith(".h5"):
+            # Sweeps of a recording, possibly a time window of it, to label
+            self.gui_handle.load_scan(filename=filename)
+            return
 
         if filename:
             try:
@@ -1257,7 +1266,7 @@ class FeatureSidePanel(QFrame):
             title = "Save session data"
             data = {
                 "feature_list": self.gui_handle.ml_data["ml_frame_data"]["feature_list"],
-                "sweep_data": self.gui_handle.data,
+                "sweep_data": list(self.gui_handle.data),
                 "frame_data": self.gui_handle.ml_data,
                 "frame_settings": self.gui_handle.feature_sidepanel.get_frame_settings()
                 }
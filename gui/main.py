@@ -4,12 +4,12 @@ import sys
 import ntpath
 import numpy as np
 import serial.tools.list_ports
-import h5py
 import logging
 import signal
 import threading
 import copy
 import json
+import time
 
 from PyQt5.QtWidgets import (QComboBox, QMainWindow, QApplication, QWidget, QLabel, QLineEdit,
                              QCheckBox, QFrame, QPushButton, QTabWidget, QStackedWidget)
@@ -26,6 +26,7 @@ try:
     from acconeer_utils.clients import configs
     from acconeer_utils import example_utils
     from acconeer_utils.structs import configbase
+    from acconeer_utils.recording import FrameDicts, Recorder, RecordingReader, info_timestamps
 
     sys.path.append(os.path.dirname(__file__))  # noqa: E402
     sys.path.append(os.path.join(os.path.dirname(__file__), ".."))  # noqa: E402
@@ -1259,7 +1260,7 @@ class GUI(QMainWindow):
 
         if state == "has_loaded_data":
             if val:
-                if isinstance(self.data, list) and self.data[0].get("sensor_config"):
+                if isinstance(self.data, (list, FrameDicts)) and self.data[0].get("sensor_config"):
                     self.set_multi_sensors()
             else:
                 self.buttons["replay_buffered"].setEnabled(False)
@@ -1840,46 +1841,57 @@ class GUI(QMainWindow):
             self.buttons["load_cl"].setText("Unload background")
             self.buttons["load_cl"].setStyleSheet("QPushButton {color: red}")
 
-    def load_scan(self, restart=False):
+    def input_time_window(self, duration):
+        input_dialog = QtWidgets.QInputDialog(self)
+        input_dialog.setInputMode(QtWidgets.QInputDialog.TextInput)
+        input_dialog.setFixedSize(400, 200)
+        input_dialog.setWindowTitle("Time window")
+        input_dialog.setLabelText(
+                "The recording is {:.0f} s long. Which seconds do you want to load?\n"
+                "For example 10-20, or leave empty to load all".format(duration)
+                )
+
+        window = None
+        if input_dialog.exec_() == QtWidgets.QDialog.Accepted and input_dialog.textValue():
+            try:
+                window = [float(t) for t in input_dialog.textValue().split("-")]
+                assert len(window) == 2
+            except (ValueError, AssertionError):
+                self.error_message("Time window must be given as start-end, loading all")
+                window = None
+        input_dialog.deleteLater()
+        return window
+
+    def load_scan(self, restart=False, filename=None, window=None):
         if restart:
             self.start_scan(from_file=True)
             return
 
-        options = QtWidgets.QFileDialog.Options()
-        options |= QtWidgets.QFileDialog.DontUseNativeDialog
-        filename, _ = QtWidgets.QFileDialog.getOpenFileName(
-                self,
-                "Load scan",
-                "",
-                "HDF5 data files (*.h5);; NumPy data files (*.npy)",
-                options=options
-                )
+        if filename is None:
+            options = QtWidgets.QFileDialog.Options()
+            options |= QtWidgets.QFileDialog.DontUseNativeDialog
+            filename, _ = QtWidgets.QFileDialog.getOpenFileName(
+                    self,
+                    "Load scan",
+                    "",
+                    "HDF5 data files (*.h5);; NumPy data files (*.npy)",
+                    options=options
+                    )
 
         if filename:
             cl_file = None
             if filename.endswith(".h5"):
                 try:
-                    f = h5py.File(filename, "r")
+                    reader = RecordingReader(filename)
+                    f = reader.file
                 except Exception as e:
                     self.error_message("{}".format(e))
                     print(e)
                     return
 
-                try:
-                    real = np.asarray(list(f["real"]))
-                    im = np.asarray(list(f["imag"]))
-                except Exception as e:
-                    self.error_message("{}".format(e))
-                    return
-
-                try:
-                    module_label = f["service_type"][()]
-                except Exception:
-                    if np.any(np.nonzero(im.flatten())):
-                        module_label = "IQ"
-                    else:
-                        module_label = "Envelope"
-
+                module_label = reader.service_type
+                if module_label is None:
+                    module_label = "IQ" if reader.mode == "iq" else "Envelope"
                     print("Service type not stored, autodetected {}".format(module_label))
 
                 index = self.module_dd.findText(module_label, QtCore.Qt.MatchFixedString)
@@ -1891,17 +1903,7 @@ class GUI(QMainWindow):
                     return
 
                 conf = copy.deepcopy(self.get_sensor_config())
-
-                try:
-                    if self.current_data_type == "iq":
-                        sweeps = real + 1j * im
-                    else:
-                        sweeps = real
-
-                    length = range(len(sweeps))
-                except Exception as e:
-                    self.error_message("{}".format(e))
-                    return
+                reader.is_complex = self.current_data_type == "iq"
 
                 try:
                     self.env_profiles_dd.setCurrentIndex(f["profile"][()])
@@ -1970,55 +1972,36 @@ class GUI(QMainWindow):
                 except Exception as e:
                     print("Sensor selection not stored: ", e)
                     conf.sensor = 1
-                nr_sensors = len(conf.sensor)
 
-                cl_file = None
-                try:
-                    cl_file = f["clutter_file"][()]
-                except Exception:
-                    pass
+                cl_file = reader.read_metadata("clutter_file")
 
-                has_sweep_info = True
-                nr = None
-                try:
-                    nr = np.asarray(list(f["sequence_number"]))
-                except Exception:
-                    has_sweep_info = False
+                if reader.sequence_number is None:
                     print("Session info not stored!")
-
-                try:
-                    sat = np.asarray(list(f["data_saturated"]))
-                except Exception:
-                    if nr is not None:
-                        sat = np.full(nr.shape, False)
+                elif reader.data_saturated is None:
                     print("Saturaded info not stored!")
 
-                if nr is not None and nr_sensors == 1:
-                    sat = np.expand_dims(sat, axis=1)
-                    nr = np.expand_dims(nr, axis=1)
-
-                if has_sweep_info:
-                    self.data = [
-                        {
-                            "sweep_data": sweeps[i],
-                            "service_type": module_label,
-                            "sensor_config": conf,
-                            "cl_file": cl_file,
-                            "info": [
-                                {
-                                    "sequence_number": int(nr[i, s]),
-                                    "data_saturated": bool(sat[i, s]),
-                                } for s in range(nr_sensors)],
-                        } for i in length]
-                else:
-                    self.data = [
-                        {
-                            "sweep_data": sweeps[i],
-                            "service_type": module_label,
-                            "sensor_config": conf,
-                            "cl_file": cl_file,
-                        } for i in length]
+                # Long indexed recordings can be loaded in part, the frames
+                # of the window being found from the index
+                start, stop = 0, len(reader)
+                duration = reader.duration
+                if duration is None:
+                    window = None
+                elif window is None and duration > 60:
+                    window = self.input_time_window(duration)
+                if window is not None:
+                    start = reader.seek(time=reader.start_time + window[0])
+                    stop = reader.seek(time=reader.start_time + window[1])
+                    if start >= stop:
+                        self.error_message("No frames in the time window")
+                        return
 
+                self.data = reader.frame_dicts(
+                    start=start,
+                    stop=stop,
+                    service_type=module_label,
+                    sensor_config=conf,
+                    cl_file=cl_file,
+                )
                 self.data[0]["session_info"] = session_info
             else:
                 try:
@@ -2087,50 +2070,6 @@ class GUI(QMainWindow):
                 self.buttons["load_cl"].setStyleSheet("QPushButton {color: red}")
             else:
                 if "h5" in info:
-                    sweep_data = []
-                    info_available = True
-                    saturated_available = True
-
-                    # check for session info data
-                    try:
-                        nr_sensor = len(data[0]["sensor_config"].sensor)
-                        data[0]["info"][0]["sequence_number"]
-                    except Exception as e:
-                        print("Error saving session info: ", e)
-                        info_available = False
-
-                    # check for data saturated info
-                    try:
-                        data[0]["info"][0]["data_saturated"]
-                    except Exception as e:
-                        print("Error saving saturation data: ", e)
-                        saturated_available = False
-
-                    sequence_number = []
-                    data_saturated = []
-                    for i in range(nr_sensor):
-                        sequence_number.append([])
-                        data_saturated.append([])
-
-                    for sweep in data:
-                        sweep_data.append(sweep["sweep_data"])
-                        if info_available:
-                            for s in range(nr_sensor):
-                                if info_available:
-                                    session = sweep["info"][s]["sequence_number"]
-                                    sequence_number[s].append(session)
-                                if saturated_available:
-                                    saturated = sweep["info"][s]["data_saturated"]
-                                    data_saturated[s].append(saturated)
-
-                    sweep_data = np.asarray(sweep_data)
-                    if info_available:
-                        sequence_number = np.asarray(sequence_number).T
-                        if saturated_available:
-                            data_saturated = np.asarray(data_saturated).T
-                        else:
-                            data_saturated = np.full(sequence_number, False)
-
                     try:
                         sensor_config = data[0]["sensor_config"]
                     except Exception as e:
@@ -2140,76 +2079,43 @@ class GUI(QMainWindow):
                     if ".h5" not in filename:
                         filename = filename + ".h5"
                     try:
-                        f = h5py.File(filename, "w")
+                        recorder = Recorder(
+                            filename,
+                            sensor_config,
+                            session_info=self.session_info,
+                            service_type=mode.lower(),
+                        )
                     except Exception as e:
                         self.error_message("Failed to save file:\n {:s}".format(e))
                         return
 
-                    cl_file = None
-                    if self.cl_file:
-                        cl_file = self.cl_file
-
-                    f.create_dataset("imag", data=np.imag(sweep_data), dtype=np.float32)
-                    f.create_dataset("real", data=np.real(sweep_data), dtype=np.float32)
-                    f.create_dataset("sweep_rate", data=int(self.textboxes["sweep_rate"].text()),
-                                     dtype=np.float32)
-                    f.create_dataset("start", data=float(sensor_config.range_start),
-                                     dtype=np.float32)
-                    f.create_dataset("end", data=float(sensor_config.range_end),
-                                     dtype=np.float32)
-                    f.create_dataset("gain", data=float(sensor_config.gain), dtype=np.float32)
-                    f.create_dataset("sensor", data=sensor_config.sensor, dtype=np.int)
-                    f.create_dataset("service_type", data=mode.lower(),
-                                     dtype=h5py.special_dtype(vlen=str))
-                    f.create_dataset("clutter_file", data=cl_file,
-                                     dtype=h5py.special_dtype(vlen=str))
-                    f.create_dataset("profile", data=self.env_profiles_dd.currentIndex(),
-                                     dtype=np.int)
-                    if info_available:
-                        f.create_dataset("sequence_number", data=sequence_number, dtype=np.int)
-                        f.create_dataset("data_saturated", data=data_saturated, dtype='u1')
-
-                    keys = [
-                        "bin_count",
-                        "number_of_subsweeps",
-                        "hw_accelerated_average_samples",
-                        "stepsize",
-                        "sampling_mode"
-                    ]
+                    timestamps, synthetic = info_timestamps(
+                        [sweep.get("info") for sweep in data], sensor_config.sweep_rate)
+                    if timestamps is None:
+                        timestamps = [None] * len(data)
 
-                    for key in keys:
-                        val = getattr(sensor_config, key, None)
-                        if val is not None:
-                            f.create_dataset(key, data=int(val), dtype=np.int)
-
-                    if hasattr(sensor_config, "subsweep_rate"):
-                        val = sensor_config.subsweep_rate
-                        if val is None:
-                            val = -1
-                        f.create_dataset("subsweep_rate", data=val, dtype=np.float32)
-
-                    f.create_dataset(
-                            "session_info",
-                            data=json.dumps(self.session_info),
-                            dtype=h5py.special_dtype(vlen=str),
-                            )
-
-                    processing_config = self.get_processing_config()
-                    if isinstance(processing_config, configbase.Config):
-                        s = processing_config._dumps()
-                        f.create_dataset(
-                                "processing_config_dump",
-                                data=s,
-                                dtype=h5py.special_dtype(vlen=str),
-                                )
-                    else:
-                        if mode in self.service_labels:
+                    with recorder:
+                        recorder.synthetic_timestamps = synthetic
+                        for sweep, timestamp in zip(data, timestamps):
+                            recorder.append(sweep.get("info"), sweep["sweep_data"], timestamp)
+
+                        if self.cl_file:
+                            recorder.write_metadata("clutter_file", self.cl_file)
+
+                        recorder.write_metadata("profile", self.env_profiles_dd.currentIndex(),
+                                                int)
+
+                        processing_config = self.get_processing_config()
+                        if isinstance(processing_config, configbase.Config):
+                            s = processing_config._dumps()
+                            recorder.write_metadata("processing_config_dump", s)
+                        elif mode in self.service_labels:
                             for key in self.service_params:
                                 if key == "processing_handle":
                                     continue
                                 try:
-                                    f.create_dataset(key, data=self.service_params[key]["value"],
-                                                     dtype=np.float32)
+                                    recorder.write_metadata(
+                                        key, self.service_params[key]["value"], np.float32)
                                 except Exception:
                                     pass
                 else:
@@ -2586,6 +2492,10 @@ class Threaded_Scan(QtCore.QThread):
             try:
                 while self.running:
                     info, sweep = self.client.get_next()
+                    receive_time = time.time()
+                    for d in ([info] if isinstance(info, dict) else info):
+                        d.setdefault("receive_time", receive_time)
+
                     self.emit("sweep_info", "", info)
                     plot_data, data, sweep_number = self.radar.process(sweep, info)
                     if sweep_number + 1 >= self.sweep_count:
@@ -79,7 +79,7 @@ class EnvelopeProcessor:
             self.env_x_mm = np.linspace(self.start_x, self.stop_x, self.data_len) * 1000
 
             self.cl_empty = np.zeros(self.data_len)
-            self.last_env = np.zeros((self.num_sensors, self.data_len))
+            self.last_env = np.zeros((self.num_sensors, self.data_len), dtype=sweep.dtype)
 
             if self.data_processing is not None and self.num_sensors == 1:
                 self.cl, _, self.n_std_avg = \
@@ -92,7 +92,8 @@ class EnvelopeProcessor:
                     self.use_cl = False
 
             self.hist_env = np.zeros(
-                (self.num_sensors, len(self.env_x_mm), self.image_buffer)
+                (self.num_sensors, len(self.env_x_mm), self.image_buffer),
+                dtype=sweep.dtype
                 )
             self.peak_history = np.zeros(
                 (self.num_sensors, self.image_buffer),
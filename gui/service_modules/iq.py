@@ -79,7 +79,7 @@ class IQProcessor:
             self.env_x_mm = np.linspace(self.start_x, self.stop_x, self.data_len) * 1000
 
             self.cl_empty = np.zeros(self.data_len)
-            self.last_iq = np.zeros((self.num_sensors, self.data_len))
+            self.last_iq = np.zeros((self.num_sensors, self.data_len), dtype=sweep.dtype)
 
             if self.num_sensors == 1:
                 self.cl, self.cl_iq, self.n_std_avg = \
@@ -92,7 +92,8 @@ class IQProcessor:
                     self.use_cl = False
 
             self.hist_env = np.zeros(
-                (self.num_sensors, len(self.env_x_mm), self.image_buffer)
+                (self.num_sensors, len(self.env_x_mm), self.image_buffer),
+                dtype=sweep.real.dtype
                 )
             self.peak_history = np.zeros(
                 (self.num_sensors, self.image_buffer),
@@ -122,8 +123,8 @@ class IQProcessor:
 
         if self.create_cl:
             if self.sweep == 0:
-                self.cl = np.zeros((self.sweeps, self.data_len))
-                self.cl_iq = np.zeros((self.sweeps, self.data_len), dtype="complex")
+                self.cl = np.zeros((self.sweeps, self.data_len), dtype=sweep.real.dtype)
+                self.cl_iq = np.zeros((self.sweeps, self.data_len), dtype=sweep.dtype)
             self.cl[self.sweep, :] = env[0, :]
             self.cl_iq[self.sweep, :] = iq[0, :]
 
@@ -102,6 +102,10 @@ class Processor:
         self.sweep_index = 0
 
     def process(self, data):
+        if self.sweep_index == 0:
+            self.data_history = self.data_history.astype(data.dtype)
+            self.presence_history = self.presence_history.astype(data.dtype)
+
         if self.pd_processors:
             processed_datas = [p.process(s) for s, p in zip(data, self.pd_processors)]
             presences = [d["depthwise_presence"] for d in processed_datas]
@@ -1,12 +1,21 @@
 from .reg.client import RegClient as UARTClient
 from .reg.client import RegSPIClient as SPIClient
 from .json.client import JSONClient as SocketClient
+from .json.client import AsyncJSONClient as AsyncSocketClient
 from .mock.client import MockClient
+from .capture.client import RecordingClient, ReplayClient
+from .base import ExecutorAsyncClient
+from .metrics import ClientMetrics
 
 
 __all__ = [
     UARTClient,
     SPIClient,
     SocketClient,
+    AsyncSocketClient,
     MockClient,
+    RecordingClient,
+    ReplayClient,
+    ExecutorAsyncClient,
+    ClientMetrics,
 ]
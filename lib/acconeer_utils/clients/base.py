@@ -1,41 +1,187 @@
 from abc import ABCMeta, abstractmethod
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import threading
+from time import perf_counter, time
 from distutils.version import StrictVersion
+import numpy as np
 
 from acconeer_utils import SDK_VERSION
+from acconeer_utils.clients.metrics import ClientMetrics
 
 
 log = logging.getLogger(__name__)
 
+BATCH_INFO_DTYPE = np.dtype([
+    ("sequence_number", "i8"),
+    ("data_saturated", "?"),
+    ("timestamp", "f8"),
+    ("frames_lost_since_last", "i8"),
+])
+
+OUTPUT_DTYPES = ["float64", "float32", "raw"]
+
+# The raw output of each mode converts to the float output as
+# (raw + offset) * scale, IQ data applying it to both parts
+RAW_SCALE_AND_OFFSET = {
+    "power_bin": (1.0, 0),
+    "envelope": (1.0, 0),
+    "iq": (2**-12, 0),
+    "sparse": (1.0, -2**15),
+}
+
+# The dtypes of the raw output, the same for all clients. They are the
+# native sample types of the register protocol. The JSON protocol sends
+# power bins as integers, which are converted to float32.
+RAW_DTYPES = {
+    "power_bin": "float32",
+    "envelope": "uint16",
+    "iq": "int16",
+    "sparse": "uint16",
+}
+
+
+class ClientStats:
+    """Frame tap, metrics and frame loss tracking shared by the clients
+
+    Takes the ``metrics`` and ``on_frames_lost`` keyword arguments of the
+    clients.
+    """
+
+    def __init__(self, **kwargs):
+        # Called with the chunks of each raw stream frame as it is received,
+        # before it is decoded. The chunks are only valid during the call.
+        self._frame_tap = None
+
+        self.metrics = kwargs.get("metrics")
+        if self.metrics is True:
+            self.metrics = ClientMetrics()
+        elif not self.metrics:
+            self.metrics = None
+
+        # (wait time, receive time) of the frame being fetched, reported to
+        # the metrics once it is decoded
+        self._pending_receive = None
+
+        # Called with the number of frames lost and the info of the frame
+        # after them, whenever the sequence numbers skip ahead
+        self.on_frames_lost = kwargs.get("on_frames_lost")
+
+        self.num_frames_lost = 0
+        self.num_loss_events = 0
+        self.num_duplicate_frames = 0
+        self._last_seq_num = None
+        # Set by clients whose sequence numbers don't count frames
+        self._ignore_seq_nums = False
+
+    @property
+    def loss_stats(self):
+        """Cumulative sequence number gap counts of all sessions"""
+
+        return {
+            "frames_lost": self.num_frames_lost,
+            "loss_events": self.num_loss_events,
+            "duplicate_frames": self.num_duplicate_frames,
+        }
+
+    def _receive_time(self, info):
+        """Returns the host time the frame with the info was received"""
+
+        d = info if isinstance(info, dict) else info[0]
+        return d.get("receive_time") or time()
+
+    def _track_seq_num(self, info):
+        """Annotates the info with frames_lost_since_last and counts gaps
+
+        Frames dropped by the prefetch queue are counted as lost, as they
+        are to the caller.
+        """
+
+        infos = [info] if isinstance(info, dict) else info
+        seq_num = infos[0].get("sequence_number") if infos else None
+
+        num_lost = 0
+        if seq_num and not self._ignore_seq_nums:
+            last = self._last_seq_num
+            if last is not None:
+                if seq_num > last + 1:
+                    num_lost = seq_num - last - 1
+                elif seq_num <= last:
+                    log.info("got same frame twice or out of order")
+                    self.num_duplicate_frames += 1
+                    self._count_event("duplicate_frames")
+
+            self._last_seq_num = seq_num
+
+        for d in infos:
+            d["frames_lost_since_last"] = num_lost
+
+        if num_lost:
+            log.info("lost {} frame(s)".format(num_lost))
+            self.num_frames_lost += num_lost
+            self.num_loss_events += 1
+
+            if self.metrics:
+                self.metrics.increment("missed_frames", num_lost)
+
+            if self.on_frames_lost:
+                self.on_frames_lost(num_lost, info)
+
+    def _count_received(self, num_bytes, t0):
+        """Reports a stream frame received from the link, waited for since t0"""
+
+        if self.metrics:
+            self._pending_receive = (perf_counter() - t0, time())
+            self.metrics.frame_received(num_bytes, *self._pending_receive)
+
+    def _count_decoded(self, info, t0):
+        wait_time, receive_time = self._pending_receive or (0, None)
+        self._pending_receive = None
+        self.metrics.frame_decoded(info, perf_counter() - t0, wait_time, receive_time)
+
+    def _count_event(self, name):
+        if self.metrics:
+            self.metrics.increment(name)
+
+
+class BaseClient(ClientStats, metaclass=ABCMeta):
+    # Name of the raw stream frame format passed to the frame tap, see
+    # clients.capture. None if the client has no raw frames.
+    FRAME_FORMAT = None
 
-class BaseClient(metaclass=ABCMeta):
     @abstractmethod
     def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         self.squeeze = kwargs.get("squeeze", True)
+        self.output_dtype = kwargs.get("output_dtype", "float64")
 
         self._connected = False
         self._session_setup_done = False
         self._streaming_started = False
+        self._prefetcher = None
+        self._prefetch_args = (None, "drop_oldest")
+
+    @property
+    def num_dropped_frames(self):
+        """Number of frames dropped by the prefetch queue in the latest session"""
+        return self._prefetcher.num_dropped if self._prefetcher else 0
 
     def connect(self):
         if self._connected:
             raise ClientError("already connected")
 
+        t0 = time()
         info = self._connect()
         self._connected = True
 
         if info is None:
             info = {}
 
-        try:
-            log.info("reported version: {}".format(info["version_str"]))
+        info["connect_time"] = time() - t0
 
-            if info["strict_version"] < StrictVersion(SDK_VERSION):
-                log.warning("old server version - please upgrade server")
-            elif info["strict_version"] > StrictVersion(SDK_VERSION):
-                log.warning("new server version - please upgrade client")
-        except KeyError:
-            log.warning("could not read software version (might be too old)")
+        check_version_info(info)
 
         return info
 
@@ -43,27 +189,33 @@ class BaseClient(metaclass=ABCMeta):
         if self._streaming_started:
             raise ClientError("can't setup session while streaming")
 
+        check_output_dtype(self.output_dtype)
+
         if not self._connected:
             self.connect()
 
         session_info = self._setup_session(config)
         self._session_setup_done = True
 
-        try:
-            start_ok = abs(config.range_start - session_info["actual_range_start"]) < 0.01
-            len_ok = abs(config.range_length - session_info["actual_range_length"]) < 0.01
-        except (AttributeError, KeyError, TypeError):
-            pass
-        else:
-            if not start_ok or not len_ok:
-                log.warning("actual measured range differs from the requested")
+        check_session_info(config, session_info)
+        add_raw_scale_info(config, session_info, self.output_dtype)
 
         return session_info
 
-    def start_streaming(self, config=None):
+    def start_streaming(self, config=None, prefetch=None, overflow="drop_oldest"):
+        """Starts streaming, setting up the session first if given a config
+
+        With prefetch set to a number of frames, a background thread keeps
+        the link drained into a queue of that size, see :class:`Prefetcher`
+        for the overflow policies.
+        """
+
         if self._streaming_started:
             raise ClientError("already streaming")
 
+        if prefetch and overflow not in Prefetcher.OVERFLOW_POLICIES:
+            raise ValueError("unknown overflow policy {}".format(overflow))
+
         if config is None:
             ret = None
         else:
@@ -72,20 +224,111 @@ class BaseClient(metaclass=ABCMeta):
         if not self._session_setup_done:
             raise ClientError("session needs to be set up before starting stream")
 
+        self._pending_receive = None
+        self._last_seq_num = None
         self._start_streaming()
         self._streaming_started = True
+        self._prefetch_args = (prefetch, overflow)
+
+        if prefetch:
+            self._prefetcher = Prefetcher(self._fetch_next, prefetch, overflow)
+            self._prefetcher.start()
+        else:
+            self._prefetcher = None
+
         return ret
 
+    def reconfigure(self, config):
+        """Sets up the current session again with a new config
+
+        If streaming, the stream is stopped and then started again with the
+        same prefetch settings. Clients that keep track of the applied config
+        only apply what changed, see :meth:`_reconfigure`.
+        """
+
+        if not self._session_setup_done:
+            return self.setup_session(config)
+
+        check_output_dtype(self.output_dtype)
+
+        was_streaming = self._streaming_started
+        if was_streaming:
+            self.stop_streaming()
+
+        self._session_setup_done = False
+        session_info = self._reconfigure(config)
+        self._session_setup_done = True
+
+        check_session_info(config, session_info)
+        add_raw_scale_info(config, session_info, self.output_dtype)
+
+        if was_streaming:
+            prefetch, overflow = self._prefetch_args
+            self.start_streaming(prefetch=prefetch, overflow=overflow)
+
+        return session_info
+
     def get_next(self):
         if not self._streaming_started:
             raise ClientError("must be streaming to get next")
 
-        return self._get_next()
+        if self._prefetcher:
+            info, data = self._prefetcher.get()
+        else:
+            info, data = self._fetch_next()
+
+        self._track_seq_num(info)
+        return info, data
+
+    def get_next_batch(self, n, timeout=None):
+        """Gets the next n frames stacked into one array
+
+        Returns ``(info, data)`` where row ``i`` of data is what the i:th call
+        to :meth:`get_next` would have returned. The frames are decoded
+        directly into the preallocated array, so all frames in a session
+        must have the same size. The info is a structured array with the
+        fields of :data:`BATCH_INFO_DTYPE` and the shape ``(n, )``, or
+        ``(n, num_sensors)`` if not squeezed. The timestamp is the host time
+        when the frame was received, and a missing sequence number is -1.
+
+        If timeout (in seconds) passes before all frames are received, the
+        frames received so far are returned.
+        """
+
+        if not self._streaming_started:
+            raise ClientError("must be streaming to get next")
+
+        t0 = time()
+
+        info, data = self.get_next()
+        info_shape = () if isinstance(info, dict) else (len(info), )
+
+        batch_info = np.zeros((n, ) + info_shape, dtype=BATCH_INFO_DTYPE)
+        batch_data = np.empty((n, ) + data.shape, dtype=data.dtype)
+        batch_data[0] = data
+        set_batch_info(batch_info, 0, info, self._receive_time(info))
+
+        for i in range(1, n):
+            if timeout is not None and time() - t0 > timeout:
+                return batch_info[:i], batch_data[:i]
+
+            if self._prefetcher:
+                info, batch_data[i] = self._prefetcher.get()
+            else:
+                info = self._fetch_next_into(batch_data[i])
+
+            self._track_seq_num(info)
+            set_batch_info(batch_info, i, info, self._receive_time(info))
+
+        return batch_info, batch_data
 
     def stop_streaming(self):
         if not self._streaming_started:
             raise ClientError("not streaming")
 
+        if self._prefetcher:
+            self._prefetcher.stop()
+
         self._stop_streaming()
         self._streaming_started = False
 
@@ -98,6 +341,43 @@ class BaseClient(metaclass=ABCMeta):
 
         self._disconnect()
         self._connected = False
+        self._session_setup_done = False
+
+    def as_async(self):
+        """Returns an asyncio interface to this client
+
+        By default the blocking calls are run in a worker thread, see
+        :class:`ExecutorAsyncClient`. The client itself should not be used
+        directly while it is wrapped.
+        """
+
+        return ExecutorAsyncClient(self)
+
+    def _fetch_next(self):
+        if not self.metrics:
+            return self._get_next()
+
+        t0 = perf_counter()
+        info, data = self._get_next()
+        self._count_decoded(info, t0)
+        return info, data
+
+    def _fetch_next_into(self, out):
+        if not self.metrics:
+            return self._get_next_into(out)
+
+        t0 = perf_counter()
+        info = self._get_next_into(out)
+        self._count_decoded(info, t0)
+        return info
+
+    def _receive_time(self, info):
+        # the time the last frame gotten was read, not when it was taken from the prefetch queue
+        d = info if isinstance(info, dict) else info[0]
+        if "receive_time" not in d and self._prefetcher:
+            return self._prefetcher.last_read_time
+
+        return super()._receive_time(info)
 
     @abstractmethod
     def _connect(self):
@@ -107,6 +387,11 @@ class BaseClient(metaclass=ABCMeta):
     def _setup_session(self, config):
         pass
 
+    def _reconfigure(self, config):
+        """Like _setup_session, but may assume a session is already set up"""
+
+        return self._setup_session(config)
+
     @abstractmethod
     def _start_streaming(self):
         pass
@@ -115,6 +400,13 @@ class BaseClient(metaclass=ABCMeta):
     def _get_next(self):
         pass
 
+    def _get_next_into(self, out):
+        """Like _get_next, but decodes the data into out and only returns the info"""
+
+        info, data = self._get_next()
+        out[...] = data
+        return info
+
     @abstractmethod
     def _stop_streaming(self):
         pass
@@ -124,10 +416,497 @@ class BaseClient(metaclass=ABCMeta):
         pass
 
 
+class Prefetcher:
+    """Keeps a client's link drained from a background thread
+
+    Frames are read with the given function and put in a queue holding at
+    most size frames. When the queue is full, the overflow policy decides
+    what happens:
+
+    * ``"drop_oldest"`` - the oldest frame is dropped and counted in
+      :attr:`num_dropped`.
+    * ``"block"`` - reading pauses until there is room in the queue.
+    * ``"error"`` - reading stops, and :meth:`get` raises a
+      :class:`ClientError` once the queued frames are consumed.
+
+    Errors raised while reading are re-raised from :meth:`get` in the same
+    way. The host time the frame last returned by :meth:`get` was read at
+    is kept in :attr:`last_read_time`.
+    """
+
+    OVERFLOW_POLICIES = ["drop_oldest", "block", "error"]
+    STOP_TIMEOUT = 5
+
+    def __init__(self, get_next, size, overflow="drop_oldest"):
+        self.num_dropped = 0
+        self.last_read_time = None
+
+        self._get_next = get_next
+        self._size = size
+        self._overflow = overflow
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+        self._thread.join(self.STOP_TIMEOUT)
+
+        if self._thread.is_alive():
+            log.warning("prefetch thread did not stop")
+
+    def get(self, timeout=None):
+        with self._cond:
+            has_frame = self._cond.wait_for(lambda: self._frames or self._error, timeout)
+
+            if self._frames:
+                frame, self.last_read_time = self._frames.popleft()
+                self._cond.notify_all()
+                return frame
+            elif not has_frame:
+                raise ClientError("timeout while waiting for prefetched frame")
+            else:
+                raise ClientError("prefetching failed") from self._error
+
+    def _run(self):
+        try:
+            while not self._stopped:
+                frame = self._get_next()
+                read_time = time()
+
+                with self._cond:
+                    self._put((frame, read_time))
+        except Exception as e:
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+
+    def _put(self, frame):
+        while len(self._frames) >= self._size and not self._stopped:
+            if self._overflow == "drop_oldest":
+                self._frames.popleft()
+                self.num_dropped += 1
+            elif self._overflow == "error":
+                self.num_dropped += 1
+                raise ClientError("prefetch queue overflow")
+            else:
+                self._cond.wait()
+
+        self._frames.append(frame)
+        self._cond.notify_all()
+
+
+class BaseAsyncClient(ClientStats, metaclass=ABCMeta):
+    """asyncio counterpart to :class:`BaseClient`
+
+    All calls are coroutines, and :meth:`stream` is an asynchronous generator
+    of ``(info, data)`` tuples, so that a single event loop can serve many
+    sensors concurrently.
+    """
+
+    @abstractmethod
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.squeeze = kwargs.get("squeeze", True)
+        self.output_dtype = kwargs.get("output_dtype", "float64")
+
+        self._connected = False
+        self._session_setup_done = False
+        self._streaming_started = False
+
+    async def connect(self):
+        if self._connected:
+            raise ClientError("already connected")
+
+        t0 = time()
+        info = await self._connect()
+        self._connected = True
+
+        if info is None:
+            info = {}
+
+        info["connect_time"] = time() - t0
+
+        check_version_info(info)
+
+        return info
+
+    async def setup_session(self, config):
+        if self._streaming_started:
+            raise ClientError("can't setup session while streaming")
+
+        check_output_dtype(self.output_dtype)
+
+        if not self._connected:
+            await self.connect()
+
+        session_info = await self._setup_session(config)
+        self._session_setup_done = True
+
+        check_session_info(config, session_info)
+        add_raw_scale_info(config, session_info, self.output_dtype)
+
+        return session_info
+
+    async def start_streaming(self, config=None):
+        if self._streaming_started:
+            raise ClientError("already streaming")
+
+        if config is None:
+            ret = None
+        else:
+            ret = await self.setup_session(config)
+
+        if not self._session_setup_done:
+            raise ClientError("session needs to be set up before starting stream")
+
+        self._pending_receive = None
+        self._last_seq_num = None
+        await self._start_streaming()
+        self._streaming_started = True
+        return ret
+
+    async def reconfigure(self, config):
+        """Sets up the current session again with a new config
+
+        See :meth:`BaseClient.reconfigure`.
+        """
+
+        if not self._session_setup_done:
+            return await self.setup_session(config)
+
+        check_output_dtype(self.output_dtype)
+
+        was_streaming = self._streaming_started
+        if was_streaming:
+            await self.stop_streaming()
+
+        self._session_setup_done = False
+        session_info = await self._reconfigure(config)
+        self._session_setup_done = True
+
+        check_session_info(config, session_info)
+        add_raw_scale_info(config, session_info, self.output_dtype)
+
+        if was_streaming:
+            await self.start_streaming()
+
+        return session_info
+
+    async def get_next(self):
+        if not self._streaming_started:
+            raise ClientError("must be streaming to get next")
+
+        info, data = await self._fetch_next()
+        self._track_seq_num(info)
+        return info, data
+
+    async def get_next_batch(self, n, timeout=None):
+        """Gets the next n frames stacked into one array
+
+        See :meth:`BaseClient.get_next_batch`.
+        """
+
+        if not self._streaming_started:
+            raise ClientError("must be streaming to get next")
+
+        t0 = time()
+
+        info, data = await self.get_next()
+        info_shape = () if isinstance(info, dict) else (len(info), )
+
+        batch_info = np.zeros((n, ) + info_shape, dtype=BATCH_INFO_DTYPE)
+        batch_data = np.empty((n, ) + data.shape, dtype=data.dtype)
+        batch_data[0] = data
+        set_batch_info(batch_info, 0, info, self._receive_time(info))
+
+        for i in range(1, n):
+            if timeout is not None and time() - t0 > timeout:
+                return batch_info[:i], batch_data[:i]
+
+            info = await self._fetch_next_into(batch_data[i])
+            self._track_seq_num(info)
+            set_batch_info(batch_info, i, info, self._receive_time(info))
+
+        return batch_info, batch_data
+
+    async def stream(self, config=None):
+        """Yields ``(info, data)`` until streaming is stopped
+
+        Streaming is started if needed. Leaving the loop does not stop
+        streaming, use :meth:`stop_streaming` or :meth:`disconnect` for that.
+        """
+
+        if not self._streaming_started:
+            await self.start_streaming(config)
+
+        while self._streaming_started:
+            yield await self.get_next()
+
+    async def stop_streaming(self):
+        if not self._streaming_started:
+            raise ClientError("not streaming")
+
+        await self._stop_streaming()
+        self._streaming_started = False
+
+    async def disconnect(self):
+        if not self._connected:
+            raise ClientError("not connected")
+
+        if self._streaming_started:
+            await self.stop_streaming()
+
+        await self._disconnect()
+        self._connected = False
+        self._session_setup_done = False
+
+    async def _fetch_next(self):
+        if not self.metrics:
+            return await self._get_next()
+
+        t0 = perf_counter()
+        info, data = await self._get_next()
+        self._count_decoded(info, t0)
+        return info, data
+
+    async def _fetch_next_into(self, out):
+        if not self.metrics:
+            return await self._get_next_into(out)
+
+        t0 = perf_counter()
+        info = await self._get_next_into(out)
+        self._count_decoded(info, t0)
+        return info
+
+    @abstractmethod
+    async def _connect(self):
+        pass
+
+    @abstractmethod
+    async def _setup_session(self, config):
+        pass
+
+    async def _reconfigure(self, config):
+        return await self._setup_session(config)
+
+    @abstractmethod
+    async def _start_streaming(self):
+        pass
+
+    @abstractmethod
+    async def _get_next(self):
+        pass
+
+    async def _get_next_into(self, out):
+        """Like _get_next, but decodes the data into out and only returns the info"""
+
+        info, data = await self._get_next()
+        out[...] = data
+        return info
+
+    @abstractmethod
+    async def _stop_streaming(self):
+        pass
+
+    @abstractmethod
+    async def _disconnect(self):
+        pass
+
+
+class ExecutorAsyncClient(BaseAsyncClient):
+    """asyncio adapter for blocking clients
+
+    The blocking client's calls are run in a worker thread dedicated to this
+    client, so that a slow sensor does not hold up the others.
+    """
+
+    def __init__(self, client, **kwargs):
+        kwargs.setdefault("squeeze", client.squeeze)
+        kwargs.setdefault("output_dtype", client.output_dtype)
+        super().__init__(**kwargs)
+        self._client = client
+        self._executor = None
+
+    async def _run(self, fun, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, fun, *args)
+
+    async def _connect(self):
+        return await self._run(self._client._connect)
+
+    async def _setup_session(self, config):
+        self._client.squeeze = self.squeeze
+        self._client.output_dtype = self.output_dtype
+        return await self._run(self._client._setup_session, config)
+
+    async def _reconfigure(self, config):
+        self._client.squeeze = self.squeeze
+        self._client.output_dtype = self.output_dtype
+        return await self._run(self._client._reconfigure, config)
+
+    async def _start_streaming(self):
+        self._client._pending_receive = None
+        self._client._last_seq_num = None
+        await self._run(self._client._start_streaming)
+
+    async def _get_next(self):
+        return await self._run(self._get_next_blocking)
+
+    async def _get_next_into(self, out):
+        return await self._run(self._get_next_into_blocking, out)
+
+    def _get_next_blocking(self):
+        info, data = self._client._fetch_next()
+        self._client._track_seq_num(info)
+        return info, data
+
+    def _get_next_into_blocking(self, out):
+        info = self._client._fetch_next_into(out)
+        self._client._track_seq_num(info)
+        return info
+
+    def _track_seq_num(self, info):
+        # tracked by the blocking client as the frame is fetched
+        pass
+
+    async def _stop_streaming(self):
+        await self._run(self._client._stop_streaming)
+
+    async def _disconnect(self):
+        try:
+            await self._run(self._client._disconnect)
+        finally:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
 class ClientError(Exception):
     pass
 
 
+def check_version_info(info):
+    try:
+        log.info("reported version: {}".format(info["version_str"]))
+
+        if info["strict_version"] < StrictVersion(SDK_VERSION):
+            log.warning("old server version - please upgrade server")
+        elif info["strict_version"] > StrictVersion(SDK_VERSION):
+            log.warning("new server version - please upgrade client")
+    except KeyError:
+        log.warning("could not read software version (might be too old)")
+
+
+def check_session_info(config, session_info):
+    try:
+        start_ok = abs(config.range_start - session_info["actual_range_start"]) < 0.01
+        len_ok = abs(config.range_length - session_info["actual_range_length"]) < 0.01
+    except (AttributeError, KeyError, TypeError):
+        pass
+    else:
+        if not start_ok or not len_ok:
+            log.warning("actual measured range differs from the requested")
+
+
+def check_output_dtype(output_dtype):
+    if output_dtype not in OUTPUT_DTYPES:
+        raise ValueError("unknown output dtype {}".format(output_dtype))
+
+
+def add_raw_scale_info(config, session_info, output_dtype):
+    """Adds the scale and offset of the raw output to the session info"""
+
+    if output_dtype != "raw" or session_info is None:
+        return
+
+    try:
+        scale, offset = RAW_SCALE_AND_OFFSET[config.mode]
+    except (AttributeError, KeyError):
+        return
+
+    session_info["raw_scale"] = scale
+    session_info["raw_offset"] = offset
+
+
+def get_raw_dtype(mode, byte_order="="):
+    """Returns the dtype of the raw output of the mode, in the given byte order"""
+
+    return np.dtype(RAW_DTYPES[mode]).newbyteorder(byte_order)
+
+
+def encode_raw(data, mode):
+    """Converts float output to the raw output of the mode, rounding it"""
+
+    scale, offset = RAW_SCALE_AND_OFFSET[mode]
+    raw = np.asarray(data) / scale - offset
+    if np.iscomplexobj(raw):
+        raw = np.stack((raw.real, raw.imag), axis=-1)
+
+    raw_dtype = np.dtype(RAW_DTYPES[mode])
+    if raw_dtype.kind == "f":
+        return raw.astype(raw_dtype)
+
+    limits = np.iinfo(raw_dtype)
+    return np.clip(np.round(raw), limits.min, limits.max).astype(raw_dtype)
+
+
+def decode_raw(raw, mode, output_dtype="float64"):
+    """Converts raw output of the mode to float output
+
+    Gives the same result as the decoding of the links, for any number of
+    frames at once.
+    """
+
+    scale, offset = RAW_SCALE_AND_OFFSET[mode]
+    float_dtype = "float32" if output_dtype == "float32" else "float"
+    complex_dtype = "complex64" if output_dtype == "float32" else "complex"
+
+    raw = np.asarray(raw)
+    if mode == "iq":
+        out = np.empty(raw.shape[:-1], dtype=complex_dtype)
+        out.real = raw[..., 0]
+        out.imag = raw[..., 1]
+    else:
+        out = raw.astype(float_dtype)
+
+    if offset:
+        out += offset
+    if scale != 1:
+        out *= scale
+
+    return out
+
+
+def decode_into(raw, out=None, dtype="float"):
+    """Converts decoded samples to dtype, or copies them into out if given"""
+
+    if out is None:
+        return raw.astype(dtype)
+
+    out[...] = raw
+    return out
+
+
+def set_batch_info(batch_info, i, info, timestamp):
+    rows = batch_info[i:i+1].reshape(-1)
+    infos = [info] if isinstance(info, dict) else info
+    rows["sequence_number"] = [d.get("sequence_number", -1) for d in infos]
+    rows["data_saturated"] = [d.get("data_saturated", False) for d in infos]
+    rows["frames_lost_since_last"] = [d.get("frames_lost_since_last", 0) for d in infos]
+    rows["timestamp"] = timestamp
+
+
 def decode_version_str(version: str):
     if "-" in version:
         strict_version = StrictVersion(version.split("-")[0])
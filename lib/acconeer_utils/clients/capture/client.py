@@ -0,0 +1,248 @@
+import logging
+import mmap
+import os
+from time import time, sleep
+
+from acconeer_utils.clients.base import BaseClient, ClientError, decode_version_str
+from acconeer_utils.clients.capture import protocol
+
+
+log = logging.getLogger(__name__)
+
+
+class RecordingClient(BaseClient):
+    """Wraps a client and appends its raw stream frames to a capture file
+
+    Each frame is written with the host time it was received, before it is
+    decoded, so a capture can be replayed with :class:`ReplayClient` and
+    decoded again bit for bit. Every session setup starts a new session in
+    the file. The wrapped client should not be used directly while wrapped.
+    """
+
+    def __init__(self, client, path, **kwargs):
+        if client.FRAME_FORMAT not in protocol.FRAME_FORMATS:
+            raise ClientError("{} can't be recorded".format(type(client).__name__))
+
+        kwargs.setdefault("squeeze", client.squeeze)
+        kwargs.setdefault("output_dtype", client.output_dtype)
+        super().__init__(**kwargs)
+
+        self.path = path
+        self._client = client
+        self._file = None
+        self._version_str = None
+
+    def _connect(self):
+        info = self._client._connect()
+        self._version_str = (info or {}).get("version_str")
+
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(protocol.MAGIC)
+
+        self._client._frame_tap = self._write_frame
+        self._client.metrics = self.metrics
+        return info
+
+    def _setup_session(self, config):
+        self._sync_client()
+        info = self._client._setup_session(config)
+        self._write_session(config, info)
+        return info
+
+    def _reconfigure(self, config):
+        self._sync_client()
+        info = self._client._reconfigure(config)
+        self._write_session(config, info)
+        return info
+
+    def _start_streaming(self):
+        self._client._start_streaming()
+
+    def _get_next(self):
+        frame = self._client._get_next()
+        self._take_pending_receive()
+        return frame
+
+    def _get_next_into(self, out):
+        info = self._client._get_next_into(out)
+        self._take_pending_receive()
+        return info
+
+    def _take_pending_receive(self):
+        # The wrapped client reports the frame received, and this client it decoded
+        self._pending_receive = self._client._pending_receive
+        self._client._pending_receive = None
+
+    def _stop_streaming(self):
+        self._client._stop_streaming()
+        self._file.flush()
+
+    def _disconnect(self):
+        self._client._frame_tap = None
+        try:
+            self._client._disconnect()
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _sync_client(self):
+        self._client.squeeze = self.squeeze
+        self._client.output_dtype = self.output_dtype
+
+    def _write_session(self, config, info):
+        session = {
+            "frame_format": self._client.FRAME_FORMAT,
+            "mode": getattr(config, "mode", None),
+            "config": protocol.encode_config(config),
+            "session_info": info,
+            "version_str": self._version_str,
+        }
+        self._write_record(protocol.SESSION_RECORD, protocol.encode_session(session))
+
+    def _write_frame(self, *chunks):
+        self._write_record(protocol.FRAME_RECORD, *chunks)
+
+    def _write_record(self, record_type, *chunks):
+        length = sum(len(chunk) for chunk in chunks)
+        self._file.write(protocol.pack_record_header(record_type, time(), length))
+        for chunk in chunks:
+            self._file.write(chunk)
+
+
+class ReplayClient(BaseClient):
+    """Replays a capture file written by :class:`RecordingClient`
+
+    The recorded frames are decoded with the same functions as the recording
+    client uses, with this client's squeeze and output dtype. With pace set,
+    frames are returned at the rate they were recorded, otherwise as fast as
+    they can be decoded. Each session setup moves on to the next recorded
+    session, using its recorded config if none is given. When the frames of
+    a session run out, a :class:`ClientError` is raised, or with loop set,
+    the session starts over.
+    """
+
+    def __init__(self, path, pace=False, loop=False, **kwargs):
+        super().__init__(**kwargs)
+
+        self.path = path
+        self.pace = pace
+        self.loop = loop
+
+        self._mmap = None
+        self._sessions = None
+        self._next_session = 0
+        self._session = None
+        self._frames = None
+        self._frame_index = 0
+        self._pace_offset = None
+        self._decoder = None
+
+    @property
+    def recorded_configs(self):
+        """The configs of the recorded sessions, None where unknown"""
+
+        if self._sessions is None:
+            raise ClientError("not connected")
+
+        return [protocol.decode_config(s["config"]) for s, _ in self._sessions]
+
+    def setup_session(self, config=None):
+        if not self._connected:
+            self.connect()
+
+        if config is None and self._next_session < len(self._sessions):
+            session, _ = self._sessions[self._next_session]
+            config = protocol.decode_config(session["config"])
+
+        return super().setup_session(config)
+
+    def _connect(self):
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ClientError("empty capture file")
+
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        sessions = []
+        for record in protocol.iter_records(self._mmap):
+            if record.type == protocol.SESSION_RECORD:
+                sessions.append((protocol.decode_session(record.data), []))
+            elif record.type == protocol.FRAME_RECORD:
+                if not sessions:
+                    raise ClientError("frame before session in capture file")
+                sessions[-1][1].append((record.timestamp, record.data))
+
+        if not sessions:
+            raise ClientError("no sessions in capture file")
+
+        self._sessions = sessions
+        self._next_session = 0
+
+        version_str = sessions[0][0].get("version_str")
+        return decode_version_str(version_str) if version_str else {}
+
+    def _setup_session(self, config):
+        if self._next_session >= len(self._sessions):
+            raise ClientError("no more sessions in capture file")
+
+        session, frames = self._sessions[self._next_session]
+        self._next_session += 1
+
+        if session["mode"] and getattr(config, "mode", session["mode"]) != session["mode"]:
+            raise ClientError("config mode differs from the recorded mode")
+
+        self._session = session
+        self._frames = frames
+        return dict(session["session_info"])
+
+    def _start_streaming(self):
+        self._decoder = protocol.FrameDecoder(self._session, self.squeeze, self.output_dtype)
+        self._frame_index = 0
+        self._pace_offset = None
+
+    def _get_next(self):
+        return self._decoder.decode(self._next_frame())
+
+    def _get_next_into(self, out):
+        info, _ = self._decoder.decode(self._next_frame(), out)
+        return info
+
+    def _next_frame(self):
+        if self._frame_index >= len(self._frames):
+            if not self.loop or not self._frames:
+                raise ClientError("end of recorded session")
+
+            self._frame_index = 0
+            self._pace_offset = None
+            self._last_seq_num = None
+
+        timestamp, frame = self._frames[self._frame_index]
+        self._frame_index += 1
+
+        if self.pace:
+            now = time()
+            if self._pace_offset is None:
+                self._pace_offset = now - timestamp
+
+            delay = timestamp + self._pace_offset - now
+            if delay > 0:
+                sleep(delay)
+
+        return frame
+
+    def _stop_streaming(self):
+        pass
+
+    def _disconnect(self):
+        self._session = None
+        self._frames = None
+        self._decoder = None
+        self._sessions = None
+
+        try:
+            self._mmap.close()
+        except BufferError:
+            log.debug("capture file still referenced, leaving it mapped")
+
+        self._mmap = None
@@ -0,0 +1,174 @@
+"""Raw frame capture file format
+
+A capture file starts with :data:`MAGIC` and is followed by records, each
+being a header packed as :data:`RECORD_HEADER` (record type, host timestamp
+and data length) and the data. A session record holds the JSON encoded
+session metadata, and applies to the frame records following it. Frame
+records hold the raw stream frames exactly as the client received them:
+
+* ``"json"`` - the JSON header line followed by the binary payload
+* ``"reg_uart"`` - the register protocol packet, without the framing
+* ``"reg_spi"`` - the sweep info registers followed by the output buffer
+
+Files are only ever appended to, so a capture that was cut short is
+readable up to its last complete record.
+"""
+
+from collections import namedtuple
+import json
+import struct
+
+import numpy as np
+
+from acconeer_utils.clients import configs
+from acconeer_utils.clients.base import ClientError
+from acconeer_utils.clients.json import protocol as json_protocol
+from acconeer_utils.clients.reg import protocol as reg_protocol
+from acconeer_utils.clients.reg.client import decode_spi_frame, get_sweep_info_decoders
+
+
+MAGIC = b"ACCCAP1\n"
+RECORD_HEADER = struct.Struct("<BdI")
+
+SESSION_RECORD = 1
+FRAME_RECORD = 2
+
+FRAME_FORMATS = ["json", "reg_uart", "reg_spi"]
+
+Record = namedtuple("Record", ["type", "timestamp", "data"])
+
+
+def pack_record_header(record_type, timestamp, length):
+    return RECORD_HEADER.pack(record_type, timestamp, length)
+
+
+def iter_records(buf):
+    """Yields the records in a capture file read or mapped into buf
+
+    The data of the records are memoryviews into buf. A truncated last
+    record is ignored.
+    """
+
+    if bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ClientError("not a capture file")
+
+    buf = memoryview(buf)
+    i = len(MAGIC)
+    while i + RECORD_HEADER.size <= len(buf):
+        record_type, timestamp, length = RECORD_HEADER.unpack_from(buf, i)
+        i += RECORD_HEADER.size
+        if i + length > len(buf):
+            break
+
+        yield Record(record_type, timestamp, buf[i:i+length])
+        i += length
+
+
+def encode_session(session):
+    return json.dumps(session, default=_to_json).encode("utf-8")
+
+
+def decode_session(data):
+    return json.loads(str(data, "utf-8"))
+
+
+def _to_json(x):
+    if isinstance(x, np.generic):
+        return x.item()
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+
+    return str(x)
+
+
+def encode_config(config):
+    if not isinstance(config, configs.BaseSessionConfig):
+        return None
+
+    return {"class": type(config).__name__, "attrs": vars(config)}
+
+
+def decode_config(encoded):
+    if encoded is None:
+        return None
+
+    config = getattr(configs, encoded["class"])()
+    for k, v in encoded["attrs"].items():
+        object.__setattr__(config, k, v)
+
+    return config
+
+
+class FrameDecoder:
+    """Decodes raw frames of a recorded session like the recording client did"""
+
+    def __init__(self, session, squeeze, output_dtype):
+        self.frame_format = session["frame_format"]
+        self.squeeze = squeeze
+        self.output_dtype = output_dtype
+        self.num_subsweeps = session["session_info"].get("number_of_subsweeps")
+
+        if self.frame_format == "json":
+            self.decode = self._decode_json
+        elif self.frame_format in ["reg_uart", "reg_spi"]:
+            self.mode = reg_protocol.get_mode(session["mode"])
+            if self.frame_format == "reg_uart":
+                self.decode = self._decode_reg_uart
+            else:
+                self.sweep_info_decoders = get_sweep_info_decoders(self.mode)
+                self.decode = self._decode_reg_spi
+        else:
+            raise ClientError("unknown frame format {}".format(self.frame_format))
+
+    def _decode_json(self, frame, out=None):
+        i = find_header_end(frame)
+        header = json_protocol.unpack(frame[:i])
+
+        status = header["status"]
+        if status == "end":
+            raise ClientError("session ended")
+        elif status != "ok":
+            raise ClientError("server error")
+
+        payload = frame[i:] or None
+        args = (header, payload, self.squeeze, self.num_subsweeps, out, self.output_dtype)
+        return json_protocol.decode_stream_frame(*args)
+
+    def _decode_reg_uart(self, frame, out=None):
+        packet = reg_protocol.unpack_packet(frame)
+
+        if not isinstance(packet, reg_protocol.UnpackedStreamData):
+            raise ClientError("got unexpected type of frame")
+
+        info, _ = reg_protocol.decode_result_info(packet.result_info, self.mode)
+
+        args = (self.mode, self.num_subsweeps, self._squeezed(out), self.output_dtype)
+        data = reg_protocol.decode_output_buffer(packet.buffer, *args)
+        return self._unsqueeze(info, data)
+
+    def _decode_reg_spi(self, frame, out=None):
+        args = (self.mode, self.num_subsweeps, self._squeezed(out), self.output_dtype)
+        info, data = decode_spi_frame(frame, self.sweep_info_decoders, *args)
+        return self._unsqueeze(info, data)
+
+    def _squeezed(self, out):
+        return out if (out is None or self.squeeze) else out[0]
+
+    def _unsqueeze(self, info, data):
+        if self.squeeze:
+            return info, data
+        else:
+            return [info], np.expand_dims(data, 0)
+
+
+def find_header_end(frame):
+    """Returns the length of the JSON header line at the start of frame"""
+
+    n = 256
+    while True:
+        i = bytes(frame[:n]).find(b"\n")
+        if i >= 0:
+            return i + 1
+        if n >= len(frame):
+            raise ClientError("invalid frame (no header)")
+        n *= 4
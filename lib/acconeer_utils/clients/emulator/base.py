@@ -0,0 +1,206 @@
+from abc import ABCMeta, abstractmethod
+import logging
+import os
+import select
+import socket
+import threading
+from time import time
+
+import numpy as np
+
+from acconeer_utils.clients.mock.client import MockClient
+
+
+log = logging.getLogger(__name__)
+
+
+class FrameSource:
+    """Generates the encoded frames of a session with the mock models
+
+    A bank of frames is generated and encoded up front, so that serving a
+    frame costs little more than sending it. Frames are due at the frame
+    rate, which defaults to the sweep rate of the config, or always with
+    paced set to False.
+
+    If given, num_depths overrides the number of points per (sub)sweep,
+    repeating the mocked data, which sets the payload size of the session.
+    """
+
+    FRAME_BANK_SIZE = 64
+
+    def __init__(self, config, raw_dtype, frame_rate=None, paced=True, num_depths=None,
+                 seed=None):
+        client = MockClient(
+            paced=False,
+            seed=seed,
+            frame_bank_size=self.FRAME_BANK_SIZE,
+            output_dtype="raw",
+            squeeze=False,
+        )
+        self.session_info = client.setup_session(config)
+        if config.mode == "sparse":
+            self.session_info["number_of_subsweeps"] = config.number_of_subsweeps
+
+        client.start_streaming()
+        frames = [client.get_next()[1] for _ in range(self.FRAME_BANK_SIZE)]
+        client.disconnect()
+
+        depth_axis = -2 if config.mode == "iq" else -1
+        if num_depths is not None:
+            idxs = np.arange(num_depths) % frames[0].shape[depth_axis]
+            frames = [np.take(frame, idxs, axis=depth_axis) for frame in frames]
+
+            data_length = num_depths
+            if config.mode == "sparse":
+                data_length *= config.number_of_subsweeps
+            self.session_info["data_length"] = data_length
+
+        self.mode = config.mode
+        self.num_sensors = len(config.sensor)
+        self.num_depths = frames[0].shape[depth_axis]
+        self.payloads = [frame.astype(raw_dtype).tobytes() for frame in frames]
+        self.frame_rate = frame_rate or config.sweep_rate
+        self.paced = paced
+        self.sequence_number = 0
+        self._t0 = None
+
+    def start(self):
+        self.sequence_number = 0
+        self._t0 = time()
+
+    def time_to_next(self):
+        """Returns the time until the next frame is due, zero if already due"""
+
+        if not self.paced:
+            return 0
+
+        t = self._t0 + (self.sequence_number + 1) / self.frame_rate
+        return max(t - time(), 0)
+
+    def next_payload(self):
+        self.sequence_number += 1
+        return self.payloads[(self.sequence_number - 1) % len(self.payloads)]
+
+
+class EmulatorServer(metaclass=ABCMeta):
+    """Serves an emulated module from a background thread
+
+    Subclasses implement :meth:`_serve`, which is called with a connection
+    (anything with ``fileno``, ``recv`` and ``sendall``) and should return
+    when it is closed or :attr:`stopped` is set.
+
+    With a corruption probability, each stream frame is corrupted with that
+    probability, drawn from a random generator seeded with seed.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, frame_rate=None, paced=True, num_depths=None, corruption=0.0,
+                 seed=None):
+        self.frame_rate = frame_rate
+        self.paced = paced
+        self.num_depths = num_depths
+        self.corruption = corruption
+        self.seed = seed
+        self.num_frames_sent = 0
+        self.num_frames_corrupted = 0
+        self.stopped = False
+
+        self._rng = np.random.RandomState(seed)
+        self._threads = []
+        self._closables = []
+
+    def listen(self, host="127.0.0.1", port=0):
+        """Starts serving TCP connections, one at a time, and returns the address"""
+
+        server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_sock.bind((host, port))
+        server_sock.listen(1)
+        self._closables.append(server_sock)
+        self._start_thread(self._accept_loop, server_sock)
+        return server_sock.getsockname()
+
+    def stop(self):
+        self.stopped = True
+        for closable in self._closables:
+            try:
+                closable.close()
+            except OSError:
+                pass
+
+        for thread in self._threads:
+            thread.join(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def make_source(self, config, raw_dtype):
+        return FrameSource(
+            config,
+            raw_dtype,
+            frame_rate=self.frame_rate,
+            paced=self.paced,
+            num_depths=self.num_depths,
+            seed=self.seed,
+        )
+
+    def should_corrupt(self):
+        return self.corruption > 0 and self._rng.random_sample() < self.corruption
+
+    def wait_readable(self, conn, timeout):
+        timeout = self.POLL_INTERVAL if timeout is None else min(timeout, self.POLL_INTERVAL)
+        readable, _, _ = select.select([conn], [], [], timeout)
+        return bool(readable)
+
+    def _start_thread(self, target, *args):
+        thread = threading.Thread(target=self._run, args=(target, ) + args, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _run(self, target, *args):
+        try:
+            target(*args)
+        except (OSError, ValueError) as e:
+            if not self.stopped:
+                log.warning("emulator stopped: {}".format(e))
+
+    def _accept_loop(self, server_sock):
+        while not self.stopped:
+            conn, _ = server_sock.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._closables.append(conn)
+            try:
+                self._serve(conn)
+            finally:
+                conn.close()
+                self._closables.remove(conn)
+
+    @abstractmethod
+    def _serve(self, conn):
+        pass
+
+
+class FdConnection:
+    """Socket-like wrapper of a file descriptor, such as a pty master"""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def fileno(self):
+        return self.fd
+
+    def recv(self, num_bytes):
+        return os.read(self.fd, num_bytes)
+
+    def sendall(self, data):
+        view = memoryview(data)
+        while view:
+            n = os.write(self.fd, view)
+            view = view[n:]
+
+    def close(self):
+        os.close(self.fd)
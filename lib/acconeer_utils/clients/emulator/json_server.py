@@ -0,0 +1,126 @@
+import logging
+
+from acconeer_utils import SDK_VERSION
+from acconeer_utils.clients import configs
+from acconeer_utils.clients.base import ClientError
+from acconeer_utils.clients.emulator.base import EmulatorServer
+from acconeer_utils.clients.json import protocol
+
+
+log = logging.getLogger(__name__)
+
+CONFIG_CLASSES = {
+    "power_bins_data": configs.PowerBinServiceConfig,
+    "envelope_data": configs.EnvelopeServiceConfig,
+    "iq_data": configs.IQServiceConfig,
+    "sparse_data": configs.SparseServiceConfig,
+}
+
+INFO_KEY_TO_SESSION_HEADER_MAP = {
+    v: k for k, v in protocol.SESSION_HEADER_TO_INFO_KEY_MAP.items() if v is not None
+}
+
+
+class JSONServer(EmulatorServer):
+    """Emulates the streaming server the JSON client talks to over TCP
+
+    Handles the version and sensor count queries, session setup for the
+    power bin, envelope, IQ and sparse services, and streaming in the
+    ``json+binary`` format. Corrupted frames get their payload bytes
+    scrambled, keeping the framing intact like TCP would.
+    """
+
+    def __init__(self, board_sensor_count=4, **kwargs):
+        super().__init__(**kwargs)
+        self.board_sensor_count = board_sensor_count
+
+    def _serve(self, conn):
+        buf = bytearray()
+        source = None
+        streaming = False
+
+        while not self.stopped:
+            timeout = source.time_to_next() if streaming else None
+            if self.wait_readable(conn, timeout):
+                data = conn.recv(4096)
+                if not data:
+                    return
+
+                buf.extend(data)
+                while b"\n" in buf:
+                    i = buf.index(b"\n") + 1
+                    cmd = protocol.unpack(buf[:i])
+                    del buf[:i]
+
+                    if cmd["cmd"] == "start_streaming" and source is not None:
+                        source.start()
+                        streaming = True
+                        self._send(conn, {"status": "start"})
+                    elif cmd["cmd"] == "stop_streaming":
+                        streaming = False
+                        self._send(conn, {"status": "end"})
+                    else:
+                        source = self._handle_cmd(conn, cmd) or source
+            elif streaming and source.time_to_next() == 0:
+                self._send_frame(conn, source)
+
+    def _handle_cmd(self, conn, cmd):
+        name = cmd["cmd"]
+
+        if name == "get_version":
+            self._send(conn, {"status": "ok", "message": "server version v" + SDK_VERSION})
+        elif name == "get_board_sensor_count":
+            self._send(conn, {"status": "ok", "message": str(self.board_sensor_count)})
+        elif name in CONFIG_CLASSES:
+            try:
+                config = get_config_for_cmd(cmd)
+                source = self.make_source(config, protocol.get_wire_dtype(config.mode))
+            except (ClientError, AttributeError, KeyError, TypeError, ValueError) as e:
+                log.debug("session setup failed: {}".format(e))
+                self._send(conn, {"status": "error", "message": str(e)})
+                return None
+
+            header = {"status": "ok"}
+            for k, v in source.session_info.items():
+                header[INFO_KEY_TO_SESSION_HEADER_MAP.get(k, k)] = v
+
+            self._send(conn, header)
+            return source
+        else:
+            self._send(conn, {"status": "error", "message": "unknown command"})
+
+        return None
+
+    def _send(self, conn, header, payload=b""):
+        header["payload_size"] = len(payload)
+        conn.sendall(protocol.pack(header) + payload)
+
+    def _send_frame(self, conn, source):
+        payload = source.next_payload()
+
+        if self.should_corrupt():
+            payload = bytearray(payload)
+            i = self._rng.randint(len(payload))
+            payload[i] ^= 0xFF
+            self.num_frames_corrupted += 1
+
+        header = {
+            "status": "ok",
+            "type": protocol.MODE_TO_CMD_MAP[source.mode],
+            "data_sensors": source.num_sensors,
+            "data_size": source.num_depths,
+            "sequence_number": [source.sequence_number] * source.num_sensors,
+            "data_saturated": [False] * source.num_sensors,
+        }
+        self._send(conn, header, payload)
+        self.num_frames_sent += 1
+
+
+def get_config_for_cmd(cmd):
+    config = CONFIG_CLASSES[cmd["cmd"]]()
+
+    for pair in protocol.KEY_AND_CONFIG_ATTR_PAIRS:
+        if pair.key in cmd and hasattr(config, pair.config_attr):
+            setattr(config, pair.config_attr, cmd[pair.key])
+
+    return config
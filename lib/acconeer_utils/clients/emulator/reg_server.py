@@ -0,0 +1,236 @@
+import logging
+import os
+
+from acconeer_utils import SDK_VERSION
+from acconeer_utils.clients import configs
+from acconeer_utils.clients.base import ClientError
+from acconeer_utils.clients.emulator.base import EmulatorServer, FdConnection
+from acconeer_utils.clients.reg import protocol, utils
+
+try:
+    import pty
+    import tty
+except ImportError:
+    pty = None
+
+
+log = logging.getLogger(__name__)
+
+CONFIG_CLASSES = {
+    "power_bin": configs.PowerBinServiceConfig,
+    "envelope": configs.EnvelopeServiceConfig,
+    "iq": configs.IQServiceConfig,
+    "sparse": configs.SparseServiceConfig,
+}
+
+PRODUCT = protocol.PRODUCTS[0]
+
+
+class RegServer(EmulatorServer):
+    """Emulates a module speaking the register protocol
+
+    Serves either a pty, see :meth:`open_pty`, which a client opens like a
+    serial port, or TCP connections, see :meth:`listen`. Handles register
+    reads and writes, buffer reads (the version buffer), GPIO reads and
+    writes, and streaming of stream packets after activation.
+
+    Corrupted stream frames have a few bytes dropped from their packet, like
+    an overrun UART, which the client has to recover from.
+    """
+
+    MAX_NUM_DROPPED_BYTES = 4
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.gpio = {}
+
+    def open_pty(self):
+        """Starts serving a new pty and returns the path of it"""
+
+        if pty is None:
+            raise ClientError("pty is not supported on this platform")
+
+        master, slave = pty.openpty()
+        tty.setraw(master)
+        tty.setraw(slave)
+
+        # the slave is kept open so that the master stays usable between clients
+        self._closables.append(FdConnection(slave))
+        conn = FdConnection(master)
+        self._closables.append(conn)
+        self._start_thread(self._serve, conn)
+        return os.ttyname(slave)
+
+    def _serve(self, conn):
+        session = Session()
+        buf = bytearray()
+
+        while not self.stopped:
+            timeout = session.source.time_to_next() if session.streaming else None
+            if self.wait_readable(conn, timeout):
+                data = conn.recv(4096)
+                if not data:
+                    return
+
+                buf.extend(data)
+                for packet in extract_packets(buf):
+                    res = self._handle_packet(session, packet)
+                    if res is not None:
+                        conn.sendall(protocol.insert_packet_into_frame(res))
+            elif session.streaming and session.source.time_to_next() == 0:
+                self._send_frame(conn, session)
+
+    def _handle_packet(self, session, packet):
+        packet_type = packet[0]
+
+        if packet_type == protocol.REG_WRITE_REQUEST:
+            addr = packet[1]
+            enc_val = bytes(packet[2:])
+            session.regs[addr] = enc_val
+            if addr == protocol.get_addr_for_reg("main_control"):
+                self._handle_main_control(session, protocol.decode_reg_val(addr, enc_val))
+
+            reg_val = protocol.UnpackedRegVal(addr, enc_val)
+            return protocol.pack_packet(protocol.UnpackedRegWriteResponse(reg_val))
+        elif packet_type == protocol.REG_READ_REQUEST:
+            addr = packet[1]
+            enc_val = session.regs.get(addr, bytes(protocol.REG_SIZE))
+            reg_val = protocol.UnpackedRegVal(addr, enc_val)
+            return protocol.pack_packet(protocol.UnpackedRegReadResponse(reg_val))
+        elif packet_type == protocol.BUF_READ_REQUEST:
+            version = "v{}".format(SDK_VERSION).encode("ascii")
+            return bytearray([protocol.BUF_READ_RESPONSE, packet[1]]) + version
+        elif packet_type == protocol.GPIO_READ:
+            pin = packet[1]
+            return bytearray([protocol.GPIO_READ, pin, 0, self.gpio.get(pin, 0)])
+        elif packet_type == protocol.GPIO_WRITE:
+            pin, val = packet[1], packet[2]
+            self.gpio[pin] = val
+            return bytearray([protocol.GPIO_WRITE, pin, 0, val])
+
+        log.debug("ignoring packet of unknown type {}".format(packet_type))
+        return None
+
+    def _handle_main_control(self, session, main_control):
+        if main_control in ["stop", "create", "create_and_activate"]:
+            session.streaming = False
+
+        if main_control in ["create", "create_and_activate"]:
+            session.create(self)
+
+        if main_control in ["activate", "create_and_activate"] and session.source:
+            session.source.start()
+            session.streaming = True
+
+    def _send_frame(self, conn, session):
+        source = session.source
+        payload = source.next_payload()
+
+        packet = bytearray([protocol.STREAM_PACKET])
+        result_info = session.encode_result_info(source.sequence_number)
+        for part_type, part in [(protocol.STREAM_RESULT_INFO, result_info),
+                                (protocol.STREAM_BUFFER, payload)]:
+            packet.append(part_type)
+            packet.extend(len(part).to_bytes(protocol.LEN_FIELD_SIZE, protocol.BO))
+            packet.extend(part)
+
+        frame = protocol.insert_packet_into_frame(packet)
+
+        if self.should_corrupt():
+            n = self._rng.randint(1, self.MAX_NUM_DROPPED_BYTES + 1)
+            i = self._rng.randint(1 + protocol.LEN_FIELD_SIZE, len(frame) - 1 - n)
+            del frame[i:i+n]
+            self.num_frames_corrupted += 1
+
+        conn.sendall(frame)
+        self.num_frames_sent += 1
+
+
+class Session:
+    """Register state of an emulated module"""
+
+    def __init__(self):
+        self.regs = {}
+        self.source = None
+        self.streaming = False
+        self.mode = protocol.NO_MODE
+        self.set_reg("product_id", PRODUCT.id)
+        self.set_reg("product_version", protocol.DEV_VERSION)
+
+    def set_reg(self, name, val):
+        reg = protocol.get_reg(name, self.mode)
+        self.regs[reg.addr] = protocol.encode_reg_val(reg, val)
+
+    def create(self, server):
+        self.source = None
+
+        try:
+            enc_mode = self.regs[protocol.get_addr_for_reg("mode_selection")]
+            self.mode = protocol.get_mode(protocol.decode_reg_val("mode_selection", enc_mode))
+            config = self.get_config()
+            self.source = server.make_source(config, protocol.get_wire_dtype(self.mode))
+        except (ClientError, protocol.ProtocolError, KeyError, TypeError, ValueError) as e:
+            log.debug("session creation failed: {}".format(e))
+            self.set_reg("status", protocol.STATUS_ERROR_ON_SERVICE_CREATION_MASK)
+            return
+
+        self.set_reg("status", 0)
+
+        info = dict(self.source.session_info)
+        info["frequency"] = self.source.frame_rate
+        for reg in utils.get_session_info_regs(self.mode):
+            if info.get(reg.name) is not None:
+                self.set_reg(reg.name, info[reg.name])
+
+        self.sweep_info_regs = utils.get_sweep_info_regs(self.mode)
+
+    def get_config(self):
+        config = CONFIG_CLASSES[self.mode]()
+
+        for addr, enc_val in self.regs.items():
+            try:
+                reg = protocol.get_reg(addr, self.mode)
+            except protocol.ProtocolError:
+                continue
+
+            if reg.config_attr and hasattr(config, reg.config_attr):
+                setattr(config, reg.config_attr, protocol.decode_reg_val(reg, enc_val))
+
+        return config
+
+    def encode_result_info(self, sequence_number):
+        result_info = bytearray()
+        for reg in self.sweep_info_regs:
+            val = sequence_number if reg.name == "sequence_number" else 0
+            result_info.append(reg.addr)
+            result_info.extend(protocol.encode_reg_val(reg, val))
+
+        return result_info
+
+
+def extract_packets(buf):
+    """Yields the complete packets in buf and removes them, skipping garbage"""
+
+    while True:
+        i = buf.find(bytes([protocol.START_MARKER]))
+        if i < 0:
+            buf.clear()
+            return
+
+        del buf[:i]
+
+        if len(buf) < 1 + protocol.LEN_FIELD_SIZE:
+            return
+
+        packet_len = int.from_bytes(buf[1:1+protocol.LEN_FIELD_SIZE], protocol.BO)
+        frame_len = 1 + protocol.LEN_FIELD_SIZE + packet_len + 2
+        if len(buf) < frame_len:
+            return
+
+        frame = bytes(buf[:frame_len])
+        del buf[:frame_len]
+
+        try:
+            yield protocol.extract_packet_from_frame(frame)
+        except protocol.ProtocolError:
+            log.debug("dropping invalid frame")
@@ -1,76 +1,97 @@
-from time import time
-from copy import deepcopy
+from time import perf_counter, time
 import logging
-from distutils.version import StrictVersion
 
-from acconeer_utils.clients.base import BaseClient, ClientError
+from acconeer_utils.clients.base import BaseClient, BaseAsyncClient, ClientError
 from acconeer_utils.clients import links
 from acconeer_utils.clients.json import protocol
-from acconeer_utils.clients.base import decode_version_str
 
 
 log = logging.getLogger(__name__)
 
 
-class JSONClient(BaseClient):
-    def __init__(self, host, **kwargs):
-        super().__init__(**kwargs)
+class JSONClientMixin:
+    """Command and frame handling shared by the blocking and asyncio clients
 
-        self._link = links.SocketLink(host)
+    The clients only differ in how the link is read and written. The
+    commands and the checks of the responses are in
+    :mod:`acconeer_utils.clients.json.protocol`.
+    """
 
+    def _init_json_state(self):
         self._session_cmd = None
         self._session_ready = False
         self._num_subsweeps = None
 
-    def _connect(self):
-        info = {}
+    def _session_initialized(self, header):
+        info = protocol.get_session_info_for_response(header)
+        if info is None:
+            return None
 
-        self._link.connect()
+        log.debug("session initialized")
 
-        cmd = {"cmd": "get_version"}
-        self._send_cmd(cmd)
+        self._session_ready = True
+        self._num_subsweeps = info.get("number_of_subsweeps")
+        return info
 
-        try:
-            header, _ = self._recv_frame()
-        except links.LinkError as e:
-            raise ClientError("no response from server") from e
+    def _decode_stream_frame(self, header, payload, out=None):
+        protocol.check_stream_header(header)
+        args = (header, payload, self.squeeze, self._num_subsweeps, out, self.output_dtype)
+        return protocol.decode_stream_frame(*args)
 
-        log.debug("connected and got a response")
+    def _frame_received(self, packed_header, payload, t0, stream):
+        """Reports a frame read from the link since t0, to the frame tap if streaming"""
 
-        if header["status"] != "ok":
-            raise ClientError("server error while connecting")
+        if not stream:
+            return
 
-        msg = header["message"].lower()
-        log.info("version msg: {}".format(msg))
+        self._count_received(len(packed_header) + (len(payload) if payload else 0), t0)
 
-        startstr = "server version v"
-        if not msg.startswith(startstr):
-            log.warning("server version unknown")
-            return info
+        if self._frame_tap:
+            # links may return views which are only valid until the next recv
+            self._frame_tap(bytes(packed_header), payload or b"")
 
-        server_version_str = msg[len(startstr):].strip()
-        info.update(decode_version_str(server_version_str))
 
-        if info["strict_version"] >= StrictVersion("1.10"):
-            cmd = {"cmd": "get_board_sensor_count"}
-            self._send_cmd(cmd)
-            header, _ = self._recv_frame()
-            msg = header["message"]
-            board_sensor_count = int(msg)
-            info["board_sensor_count"] = board_sensor_count
+class JSONClient(JSONClientMixin, BaseClient):
+    FRAME_FORMAT = "json"
 
-        return info
+    def __init__(self, host, **kwargs):
+        super().__init__(**kwargs)
 
-    def _setup_session(self, config):
-        if isinstance(config, dict):
-            cmd = deepcopy(config)
-            log.warning("setup with raw dict config - you're on your own")
-        else:
-            cmd = protocol.get_dict_for_config(config)
+        self._link = links.SocketLink(host, kwargs.get("socket_port"))
+        self._init_json_state()
+
+    def as_async(self):
+        if self._connected:
+            raise ClientError("can't make an asyncio client from a connected client")
+
+        kwargs = dict(
+            squeeze=self.squeeze,
+            output_dtype=self.output_dtype,
+            socket_port=self._link._port,
+            metrics=self.metrics,
+            on_frames_lost=self.on_frames_lost,
+        )
+        return AsyncJSONClient(self._link._host, **kwargs)
 
-        cmd["output_format"] = "json+binary"
+    def _connect(self):
+        self._link.connect()
 
-        self._session_cmd = cmd
+        try:
+            header, _ = self._request({"cmd": "get_version"})
+        except links.LinkError as e:
+            raise ClientError("no response from server") from e
+
+        log.debug("connected and got a response")
+
+        info = protocol.get_version_info(header)
+        if protocol.has_board_sensor_count(info):
+            header, _ = self._request({"cmd": "get_board_sensor_count"})
+            info["board_sensor_count"] = int(header["message"])
+
+        return info
+
+    def _setup_session(self, config):
+        self._session_cmd = protocol.get_session_cmd(config)
         info = self._init_session()
 
         log.debug("setup session")
@@ -81,39 +102,28 @@ class JSONClient(BaseClient):
         if not self._session_ready:
             self._init_session()
 
-        cmd = {"cmd": "start_streaming"}
-        self._send_cmd(cmd)
-        header, _ = self._recv_frame()
-        if header["status"] != "start":
-            raise ClientError
+        header, _ = self._request({"cmd": "start_streaming"})
+        protocol.check_start_response(header)
 
         log.debug("started streaming")
 
     def _get_next(self):
-        header, payload = self._recv_frame()
-
-        status = header["status"]
-        if status == "end":
-            raise ClientError("session ended")
-        elif status != "ok":
-            raise ClientError("server error")
+        header, payload = self._recv_frame(stream=True)
+        return self._decode_stream_frame(header, payload)
 
-        return protocol.decode_stream_frame(header, payload, self.squeeze, self._num_subsweeps)
+    def _get_next_into(self, out):
+        header, payload = self._recv_frame(stream=True)
+        info, _ = self._decode_stream_frame(header, payload, out)
+        return info
 
     def _stop_streaming(self):
-        cmd = {"cmd": "stop_streaming"}
-        self._send_cmd(cmd)
+        self._send_cmd({"cmd": "stop_streaming"})
 
         t0 = time()
         while time() - t0 < self._link._timeout:
             header, _ = self._recv_frame()
-            status = header["status"]
-            if status == "end":
+            if protocol.is_stop_response(header):
                 break
-            elif status == "ok":  # got streaming data
-                continue
-            else:
-                raise ClientError
         else:
             raise ClientError
 
@@ -123,8 +133,7 @@ class JSONClient(BaseClient):
 
     def _disconnect(self):
         self._link.disconnect()
-        self._session_cmd = None
-        self._session_ready = False
+        self._init_json_state()
 
         log.debug("disconnected")
 
@@ -132,35 +141,144 @@ class JSONClient(BaseClient):
         if self._session_cmd is None:
             raise ClientError
 
-        self._send_cmd(self._session_cmd)
-        header, _ = self._recv_frame()
+        header, _ = self._request(self._session_cmd)
+        info = self._session_initialized(header)
 
-        if header["status"] == "error":
+        if info is None:
             if retry:
                 return self._init_session(retry=False)
             else:
                 raise ClientError("server error while initializing session")
-        elif header["status"] != "ok":
-            raise ClientError("got unexpected header")
 
-        log.debug("session initialized")
-
-        self._session_ready = True
-        info = protocol.get_session_info_for_header(header)
-        self._num_subsweeps = info.get("number_of_subsweeps")
         return info
 
+    def _request(self, cmd_dict):
+        self._send_cmd(cmd_dict)
+        return self._recv_frame()
+
     def _send_cmd(self, cmd_dict):
-        cmd_dict["api_version"] = 2
-        packed = protocol.pack(cmd_dict)
-        self._link.send(packed)
+        self._link.send(protocol.pack_cmd(cmd_dict))
 
-    def _recv_frame(self):
+    def _recv_frame(self, stream=False):
+        t0 = perf_counter()
         packed_header = self._link.recv_until(b'\n')
         header = protocol.unpack(packed_header)
+
         payload_len = header["payload_size"]
         if payload_len > 0:
             payload = self._link.recv(payload_len)
         else:
             payload = None
+
+        self._frame_received(packed_header, payload, t0, stream)
+        return header, payload
+
+
+class AsyncJSONClient(JSONClientMixin, BaseAsyncClient):
+    """asyncio version of :class:`JSONClient` using asyncio streams"""
+
+    def __init__(self, host, **kwargs):
+        super().__init__(**kwargs)
+
+        self._link = links.AsyncSocketLink(host, kwargs.get("socket_port"))
+        self._init_json_state()
+
+    async def _connect(self):
+        await self._link.connect()
+
+        try:
+            header, _ = await self._request({"cmd": "get_version"})
+        except links.LinkError as e:
+            raise ClientError("no response from server") from e
+
+        log.debug("connected and got a response")
+
+        info = protocol.get_version_info(header)
+        if protocol.has_board_sensor_count(info):
+            header, _ = await self._request({"cmd": "get_board_sensor_count"})
+            info["board_sensor_count"] = int(header["message"])
+
+        return info
+
+    async def _setup_session(self, config):
+        self._session_cmd = protocol.get_session_cmd(config)
+        info = await self._init_session()
+
+        log.debug("setup session")
+
+        return info
+
+    async def _start_streaming(self):
+        if not self._session_ready:
+            await self._init_session()
+
+        header, _ = await self._request({"cmd": "start_streaming"})
+        protocol.check_start_response(header)
+
+        log.debug("started streaming")
+
+    async def _get_next(self):
+        header, payload = await self._recv_frame(stream=True)
+        return self._decode_stream_frame(header, payload)
+
+    async def _get_next_into(self, out):
+        header, payload = await self._recv_frame(stream=True)
+        info, _ = self._decode_stream_frame(header, payload, out)
+        return info
+
+    async def _stop_streaming(self):
+        await self._send_cmd({"cmd": "stop_streaming"})
+
+        t0 = time()
+        while time() - t0 < self._link._timeout:
+            header, _ = await self._recv_frame()
+            if protocol.is_stop_response(header):
+                break
+        else:
+            raise ClientError
+
+        self._session_ready = False
+
+        log.debug("stopped streaming")
+
+    async def _disconnect(self):
+        await self._link.disconnect()
+        self._init_json_state()
+
+        log.debug("disconnected")
+
+    async def _init_session(self, retry=True):
+        if self._session_cmd is None:
+            raise ClientError
+
+        header, _ = await self._request(self._session_cmd)
+        info = self._session_initialized(header)
+
+        if info is None:
+            if retry:
+                return await self._init_session(retry=False)
+            else:
+                raise ClientError("server error while initializing session")
+
+        return info
+
+    async def _request(self, cmd_dict):
+        await self._send_cmd(cmd_dict)
+        return await self._recv_frame()
+
+    async def _send_cmd(self, cmd_dict):
+        await self._link.send(protocol.pack_cmd(cmd_dict))
+
+    async def _recv_frame(self, stream=False):
+        t0 = perf_counter()
+        packed_header = await self._link.recv_until(b'\n')
+        header = protocol.unpack(packed_header)
+
+        payload_len = header["payload_size"]
+        if payload_len > 0:
+            payload = await self._link.recv(payload_len)
+        else:
+            payload = None
+
+        self._frame_received(packed_header, payload, t0, stream)
         return header, payload
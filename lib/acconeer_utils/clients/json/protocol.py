@@ -1,9 +1,18 @@
 from collections.abc import Iterable
 from collections import namedtuple
+from copy import deepcopy
+from distutils.version import StrictVersion
 import json
+import logging
 import numpy as np
 
-from acconeer_utils.clients.base import ClientError
+from acconeer_utils.clients.base import (
+    ClientError, decode_into, decode_version_str, get_raw_dtype)
+
+
+log = logging.getLogger(__name__)
+
+API_VERSION = 2
 
 
 KeyConfigAttrPair = namedtuple("KeyConfigAttrPair", ["key", "config_attr", "required"])
@@ -75,6 +84,79 @@ def get_dict_for_config(config):
     return d
 
 
+def get_session_cmd(config):
+    if isinstance(config, dict):
+        cmd = deepcopy(config)
+        log.warning("setup with raw dict config - you're on your own")
+    else:
+        cmd = get_dict_for_config(config)
+
+    cmd["output_format"] = "json+binary"
+    return cmd
+
+
+def get_version_info(header):
+    """Returns the version info in the response to get_version, empty if unknown"""
+
+    if header["status"] != "ok":
+        raise ClientError("server error while connecting")
+
+    msg = header["message"].lower()
+    log.info("version msg: {}".format(msg))
+
+    startstr = "server version v"
+    if not msg.startswith(startstr):
+        log.warning("server version unknown")
+        return {}
+
+    return decode_version_str(msg[len(startstr):].strip())
+
+
+def has_board_sensor_count(version_info):
+    return "strict_version" in version_info and \
+        version_info["strict_version"] >= StrictVersion("1.10")
+
+
+def get_session_info_for_response(header):
+    """Returns the session info in the response to a session command
+
+    Returns None if the server failed to set up the session, which may
+    succeed if retried.
+    """
+
+    if header["status"] == "error":
+        return None
+    elif header["status"] != "ok":
+        raise ClientError("got unexpected header")
+
+    return get_session_info_for_header(header)
+
+
+def check_start_response(header):
+    if header["status"] != "start":
+        raise ClientError
+
+
+def check_stream_header(header):
+    status = header["status"]
+    if status == "end":
+        raise ClientError("session ended")
+    elif status != "ok":
+        raise ClientError("server error")
+
+
+def is_stop_response(header):
+    """Tells if the header ends the stream, as opposed to being streaming data"""
+
+    status = header["status"]
+    if status == "end":
+        return True
+    elif status == "ok":
+        return False
+    else:
+        raise ClientError
+
+
 def get_session_info_for_header(header):
     info = {}
     for header_k, v in header.items():
@@ -88,9 +170,20 @@ def get_session_info_for_header(header):
     return info
 
 
-def decode_stream_frame(header, payload, squeeze, number_of_subsweeps=None):
+def get_wire_dtype(mode):
+    """Returns the dtype of the samples of the mode in stream payloads"""
+
+    if mode == "power_bin":
+        return np.dtype(">u2")  # sent as integers
+
+    return get_raw_dtype(mode, ">")
+
+
+def decode_stream_frame(header, payload, squeeze, number_of_subsweeps=None, out=None,
+                        output_dtype="float64"):
     info = decode_stream_header(header, squeeze)
-    data = decode_stream_payload(header, payload, squeeze, number_of_subsweeps)
+    args = (header, payload, squeeze, number_of_subsweeps, out, output_dtype)
+    data = decode_stream_payload(*args)
     return info, data
 
 
@@ -115,40 +208,62 @@ def decode_stream_header(header, squeeze):
     return infos[0] if (squeeze and num_sensors == 1) else infos
 
 
-def decode_stream_payload(header, payload, squeeze, num_subsweeps=None):
+def decode_stream_payload(header, payload, squeeze, num_subsweeps=None, out=None,
+                          output_dtype="float64"):
+    """Decodes a stream payload, into the array out if given
+
+    With output_dtype set to "raw", the native integers are returned as is,
+    and IQ data gets a trailing axis of length 2 for the real and imaginary
+    parts.
+    """
+
     if not payload:
         return None
 
-    num_points = header["data_size"]
     num_sensors = header["data_sensors"]
     sweep_type = header["type"]
 
     squeeze = squeeze and num_sensors == 1
+    raw_output = output_dtype == "raw"
+    float_dtype = "float32" if output_dtype == "float32" else "float"
+
+    if sweep_type == "sparse_data":
+        shape = (num_subsweeps, -1) if squeeze else (num_sensors, num_subsweeps, -1)
+    else:
+        shape = (-1, ) if squeeze else (num_sensors, header["data_size"])
 
     if sweep_type == "iq_data":
-        sweep = np.frombuffer(payload, dtype=">i2").astype("float")
-        sweep *= 2**(-12)
-        n = num_points * num_sensors
-        sweep = sweep.reshape((2, n), order="F").view(dtype="complex").flatten()
+        raw = np.frombuffer(payload, dtype=">i2").reshape(shape + (2, ))
+        if raw_output:
+            return decode_into(raw, out, "i2")
+        if out is None:
+            complex_dtype = "complex64" if output_dtype == "float32" else "complex"
+            out = np.empty(raw.shape[:-1], dtype=complex_dtype)
+        out.real = raw[..., 0]
+        out.imag = raw[..., 1]
+        out *= 2**(-12)
+    elif sweep_type == "power_bins_data":
+        # sent as integers, but given as the float32 of the register protocol when raw
+        raw = np.frombuffer(payload, dtype=">u2").reshape(shape)
+        out = decode_into(raw, out, "f4" if raw_output else float_dtype)
     elif sweep_type == "envelope_data":
-        sweep = np.frombuffer(payload, dtype=">u2").astype("float")
+        raw = np.frombuffer(payload, dtype=">u2").reshape(shape)
+        out = decode_into(raw, out, "u2" if raw_output else float_dtype)
     elif sweep_type == "sparse_data":
-        sweep = np.frombuffer(payload, dtype=">u2").astype("float")
-        sweep -= 2**15
-
-        if squeeze:
-            sweep = sweep.reshape((num_subsweeps, -1))
-        else:
-            sweep = sweep.reshape((num_sensors, num_subsweeps, -1))
-
-        return sweep
+        raw = np.frombuffer(payload, dtype=">u2").reshape(shape)
+        if raw_output:
+            return decode_into(raw, out, "u2")
+        out = decode_into(raw, out, float_dtype)
+        out -= 2**15
     else:  # Fallback
-        sweep = np.frombuffer(payload, dtype=">u2")
+        out = decode_into(np.frombuffer(payload, dtype=">u2").reshape(shape), out, dtype=">u2")
+
+    return out
 
-    if not squeeze:
-        sweep = sweep.reshape((num_sensors, num_points))
 
-    return sweep
+def pack_cmd(cmd_dict):
+    cmd_dict["api_version"] = API_VERSION
+    return pack(cmd_dict)
 
 
 def pack(unpacked):
@@ -1,4 +1,7 @@
 from abc import ABCMeta, abstractmethod
+import asyncio
+from contextlib import contextmanager
+import ctypes
 import serial
 import socket
 from time import time, sleep
@@ -49,11 +52,13 @@ class BaseLink(metaclass=ABCMeta):
 
 class SocketLink(BaseLink):
     _CHUNK_SIZE = 4096
+    _INITIAL_BUF_SIZE = 2**16
     _PORT = 6110
 
-    def __init__(self, host=None):
+    def __init__(self, host=None, port=None):
         super().__init__()
         self._host = host
+        self._port = port
         self._sock = None
         self._buf = None
 
@@ -63,50 +68,40 @@ class SocketLink(BaseLink):
 
         try:
             print (self._host)
-            print (self._PORT)
-            self._sock.connect((self._host, self._PORT))
+            print (self._port or self._PORT)
+            self._sock.connect((self._host, self._port or self._PORT))
         except OSError as e:
             self._sock = None
             raise LinkError("failed to connect") from e
 
-        self._buf = bytearray()
+        self._buf = RecvBuffer(self._INITIAL_BUF_SIZE)
 
     def recv(self, num_bytes):
+        """Returns a read-only view that is valid until the next recv call"""
+
         while len(self._buf) < num_bytes:
-            try:
-                r = self._sock.recv(self._CHUNK_SIZE)
-            except OSError as e:
-                raise LinkError from e
-            self._buf.extend(r)
+            self._fill(num_bytes - len(self._buf))
 
-        data = self._buf[:num_bytes]
-        self._buf = self._buf[num_bytes:]
-        return data
+        return self._buf.consume(num_bytes)
 
     def recv_until(self, bs):
+        """Returns a read-only view that is valid until the next recv call"""
+
         t0 = time()
+        si = 0
         while True:
-            try:
-                i = self._buf.index(bs)
-            except ValueError:
-                pass
-            else:
+            i = self._buf.find(bs, si)
+            if i >= 0:
                 break
 
+            si = max(0, len(self._buf) - len(bs) + 1)
+
             if time() - t0 > self._timeout:
                 raise LinkError("recv timeout")
 
-            try:
-                r = self._sock.recv(self._CHUNK_SIZE)
-            except OSError as e:
-                raise LinkError from e
-            self._buf.extend(r)
+            self._fill(self._CHUNK_SIZE)
 
-        i += 1
-        data = self._buf[:i]
-        self._buf = self._buf[i:]
-
-        return data
+        return self._buf.consume(i + len(bs))
 
     def send(self, data):
         self._sock.sendall(data)
@@ -117,6 +112,135 @@ class SocketLink(BaseLink):
         self._sock = None
         self._buf = None
 
+    def _fill(self, min_num_bytes):
+        view = self._buf.reserve(max(min_num_bytes, self._CHUNK_SIZE))
+
+        try:
+            n = self._sock.recv_into(view)
+        except OSError as e:
+            raise LinkError from e
+
+        if n == 0:
+            raise LinkError("connection closed")
+
+        self._buf.commit(n)
+
+
+class AsyncSocketLink(BaseLink):
+    """asyncio counterpart to :class:`SocketLink`, all calls are coroutines"""
+
+    _PORT = SocketLink._PORT
+
+    def __init__(self, host=None, port=None):
+        super().__init__()
+        self._host = host
+        self._port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, self._port or self._PORT),
+                self._timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise LinkError("failed to connect") from e
+
+    async def recv(self, num_bytes):
+        return await self._wait_for(self._reader.readexactly(num_bytes))
+
+    async def recv_until(self, bs):
+        return await self._wait_for(self._reader.readuntil(bs))
+
+    async def send(self, data):
+        self._writer.write(data)
+        await self._wait_for(self._writer.drain())
+
+    async def disconnect(self):
+        self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def _wait_for(self, coro):
+        try:
+            return await asyncio.wait_for(coro, self._timeout)
+        except asyncio.TimeoutError as e:
+            raise LinkError("recv timeout") from e
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError) as e:
+            raise LinkError from e
+
+
+class RecvBuffer:
+    """Byte buffer for received data that hands out views instead of copies
+
+    Data is received directly into the free tail of a preallocated bytearray
+    (see :meth:`reserve` and :meth:`commit`) and consumed from the head as
+    memoryviews. Unconsumed data is moved to the front of the buffer only
+    when the tail runs out of space, so the amount copied per call is bounded
+    by what is left over rather than by everything that has been received.
+
+    A view returned by :meth:`consume` stays valid until the next call to
+    :meth:`reserve`.
+    """
+
+    def __init__(self, size):
+        self._data = bytearray(size)
+        self._view = memoryview(self._data)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def find(self, bs, start=0):
+        i = self._data.find(bs, self._start + start, self._end)
+        return i - self._start if i >= 0 else i
+
+    def consume(self, num_bytes):
+        if num_bytes > len(self):
+            raise ValueError("not enough data in buffer")
+
+        view = self._view[self._start:self._start + num_bytes]
+        self._start += num_bytes
+
+        if self._start == self._end:
+            self._start = self._end = 0
+
+        return _readonly(view)
+
+    def reserve(self, num_bytes):
+        size = len(self)
+
+        if len(self._data) - self._end < num_bytes:
+            if len(self._data) < size + num_bytes:
+                new_data = bytearray(max(2 * len(self._data), size + num_bytes))
+                new_data[:size] = self._view[self._start:self._end]
+                self._data = new_data
+                self._view = memoryview(new_data)
+            else:
+                self._view[:size] = self._view[self._start:self._end]
+
+            self._start = 0
+            self._end = size
+
+        return self._view[self._end:]
+
+    def commit(self, num_bytes):
+        self._end += num_bytes
+
+    def extend(self, data):
+        n = len(data)
+        self.reserve(n)[:n] = data
+        self.commit(n)
+
+
+def _readonly(view):
+    try:
+        return view.toreadonly()
+    except AttributeError:  # Python < 3.8
+        return view
+
 
 class BaseSerialLink(BaseLink):
     DEFAULT_TIMEOUT = 2
@@ -189,13 +313,37 @@ class SerialLink(BaseSerialLink):
 
 
 class SerialProcessLink(BaseSerialLink):
-    def __init__(self, port=None):
+    """Serial link where the port is read by a separate process
+
+    The transport between the serial process and the link is selected with
+    ``transport``:
+
+    * ``"queue"`` - received chunks are sent through a multiprocessing queue.
+    * ``"shared_memory"`` - received bytes are written to a :class:`ByteRing`
+      shared with the serial process, which avoids pickling every chunk.
+    """
+
+    TRANSPORTS = ["queue", "shared_memory"]
+    _RING_SIZE = 2**20
+
+    def __init__(self, port=None, transport="queue"):
         super().__init__()
+
+        if transport not in self.TRANSPORTS:
+            raise ValueError("unknown transport {}".format(transport))
+
         self._port = port
+        self._transport = transport
         self._process = None
 
     def connect(self):
-        self._recv_queue = mp.Queue()
+        if self._transport == "shared_memory":
+            self._recv_queue = None
+            self._ring = ByteRing(self._RING_SIZE)
+        else:
+            self._recv_queue = mp.Queue()
+            self._ring = None
+
         self._send_queue = mp.Queue()
         self._flow_event = mp.Event()
         self._error_event = mp.Event()
@@ -207,6 +355,7 @@ class SerialProcessLink(BaseSerialLink):
             self._send_queue,
             self._flow_event,
             self._error_event,
+            self._ring,
         )
 
         self._process = mp.Process(
@@ -233,10 +382,12 @@ class SerialProcessLink(BaseSerialLink):
 
         log.debug("connect - successful")
 
-        self._buf = bytearray()
+        self._buf = RecvBuffer(self._RING_SIZE)
 
     def recv(self, num_bytes):
-        self.__empty_queue_into_buf()
+        """Returns a read-only view that is valid until the next recv call"""
+
+        self.__empty_into_buf()
 
         t0 = time()
         while len(self._buf) < num_bytes:
@@ -245,36 +396,28 @@ class SerialProcessLink(BaseSerialLink):
             if time() - t0 > self._timeout:
                 raise LinkError("recv timeout")
 
-        data = self._buf[:num_bytes]
-        self._buf = self._buf[num_bytes:]
-        return data
+        return self._buf.consume(num_bytes)
 
     def recv_until(self, bs):
-        self.__empty_queue_into_buf()
+        """Returns a read-only view that is valid until the next recv call"""
+
+        self.__empty_into_buf()
 
-        n = len(bs)
         si = 0
         t0 = time()
         while True:
-            buf_size = len(self._buf)
-            if buf_size >= n:
-                try:
-                    i = self._buf.index(bs, si)
-                except ValueError:
-                    pass
-                else:
-                    break
+            i = self._buf.find(bs, si)
+            if i >= 0:
+                break
 
-                si = buf_size - n + 1
+            si = max(0, len(self._buf) - len(bs) + 1)
 
             if time() - t0 > self._timeout:
                 raise LinkError("recv timeout")
 
             self.__get_into_buf()
 
-        data = self._buf[:i+n]
-        self._buf = self._buf[i+n:]
-        return data
+        return self._buf.consume(i + len(bs))
 
     def send(self, data):
         self._send_queue.put(data)
@@ -293,7 +436,11 @@ class SerialProcessLink(BaseSerialLink):
         if self._process.exitcode is None:
             raise LinkError("failed to disconnect")
 
-    def __empty_queue_into_buf(self):
+    def __empty_into_buf(self):
+        if self._ring is not None:
+            self._ring.read_into(self._buf)
+            return
+
         while True:
             try:
                 data = self._recv_queue.get_nowait()
@@ -303,6 +450,13 @@ class SerialProcessLink(BaseSerialLink):
             self._buf.extend(data)
 
     def __get_into_buf(self):
+        if self._ring is not None:
+            if not self._ring.wait(self._timeout):
+                raise LinkError("recv timeout")
+
+            self._ring.read_into(self._buf)
+            return
+
         try:
             data = self._recv_queue.get(timeout=self._timeout)
         except queue.Empty:
@@ -333,12 +487,15 @@ class SerialProcessLink(BaseSerialLink):
         self._timeout = new_timeout
 
 
-def serial_process_program(port, baud, recv_q, send_q, flow_event, error_event):
+def serial_process_program(port, baud, recv_q, send_q, flow_event, error_event, ring=None):
     log.debug("serial communication process started")
     signal.signal(signal.SIGINT, signal.SIG_IGN)
 
     try:
-        _serial_process_program(port, baud, recv_q, send_q, flow_event, error_event)
+        if ring is None:
+            _serial_process_program(port, baud, recv_q, send_q, flow_event, error_event)
+        else:
+            _serial_ring_process_program(port, baud, ring, send_q, flow_event, error_event)
     except Exception:
         error_event.set()
         flow_event.set()
@@ -347,7 +504,8 @@ def serial_process_program(port, baud, recv_q, send_q, flow_event, error_event):
         traceback.print_exc()
         print("\n\n")
 
-    recv_q.close()
+    if recv_q is not None:
+        recv_q.close()
     send_q.close()
 
 
@@ -364,21 +522,255 @@ def _serial_process_program(port, baud, recv_q, send_q, flow_event, error_event)
         if len(received) > 0:
             recv_q.put(received)
 
-        sent = False
-        while True:
-            try:
-                x = send_q.get_nowait()
-            except queue.Empty:
-                break
-
-            if isinstance(x, tuple):
-                _, val = x  # assume its a baudrate change
-                ser.baudrate = val
-            else:
-                ser.write(x)
-                sent = True
+        sent = _serial_process_send(ser, send_q)
 
         if not sent:
             sleep(0.0025)
 
     ser.close()
+
+
+def _serial_ring_process_program(port, baud, ring, send_q, flow_event, error_event):
+    # Reads block until data arrives (or the timeout passes), so there is no need to sleep
+    # between polls. The timeout bounds the latency of outgoing data.
+    ser = serial.Serial(port=port, baudrate=baud, timeout=0.0025, exclusive=True)
+    flow_event.set()
+    pending = b""
+    while flow_event.is_set():
+        if not pending:
+            pending = ser.read(max(1, ser.in_waiting))
+
+        if pending:
+            n = ring.write(pending)
+            pending = pending[n:]
+
+            if pending:  # the ring is full, wait for the consumer
+                sleep(0.001)
+
+        _serial_process_send(ser, send_q)
+
+    ser.close()
+
+
+def _serial_process_send(ser, send_q):
+    sent = False
+    while True:
+        try:
+            x = send_q.get_nowait()
+        except queue.Empty:
+            break
+
+        if isinstance(x, tuple):
+            _, val = x  # assume its a baudrate change
+            ser.baudrate = val
+        else:
+            ser.write(x)
+            sent = True
+
+    return sent
+
+
+class ByteRing:
+    """Single-producer/single-consumer byte ring in shared memory
+
+    The ring is created in the parent process and passed to the producer
+    process as an argument. The write and read positions are ever-increasing
+    byte counters, each only updated by one side, so no lock is needed
+    between the producer and the consumer. An event is set after every write
+    so that the consumer can sleep while the ring is empty.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._data = mp.RawArray(ctypes.c_uint8, size)
+        self._pos = mp.RawArray(ctypes.c_uint64, 2)  # write, read
+        self._event = mp.Event()
+        self._view = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_view"] = None
+        return state
+
+    def __len__(self):
+        return self._pos[0] - self._pos[1]
+
+    def write(self, data):
+        """Writes as much of data as fits, returns the number of bytes written"""
+
+        w = self._pos[0]
+        n = min(len(data), self._size - (w - self._pos[1]))
+
+        if n > 0:
+            self._copy(w, n, src=memoryview(data))
+            self._pos[0] = w + n
+            self._event.set()
+
+        return n
+
+    def read_into(self, buf):
+        """Moves all available bytes into a :class:`RecvBuffer`"""
+
+        r = self._pos[1]
+        n = self._pos[0] - r
+
+        if n > 0:
+            self._copy(r, n, dst=buf.reserve(n))
+            buf.commit(n)
+            self._pos[1] = r + n
+
+        return n
+
+    def wait(self, timeout=None):
+        self._event.clear()
+
+        if len(self) > 0:
+            return True
+
+        return self._event.wait(timeout)
+
+    def _copy(self, pos, n, src=None, dst=None):
+        if self._view is None:
+            self._view = memoryview(self._data).cast("B")
+
+        i = pos % self._size
+        first = min(n, self._size - i)
+        parts = [(slice(i, i + first), slice(0, first)), (slice(0, n - first), slice(first, n))]
+
+        for ring_slice, other_slice in parts:
+            if src is not None:
+                self._view[ring_slice] = src[other_slice]
+            else:
+                dst[other_slice] = self._view[ring_slice]
+
+
+class FramePool:
+    """Fixed pool of preallocated frame slots in shared memory
+
+    A producer process fills slots in place (:meth:`reserve` and
+    :meth:`commit`) and a consumer reads them in order through :meth:`get`.
+    When all slots hold unread frames, the overflow policy decides what
+    happens:
+
+    * ``"drop_oldest"`` - the oldest unread frame is overwritten and counted
+      in :attr:`num_overwritten`.
+    * ``"block"`` - the producer waits for the consumer to free a slot.
+
+    The pool must be passed to the producer process when it is created.
+    """
+
+    OVERFLOW_POLICIES = ["drop_oldest", "block"]
+
+    def __init__(self, num_slots, slot_size, overflow="drop_oldest"):
+        if num_slots < 2:
+            raise ValueError("need at least two slots")
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError("unknown overflow policy {}".format(overflow))
+
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self.overflow = overflow
+
+        self._data = mp.RawArray(ctypes.c_uint8, num_slots * slot_size)
+        self._lengths = mp.RawArray(ctypes.c_uint32, num_slots)
+        self._counters = mp.RawArray(ctypes.c_uint64, 3)  # written, read, overwritten
+        self._lock = mp.Lock()
+        self._frame_event = mp.Event()
+        self._space_event = mp.Event()
+        self._closed_event = mp.Event()
+        self._view = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_view"] = None
+        return state
+
+    def __len__(self):
+        return self._counters[0] - self._counters[1]
+
+    @property
+    def num_overwritten(self):
+        return self._counters[2]
+
+    def reset(self):
+        with self._lock:
+            for i in range(len(self._counters)):
+                self._counters[i] = 0
+
+        self._closed_event.clear()
+
+    def close(self):
+        self._closed_event.set()
+        self._frame_event.set()
+
+    def reserve(self, timeout=None):
+        """Returns a writable view of the next free slot, or None on timeout"""
+
+        t0 = time()
+        while True:
+            self._space_event.clear()
+
+            with self._lock:
+                written, read, _ = self._counters
+
+                if written - read < self.num_slots:
+                    break
+
+                if self.overflow == "drop_oldest":
+                    self._counters[1] = read + 1
+                    self._counters[2] += 1
+                    break
+
+            remaining = None if timeout is None else timeout - (time() - t0)
+            if remaining is not None and remaining <= 0:
+                return None
+
+            self._space_event.wait(remaining)
+
+        return self._slot_view(written % self.num_slots)
+
+    def commit(self, num_bytes):
+        with self._lock:
+            written = self._counters[0]
+            self._lengths[written % self.num_slots] = num_bytes
+            self._counters[0] = written + 1
+
+        self._frame_event.set()
+
+    @contextmanager
+    def get(self, timeout=None):
+        """Context manager giving a read-only view of the oldest unread frame
+
+        The producer cannot overwrite the frame while the context is held.
+        Raises :class:`LinkError` on timeout or when the pool is closed.
+        """
+
+        t0 = time()
+        while len(self) == 0:
+            if self._closed_event.is_set():
+                raise LinkError("frame pool closed")
+
+            self._frame_event.clear()
+
+            if len(self) > 0:
+                break
+
+            remaining = None if timeout is None else timeout - (time() - t0)
+            if remaining is not None and remaining <= 0:
+                raise LinkError("frame pool timeout")
+
+            self._frame_event.wait(remaining)
+
+        with self._lock:
+            read = self._counters[1]
+            i = read % self.num_slots
+            yield _readonly(self._slot_view(i)[:self._lengths[i]])
+            self._counters[1] = read + 1
+
+        self._space_event.set()
+
+    def _slot_view(self, i):
+        if self._view is None:
+            self._view = memoryview(self._data).cast("B")
+
+        return self._view[i * self.slot_size:(i + 1) * self.slot_size]
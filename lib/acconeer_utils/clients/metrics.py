@@ -0,0 +1,173 @@
+from bisect import bisect_left
+import threading
+from time import time
+
+
+DURATION_BUCKETS = (
+    1e-5, 2.5e-5, 5e-5,
+    1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2,
+    0.1, 0.25, 0.5, 1.0,
+)
+
+COUNTERS = [
+    ("bytes_received", "Bytes of stream frames received from the link"),
+    ("frames_received", "Stream frames received from the link"),
+    ("frames_decoded", "Frames decoded by the client, including any dropped by prefetching"),
+    ("recoveries", "Corrupt frames recovered from"),
+    ("recovery_failures", "Corrupt frames not recovered from"),
+    ("missed_frames", "Frames missing from the sequence numbers, as returned to the caller"),
+    ("duplicate_frames", "Frames with a repeated or decreasing sequence number"),
+]
+
+HISTOGRAMS = [
+    ("link_wait_seconds", "Time spent waiting for a frame from the link"),
+    ("decode_seconds", "Time spent getting a frame, besides waiting for the link"),
+]
+
+
+class Histogram:
+    """Counts observations in buckets, like a Prometheus histogram"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, x):
+        self.counts[bisect_left(self.buckets, x)] += 1
+        self.sum += x
+        self.count += 1
+
+    def cumulative_counts(self):
+        """Returns (upper bound, count) pairs, the last bound being inf"""
+
+        pairs = []
+        total = 0
+        for le, count in zip(self.buckets + (float("inf"), ), self.counts):
+            total += count
+            pairs.append((le, total))
+
+        return pairs
+
+    def snapshot(self):
+        return {
+            "buckets": self.cumulative_counts(),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class ClientMetrics:
+    """Counters and histograms of the frames streamed by a client
+
+    Enabled by passing ``metrics=True`` (or a shared instance of this class)
+    to a client. The client reports the frames it receives from its link and
+    how long it waited for them, and :class:`BaseClient` the frames it
+    decodes, adding the host time the frame was received as ``receive_time``
+    to the info. Mock and replay clients have no link, so all their time
+    counts as decode time.
+
+    The metrics are read with :meth:`snapshot`, or :meth:`to_prometheus`
+    for the Prometheus text exposition format. They may be read from another
+    thread than the one streaming, and one instance may be shared by several
+    clients, as the clients keep track of their own frames in progress.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {name: 0 for name, _ in COUNTERS}
+            self.histograms = {name: Histogram() for name, _ in HISTOGRAMS}
+            self.last_receive_time = None
+
+    def increment(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def frame_received(self, num_bytes, wait_time, receive_time):
+        with self._lock:
+            self.counters["bytes_received"] += num_bytes
+            self.counters["frames_received"] += 1
+            self.histograms["link_wait_seconds"].observe(wait_time)
+            self.last_receive_time = receive_time
+
+    def frame_decoded(self, info, duration, wait_time=0, receive_time=None):
+        """Records a frame returned by the client, which took duration to get
+
+        The wait time and receive time are those reported to
+        :meth:`frame_received` for the frame, if it came from a link. The
+        wait time is not counted as decode time.
+        """
+
+        infos = [info] if isinstance(info, dict) else info
+
+        with self._lock:
+            if receive_time is None:
+                receive_time = time()
+                self.last_receive_time = receive_time
+
+            duration -= wait_time
+            self.counters["frames_decoded"] += 1
+            self.histograms["decode_seconds"].observe(max(duration, 0))
+
+        for d in infos:
+            d["receive_time"] = receive_time
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = dict(self.counters)
+            for name, histogram in self.histograms.items():
+                snapshot[name] = histogram.snapshot()
+
+            snapshot["last_receive_time"] = self.last_receive_time
+
+        return snapshot
+
+    def to_prometheus(self, prefix="acconeer_client", labels=None):
+        """Returns the metrics in the Prometheus text exposition format"""
+
+        snapshot = self.snapshot()
+        label_str = ",".join('{}="{}"'.format(k, escape_label_value(v))
+                             for k, v in (labels or {}).items())
+
+        def fmt_labels(*extra):
+            s = ",".join([s for s in (label_str, ) + extra if s])
+            return "{" + s + "}" if s else ""
+
+        lines = []
+        for name, help_text in COUNTERS:
+            full_name = "{}_{}_total".format(prefix, name)
+            lines.append("# HELP {} {}".format(full_name, help_text))
+            lines.append("# TYPE {} counter".format(full_name))
+            lines.append("{}{} {}".format(full_name, fmt_labels(), snapshot[name]))
+
+        for name, help_text in HISTOGRAMS:
+            full_name = "{}_{}".format(prefix, name)
+            histogram = snapshot[name]
+            lines.append("# HELP {} {}".format(full_name, help_text))
+            lines.append("# TYPE {} histogram".format(full_name))
+            for le, count in histogram["buckets"]:
+                le_str = 'le="{}"'.format("+Inf" if le == float("inf") else repr(le))
+                lines.append("{}_bucket{} {}".format(full_name, fmt_labels(le_str), count))
+
+            lines.append("{}_sum{} {!r}".format(full_name, fmt_labels(), histogram["sum"]))
+            lines.append("{}_count{} {}".format(full_name, fmt_labels(), histogram["count"]))
+
+        if snapshot["last_receive_time"] is not None:
+            full_name = "{}_last_receive_timestamp_seconds".format(prefix)
+            lines.append("# HELP {} Host time the latest frame was received".format(full_name))
+            lines.append("# TYPE {} gauge".format(full_name))
+            lines.append("{}{} {!r}".format(
+                full_name, fmt_labels(), snapshot["last_receive_time"]))
+
+        return "\n".join(lines) + "\n"
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
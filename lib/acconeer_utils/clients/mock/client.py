@@ -4,7 +4,8 @@ from time import time, sleep
 import logging
 
 from acconeer_utils import SDK_VERSION
-from acconeer_utils.clients.base import BaseClient, ClientError, decode_version_str
+from acconeer_utils.clients.base import (
+    BaseClient, ClientError, decode_version_str, encode_raw)
 from acconeer_utils.clients.configs import EnvelopeServiceConfig
 
 
@@ -12,9 +13,26 @@ log = logging.getLogger(__name__)
 
 
 class MockClient(BaseClient):
+    """Client generating made up data, for use without a sensor
+
+    By default, frames are generated one by one and paced at the sweep rate
+    (at most 100 Hz). For benchmarks, the following keyword arguments make
+    the mock cheaper:
+
+    * ``paced`` - if False, frames are returned as fast as possible.
+    * ``seed`` - seeds the random generator at every session setup, making
+      the output reproducible.
+    * ``frame_bank_size`` - if set, that many frames are generated in one
+      batch when streaming starts and then cycled through.
+    """
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+        self.paced = kwargs.get("paced", True)
+        self.seed = kwargs.get("seed")
+        self.frame_bank_size = kwargs.get("frame_bank_size")
+
     def _connect(self):
         return decode_version_str(SDK_VERSION)
 
@@ -32,7 +50,7 @@ class MockClient(BaseClient):
         except KeyError as e:
             raise ClientError("mode not supported") from e
 
-        self._mocker = mock_class(config)
+        self._mocker = mock_class(config, np.random.RandomState(self.seed))
 
         return self._mocker.session_info
 
@@ -40,29 +58,69 @@ class MockClient(BaseClient):
         self._start_time = time()
         self._data_count = 0
 
+        if self.frame_bank_size:
+            ts = np.arange(1, self.frame_bank_size + 1) / self._update_rate
+            self._frame_bank = self._generate(ts)
+        else:
+            self._frame_bank = None
+
     def _get_next(self):
-        config = self._config
+        info, data = self._next_frame()
+        return info, data.copy() if self._frame_bank is not None else data
+
+    def _get_next_into(self, out):
+        info, data = self._next_frame()
+        out[...] = data
+        return info
 
+    def _next_frame(self):
         self._data_count += 1
 
         data_capture_time = self._data_count / self._update_rate
-        now = time() - self._start_time
-        if data_capture_time > now:
-            sleep(data_capture_time - now)
+        if self.paced:
+            now = time() - self._start_time
+            if data_capture_time > now:
+                sleep(data_capture_time - now)
 
-        args = (data_capture_time, self._data_count)
-        num_sensors = len(config.sensor)
+        info = {
+            "data_saturated": False,
+            "sequence_number": self._data_count,
+        }
+
+        num_sensors = len(self._config.sensor)
+        if not self.squeeze or num_sensors > 1:
+            info = [dict(info) for _ in range(num_sensors)]
+
+        if self._frame_bank is None:
+            data = self._generate(np.array([data_capture_time]))[0]
+        else:
+            data = self._frame_bank[(self._data_count - 1) % len(self._frame_bank)]
+
+        return info, data
+
+    def _generate(self, ts):
+        """Generates a frame for each time in ts, stacked along the first axis"""
+
+        num_sensors = len(self._config.sensor)
 
         if self.squeeze and num_sensors == 1:
-            return self._mocker.get_next(*args, 0)
+            data = self._mocker.generate(ts, 0)
         else:
             idx_offset = max(0, (num_sensors - 1) / 2)
-            out = [self._mocker.get_next(*args, i - idx_offset) for i in range(num_sensors)]
-            info, data = zip(*out)
-            data = np.array(data)
-            info = list(info)
+            out = [self._mocker.generate(ts, i - idx_offset) for i in range(num_sensors)]
+            data = np.stack(out, axis=1)
 
-        return info, data
+        return self._convert_output(data)
+
+    def _convert_output(self, data):
+        """Converts the mocked data to what a sensor would give for the output dtype"""
+
+        if self.output_dtype == "float32":
+            return data.astype("complex64" if np.iscomplexobj(data) else "float32")
+        elif self.output_dtype != "raw":
+            return data
+
+        return encode_raw(data, self._config.mode)
 
     def _stop_streaming(self):
         pass
@@ -73,9 +131,11 @@ class MockClient(BaseClient):
 
 class DenseMocker:
     BASE_STEP_LENGTH = 0.485e-3
+    FILTER = butter(2, 0.03)
 
-    def __init__(self, config):
+    def __init__(self, config, rng):
         self.config = config
+        self.rng = rng
 
         self.num_depths = int(round(config.range_length / self.BASE_STEP_LENGTH)) + 1
 
@@ -90,56 +150,51 @@ class DenseMocker:
 
 
 class EnvelopeMocker(DenseMocker):
-    def get_next(self, t, i, offset):
-        info = {
-            "data_saturated": False,
-            "sequence_number": i,
-        }
+    def generate(self, ts, offset):
+        n = len(ts)
+        randn = self.rng.randn
 
-        noise = 100 + 20 * np.random.randn(self.num_depths)
-        noise = filtfilt(*butter(2, 0.03), noise, method="gust")
+        noise = 100 + 20 * randn(n, self.num_depths)
+        noise = filtfilt(*self.FILTER, noise, axis=-1, method="gust")
 
-        ampl = 2000 + np.random.randn() * 20
+        ampl = 2000 + randn(n, 1) * 20
         center = self.range_center
-        center += np.random.randn() * 0.2e-3
+        center = center + randn(n, 1) * 0.2e-3
         center += offset * 0.1
         profile = getattr(self.config, "session_profile", None)
         s = 0.01 if profile == EnvelopeServiceConfig.MAX_DEPTH_RESOLUTION else 0.04
         signal = ampl * np.exp(-np.square((self.depths - center) / s))
 
-        data = signal + noise
-
-        return info, data
+        return signal + noise
 
 
 class IQMocker(DenseMocker):
-    def get_next(self, t, i, offset):
-        info = {
-            "data_saturated": False,
-            "sequence_number": i,
-        }
+    def generate(self, ts, offset):
+        n = len(ts)
+        randn = self.rng.randn
 
-        noise = np.random.randn(self.num_depths) + 1j * np.random.randn(self.num_depths)
+        noise = randn(n, self.num_depths) + 1j * randn(n, self.num_depths)
         noise *= 0.015
 
-        ampl = 0.2 * (1 + 0.03 * np.random.randn())
+        ampl = 0.2 * (1 + 0.03 * randn(n, 1))
         center = self.range_center
-        center += np.random.randn() * (3 / 360) * 2.5e-3
+        center = center + randn(n, 1) * (3 / 360) * 2.5e-3
         center += offset * 0.1
-        center += 4e-3 * np.sin(t)
+        center += 4e-3 * np.sin(ts)[:, None]
         xs = self.depths - center
         signal = ampl * np.exp(2j * np.pi * xs / 2.5e-3) * np.exp(-np.square(xs / 0.05))
 
         data = signal + noise
         data *= np.exp(-2j * np.pi * self.depths / 2.5e-3)
-        data = filtfilt(*butter(2, 0.03), data, method="gust")
+        data = filtfilt(*self.FILTER, data, axis=-1, method="gust")
 
-        return info, data
+        return data
 
 
 class PowerBinMocker(EnvelopeMocker):
-    def __init__(self, config):
+    def __init__(self, config, rng):
         self.config = config
+        self.rng = rng
 
         self.num_depths = config.bin_count or int(round(config.range_length / 0.1)) + 1
 
@@ -157,8 +212,9 @@ class PowerBinMocker(EnvelopeMocker):
 class SparseMocker:
     BASE_STEP_LENGTH = 0.06
 
-    def __init__(self, config):
+    def __init__(self, config, rng):
         self.config = config
+        self.rng = rng
 
         start_point = int(round(config.range_start / self.BASE_STEP_LENGTH))
         end_point = int(round(config.range_end / self.BASE_STEP_LENGTH))
@@ -179,22 +235,15 @@ class SparseMocker:
         self.range_center = (start + end) / 2
         self.depths = np.linspace(start, end, self.num_depths)
 
-    def get_next(self, t, i, offset):
-        info = {
-            "data_saturated": False,
-            "sequence_number": i,
-        }
-
+    def generate(self, ts, offset):
         num_subsweeps = self.config.number_of_subsweeps
 
-        noise = 100 * np.random.randn(num_subsweeps, self.num_depths)
+        noise = 100 * self.rng.randn(len(ts), num_subsweeps, self.num_depths)
 
-        xs = self.depths - self.range_center + 0.1 * np.sin(t)
+        xs = self.depths - self.range_center + 0.1 * np.sin(ts)[:, None]
         signal = 5000 * np.exp(-np.square(xs / 0.1)) * np.sin(xs / 2.5e-3)
 
-        data = noise + np.tile(signal[None, :], [num_subsweeps, 1])
-
-        return info, data
+        return noise + signal[:, None, :]
 
 
 mock_class_map = {
@@ -1,6 +1,6 @@
 import numpy as np
 import logging
-from time import time, sleep
+from time import perf_counter, time, sleep
 import multiprocessing as mp
 import queue
 import signal
@@ -10,6 +10,8 @@ import socket
 
 from acconeer_utils.clients.base import BaseClient, ClientError
 from acconeer_utils.clients.reg import protocol, utils
+from acconeer_utils.clients.reg.connection_cache import ConnectionProfile, ConnectionProfileCache
+from acconeer_utils.clients.reg.connection_cache import get_profile_key
 from acconeer_utils.clients import links
 from acconeer_utils import libft4222
 
@@ -17,13 +19,20 @@ from acconeer_utils import libft4222
 log = logging.getLogger(__name__)
 
 SPI_MAIN_CTRL_SLEEP = 0.3
+SPI_DATA_READY_WAITS = ["busy", "backoff", "interrupt"]
+SPI_MIN_POLL_SLEEP = 100e-6
+SPI_MAX_POLL_SLEEP = 2e-3
+SPI_MAX_FRAME_SIZE = 2**16 + 2**8  # max transfer size and room for the sweep info
 
 
 class RegClient(BaseClient):
+    FRAME_FORMAT = "reg_uart"
+
     _XM112_LED_PIN = 67
 
     DEFAULT_BASE_BAUDRATE = 115200
     CONNECT_ROUTINE_TIMEOUT = 0.6
+    MAX_RECOVERY_FRAMES = 4
 
     def __init__(self, port, **kwargs):
         super().__init__(**kwargs)
@@ -33,7 +42,7 @@ class RegClient(BaseClient):
                 socket.inet_aton(port)
                 # IP
                 print ("Itentify Windows IP address instead of a Com Port")
-                self._link = links.SocketLink(port)
+                self._link = links.SocketLink(port, kwargs.get("socket_port"))
             except socket.error:
                 # Com Port
                 self._link = links.SerialLink(port)
@@ -42,18 +51,33 @@ class RegClient(BaseClient):
                 socket.inet_aton(port)
                 # IP
                 print ("Itentify Linux IP address instead of a Com Port")
-                self._link = links.SocketLink(port)
+                self._link = links.SocketLink(port, kwargs.get("socket_port"))
             except socket.error:
                 # Com Port
-                self._link = links.SerialProcessLink(port)
+                transport = kwargs.get("serial_transport", "queue")
+                self._link = links.SerialProcessLink(port, transport=transport)
+
+        self._port = port
+
+        connection_cache = kwargs.get("connection_cache")
+        if connection_cache is True:
+            connection_cache = ConnectionProfileCache()
+        elif isinstance(connection_cache, str):
+            connection_cache = ConnectionProfileCache(connection_cache)
+        self._connection_cache = connection_cache or None
 
         self.override_baudrate = kwargs.get("override_baudrate")
+        self.pipeline_reg_writes = kwargs.get("pipeline_reg_writes", False)
+        self.session_setup_timings = {}
 
         self._mode = protocol.NO_MODE
         self._num_subsweeps = None
+        self._applied_reg_vals = None
+        self._session_info = None
 
     def _connect(self):
         self._link.timeout = self.CONNECT_ROUTINE_TIMEOUT
+        connection_info = {}
 
         if self.override_baudrate:
             self._link.baudrate = self.override_baudrate
@@ -68,6 +92,16 @@ class RegClient(BaseClient):
             baudrates.append(self.DEFAULT_BASE_BAUDRATE)
             baudrates = sorted(list(set(baudrates)))
 
+            profile_key = None
+            profile = None
+            if self._connection_cache is not None:
+                profile_key = get_profile_key(self._port)
+                profile = self._connection_cache.get(profile_key)
+
+            if profile is not None:
+                log.debug("trying cached connection profile first: {}".format(profile))
+                baudrates = [profile.baudrate] + [b for b in baudrates if b != profile.baudrate]
+
             self._link.baudrate = baudrates[0]
             self._link.connect()
 
@@ -77,7 +111,7 @@ class RegClient(BaseClient):
                     sleep(0.2)
 
                 try:
-                    self._handshake()
+                    product_id = self._handshake()
                 except links.LinkError:
                     log.debug("handshake failed at {} baud".format(baudrate))
                 else:
@@ -86,7 +120,6 @@ class RegClient(BaseClient):
             else:
                 raise ClientError("could not connect, no response")
 
-            product_id = self._read_reg("product_id")
             product = {product.id: product for product in protocol.PRODUCTS}[product_id]
 
             if baudrate != product.baudrate:
@@ -97,6 +130,13 @@ class RegClient(BaseClient):
                 self._handshake()
                 log.debug("handshake succeeded at {} baud".format(product.baudrate))
 
+            if self._connection_cache is not None:
+                new_profile = ConnectionProfile(product.id, product.baudrate)
+                if new_profile != profile:
+                    self._connection_cache.put(profile_key, new_profile)
+
+                connection_info["connection_cache_hit"] = i == 0 and profile == new_profile
+
         self._link.timeout = self._link.DEFAULT_TIMEOUT
 
         ver = self._read_reg("product_version")
@@ -110,48 +150,84 @@ class RegClient(BaseClient):
 
         info = {}
         info.update(version_info)
+        info.update(connection_info)
 
         return info
 
     def _setup_session(self, config):
-        if len(config.sensor) > 1:
-            raise ValueError("the register protocol does not support multiple sensors")
-        if config.sensor[0] != 1:
-            raise ValueError("the register protocol currently only supports using sensor 1")
+        check_sensor(config)
 
         mode = protocol.get_mode(config.mode)
         self._mode = mode
 
-        self._write_reg("main_control", "stop")
-
-        self._write_reg("mode_selection", mode)
-
         if config.experimental_stitching:
-            self._write_reg("repetition_mode", "max")
             log.warning("experimental stitching on - switching to max freq. mode")
-        else:
-            self._write_reg("repetition_mode", "fixed")
 
-        self._write_reg("streaming_control", "uart")
-        self._write_reg("sensor_power_mode", "d")
+        rvs = utils.get_session_reg_vals(config, "uart")
+        return self._apply_session(config, rvs, rvs, read_info=True)
 
-        if mode == "iq":
-            self._write_reg("output_data_compression", 1)
+    def _reconfigure(self, config):
+        check_sensor(config)
 
-        rvs = utils.get_reg_vals_for_config(config)
-        for rv in rvs:
-            self._write_reg_raw(rv.addr, rv.val)
+        rvs = utils.get_session_reg_vals(config, "uart")
+        changed_rvs = None
+        if self._applied_reg_vals is not None and protocol.get_mode(config.mode) == self._mode:
+            changed_rvs = utils.get_changed_reg_vals(self._applied_reg_vals, rvs)
+
+        if changed_rvs is None:
+            return self._setup_session(config)
+
+        log.debug("reconfigure: {} changed regs".format(len(changed_rvs)))
+
+        if not changed_rvs:
+            return dict(self._session_info)
+
+        read_info = utils.affects_session_info(changed_rvs, self._mode)
+        return self._apply_session(config, rvs, changed_rvs, read_info)
+
+    def _apply_session(self, config, rvs, rvs_to_write, read_info):
+        mode = self._mode
+        self._applied_reg_vals = None
+
+        timings = {}
+        phase_start = time()
+
+        self._write_reg("main_control", "stop")
+
+        timings["stop"] = time() - phase_start
+        phase_start = time()
+
+        self._write_regs_raw(rvs_to_write)
+
+        timings["writes"] = time() - phase_start
+        phase_start = time()
 
         self._write_reg("main_control", "create")
         status = self._read_reg("status")
 
+        timings["create"] = time() - phase_start
+        phase_start = time()
+
         if status & protocol.STATUS_ERROR_ON_SERVICE_CREATION_MASK:
             raise ClientError("session setup failed")
 
-        info = {}
-        info_regs = utils.get_session_info_regs(mode)
-        for reg in info_regs:
-            info[reg.name] = self._read_reg(reg, mode)
+        if read_info:
+            info_regs = utils.get_session_info_regs(mode)
+            enc_vals = self._read_regs_raw([reg.addr for reg in info_regs])
+            info = {}
+            for reg, enc_val in zip(info_regs, enc_vals):
+                info[reg.name] = protocol.decode_reg_val(reg, enc_val)
+        else:
+            info = dict(self._session_info)
+
+        timings["info_reads"] = time() - phase_start
+
+        self._applied_reg_vals = rvs
+        self._session_info = dict(info)
+
+        self.session_setup_timings = timings
+        log.debug("session setup timings: " + ", ".join(
+            "{} {:.1f} ms".format(k, v * 1e3) for k, v in timings.items()))
 
         self._num_subsweeps = info.get("number_of_subsweeps")
 
@@ -177,35 +253,44 @@ class RegClient(BaseClient):
         self._write_reg("main_control", "activate")
 
     def _get_next(self):
-        packet = self._recv_packet(allow_recovery_skip=True)
-
-        if not isinstance(packet, protocol.UnpackedStreamData):
-            raise ClientError("got unexpected type of frame")
-
-        info = {}
-        for addr, enc_val in packet.result_info:
-            try:
-                reg = protocol.get_reg(addr, self._mode)
-                val = protocol.decode_reg_val(reg, enc_val)
-            except protocol.ProtocolError:
-                log.info("got unknown reg val in result info")
-                log.info("addr: {}, value: {}".format(addr, utils.fmt_enc_val(enc_val)))
-            else:
-                info[reg.name] = val
-
-        data = protocol.decode_output_buffer(packet.buffer, self._mode, self._num_subsweeps)
+        info, buffer = self._recv_stream_data()
+        args = (buffer, self._mode, self._num_subsweeps, None, self.output_dtype)
+        data = protocol.decode_output_buffer(*args)
 
         if self.squeeze:
             return info, data
         else:
             return [info], np.expand_dims(data, 0)
 
+    def _get_next_into(self, out):
+        info, buffer = self._recv_stream_data()
+
+        out = out if self.squeeze else out[0]
+        args = (buffer, self._mode, self._num_subsweeps, out, self.output_dtype)
+        protocol.decode_output_buffer(*args)
+
+        return info if self.squeeze else [info]
+
+    def _recv_stream_data(self):
+        packet = self._recv_packet(allow_recovery_skip=True, tap=self._frame_tap, count=True)
+
+        if not isinstance(packet, protocol.UnpackedStreamData):
+            raise ClientError("got unexpected type of frame")
+
+        info, unknown = protocol.decode_result_info(packet.result_info, self._mode)
+        for addr, x in unknown:
+            enc_val = x.to_bytes(protocol.REG_SIZE, protocol.BO)
+            log.info("got unknown reg val in result info")
+            log.info("addr: {}, value: {}".format(addr, utils.fmt_enc_val(enc_val)))
+
+        return info, packet.buffer
+
     def _stop_streaming(self):
         self._write_reg("main_control", "stop", expect_response=False)
 
         t0 = time()
         while time() - t0 < self._link._timeout:
-            res = self._recv_packet()
+            res = self._recv_packet(allow_recovery_skip=True)
 
             if isinstance(res, protocol.UnpackedRegWriteResponse):
                 break
@@ -217,6 +302,11 @@ class RegClient(BaseClient):
     def _disconnect(self):
         self._link.disconnect()
 
+        # The module may be reset before the next connection
+        self._mode = protocol.NO_MODE
+        self._applied_reg_vals = None
+        self._session_info = None
+
     def _read_buf_raw(self, addr=protocol.MAIN_BUFFER_ADDR):
         req = protocol.UnpackedBufferReadRequest(addr)
         self._send_packet(req)
@@ -229,7 +319,7 @@ class RegClient(BaseClient):
 
         log.debug("recv buf r res: addr: {:3} len: {}".format(addr, len(res.buffer)))
 
-        return res.buffer
+        return bytearray(res.buffer)
 
     def _read_reg(self, reg, mode=None):
         mode = mode or self._mode
@@ -248,7 +338,8 @@ class RegClient(BaseClient):
         if not isinstance(res, protocol.UnpackedRegReadResponse):
             raise ClientError("got unexpected type of frame")
 
-        enc_val = res.reg_val.val
+        # links may return views which are only valid until the next recv
+        enc_val = bytes(res.reg_val.val)
 
         log.debug("recv reg r res: addr: {:3} val: {}".format(addr, utils.fmt_enc_val(enc_val)))
 
@@ -276,6 +367,69 @@ class RegClient(BaseClient):
 
             log.debug("recv reg w res: ok")
 
+    def _read_regs_raw(self, addrs):
+        """Reads several registers, pipelining the requests if enabled"""
+
+        if not self.pipeline_reg_writes:
+            return [self._read_reg_raw(addr) for addr in addrs]
+
+        frames = bytearray()
+        for addr in addrs:
+            req = protocol.UnpackedRegReadRequest(addr)
+            frames.extend(protocol.insert_packet_into_frame(req))
+
+        self._link.send(frames)
+
+        log.debug("sent {} pipelined reg r reqs".format(len(addrs)))
+
+        enc_vals = []
+        for addr in addrs:
+            res = self._recv_packet()
+            if not isinstance(res, protocol.UnpackedRegReadResponse):
+                raise ClientError("got unexpected type of frame")
+            if res.reg_val.addr != addr:
+                raise ClientError("got reg read response for unexpected reg")
+
+            enc_vals.append(bytes(res.reg_val.val))
+
+        return enc_vals
+
+    def _write_regs_raw(self, reg_vals):
+        """Writes several (addr, enc_val) pairs, pipelining them if enabled
+
+        Pipelined, all write requests are sent at once and the responses are
+        then verified in order.
+        """
+
+        if not self.pipeline_reg_writes:
+            for addr, enc_val in reg_vals:
+                self._write_reg_raw(addr, enc_val)
+            return
+
+        rrvs = [protocol.UnpackedRegVal(addr, enc_val) for addr, enc_val in reg_vals]
+
+        frames = bytearray()
+        for rrv in rrvs:
+            req = protocol.UnpackedRegWriteRequest(rrv)
+            frames.extend(protocol.insert_packet_into_frame(req))
+
+        self._link.send(frames)
+
+        log.debug("sent {} pipelined reg w reqs".format(len(rrvs)))
+
+        failed_addrs = []
+        for rrv in rrvs:
+            res = self._recv_packet()
+            if not isinstance(res, protocol.UnpackedRegWriteResponse):
+                raise ClientError("got unexpected packet (expected reg write response)")
+            if res.reg_val != rrv:
+                failed_addrs.append(rrv.addr)
+
+        if failed_addrs:
+            raise ClientError("reg write failed (addr {})".format(failed_addrs))
+
+        log.debug("recv {} reg w res: ok".format(len(rrvs)))
+
     def _read_gpio(self, pin):
         req = protocol.UnpackedGPIOPin(pin)
         self._send_packet(req)
@@ -301,7 +455,8 @@ class RegClient(BaseClient):
         frame = protocol.insert_packet_into_frame(packet)
         self._link.send(frame)
 
-    def _recv_packet(self, allow_recovery_skip=False):
+    def _recv_packet(self, allow_recovery_skip=False, tap=None, count=False):
+        t0 = perf_counter()
         buf_1 = self._link.recv(1 + protocol.LEN_FIELD_SIZE)
 
         start_marker = buf_1[0]
@@ -310,6 +465,9 @@ class RegClient(BaseClient):
         if start_marker != protocol.START_MARKER:
             raise ClientError("got invalid frame (incorrect start marker)")
 
+        # links may return views which are only valid until the next recv
+        buf_1 = bytes(buf_1)
+
         buf_2 = self._link.recv(packet_len + 2)
         packet = buf_2[:-1]
         end_marker = buf_2[-1]
@@ -320,29 +478,45 @@ class RegClient(BaseClient):
 
             log.debug("got invalid frame (incorrect end marker), attempting recovery")
 
+            buf_2 = bytearray(buf_2)
             buf_2.extend(self._link.recv(1 + protocol.LEN_FIELD_SIZE))
 
             si = 0
-            ei = len(buf_2)
             expected_sub_len = protocol.LEN_FIELD_SIZE + packet_len + 3
+            max_len = self.MAX_RECOVERY_FRAMES * expected_sub_len
             while True:
-                si = buf_2.find(buf_1, si, ei)
+                si = buf_2.find(buf_1, si)
                 if si < 0:
-                    raise ClientError("got invalid frame and could not recover")
-
-                sub_len_diff = expected_sub_len - (len(buf_2) - si)
+                    # following frames may be corrupt too, so keep looking for a while,
+                    # reading little at a time to not read past the next valid frame
+                    if len(buf_2) >= max_len:
+                        self._count_event("recovery_failures")
+                        raise ClientError("got invalid frame and could not recover")
+
+                    si = max(len(buf_2) - len(buf_1) + 1, 0)
+                    buf_2.extend(self._link.recv(len(buf_1)))
+                    continue
 
-                if sub_len_diff > 0:
-                    buf_2.extend(self._link.recv(sub_len_diff))
+                sub_end = si + expected_sub_len
+                if sub_end > len(buf_2):
+                    buf_2.extend(self._link.recv(sub_end - len(buf_2)))
 
-                if buf_2[-1] != protocol.END_MARKER:
+                if buf_2[sub_end - 1] != protocol.END_MARKER:
                     log.debug("recovery attempt failed")
+                    si += 1
                     continue
 
-                packet = buf_2[si+1+protocol.LEN_FIELD_SIZE:-1]
+                packet = buf_2[si+1+protocol.LEN_FIELD_SIZE:sub_end-1]
                 break
 
             log.warning("successfully recovered from corrupt frame")
+            self._count_event("recoveries")
+
+        if count:
+            self._count_received(len(packet) + protocol.LEN_FIELD_SIZE + 2, t0)
+
+        if tap:
+            tap(packet)
 
         return protocol.unpack_packet(packet)
 
@@ -361,21 +535,51 @@ class RegClient(BaseClient):
         if idn_reg not in possible_ids:
             raise ClientError("unexpected product id")
 
+        return idn_reg
+
 
 class RegSPIClient(BaseClient):
+    FRAME_FORMAT = "reg_spi"
+    DEFAULT_FRAME_POOL_SIZE = 16
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._mode = protocol.NO_MODE
         self._proc = None
         self._num_subsweeps = None
         self._experimental_stitching = None
+        self._sweep_info_decoders = []
+        self._applied_reg_vals = None
+        self._session_info = None
+
+        self._frame_pool_size = kwargs.get("frame_pool_size", self.DEFAULT_FRAME_POOL_SIZE)
+        self._frame_pool_overflow = kwargs.get("frame_pool_overflow", "drop_oldest")
+        self._frame_pool = None
+        self._batch_transactions = kwargs.get("batch_transactions", False)
+        self._data_ready_wait = kwargs.get("data_ready_wait", "busy")
+
+        if self._data_ready_wait not in SPI_DATA_READY_WAITS:
+            raise ValueError("unknown data ready wait {}".format(self._data_ready_wait))
+
+    @property
+    def num_frames_overwritten(self):
+        """Number of frames dropped from the frame pool before they were read"""
+        return self._frame_pool.num_overwritten if self._frame_pool else 0
 
     def _connect(self):
         self._cmd_queue = mp.Queue()
         self._data_queue = mp.Queue()
+        self._frame_pool = links.FramePool(
+            self._frame_pool_size,
+            SPI_MAX_FRAME_SIZE,
+            overflow=self._frame_pool_overflow,
+        )
         args = (
             self._cmd_queue,
             self._data_queue,
+            self._frame_pool,
+            self._batch_transactions,
+            self._data_ready_wait,
             )
         self._proc = SPICommProcess(*args)
         self._proc.start()
@@ -404,36 +608,49 @@ class RegSPIClient(BaseClient):
         return info
 
     def _setup_session(self, config):
-        if len(config.sensor) > 1:
-            raise ValueError("the register protocol does not support multiple sensors")
-        if config.sensor[0] != 1:
-            raise ValueError("the register protocol currently only supports using sensor 1")
+        check_sensor(config)
 
         mode = protocol.get_mode(config.mode)
         self._mode = mode
+        self._sweep_info_decoders = get_sweep_info_decoders(mode)
 
-        self._experimental_stitching = bool(config.experimental_stitching)
-        sweep_rate = None if config.experimental_stitching else config.sweep_rate
-        self.__cmd_proc("set_mode_and_rate", mode, sweep_rate)
+        if config.experimental_stitching:
+            log.warning("experimental stitching on - switching to max freq. mode")
 
-        self._write_reg("main_control", "stop")
+        rvs = utils.get_session_reg_vals(config, "disable")
+        return self._apply_session(config, rvs, rvs, read_info=True)
 
-        self._write_reg("mode_selection", mode)
+    def _reconfigure(self, config):
+        check_sensor(config)
 
-        if config.experimental_stitching:
-            self._write_reg("repetition_mode", "max")
-            log.warning("experimental stitching on - switching to max freq. mode")
-        else:
-            self._write_reg("repetition_mode", "fixed")
+        rvs = utils.get_session_reg_vals(config, "disable")
+        changed_rvs = None
+        if self._applied_reg_vals is not None and protocol.get_mode(config.mode) == self._mode:
+            changed_rvs = utils.get_changed_reg_vals(self._applied_reg_vals, rvs)
+
+        if changed_rvs is None:
+            return self._setup_session(config)
+
+        log.debug("reconfigure: {} changed regs".format(len(changed_rvs)))
+
+        if not changed_rvs:
+            return dict(self._session_info)
 
-        self._write_reg("streaming_control", "disable")
-        self._write_reg("sensor_power_mode", "d")
+        read_info = utils.affects_session_info(changed_rvs, self._mode)
+        return self._apply_session(config, rvs, changed_rvs, read_info)
 
-        if mode == "iq":
-            self._write_reg("output_data_compression", 1)
+    def _apply_session(self, config, rvs, rvs_to_write, read_info):
+        mode = self._mode
+        self._applied_reg_vals = None
 
-        rvs = utils.get_reg_vals_for_config(config)
-        for rv in rvs:
+        self._experimental_stitching = bool(config.experimental_stitching)
+        self._ignore_seq_nums = self._experimental_stitching
+        sweep_rate = None if config.experimental_stitching else config.sweep_rate
+        self.__cmd_proc("set_mode_and_rate", mode, sweep_rate)
+
+        self._write_reg("main_control", "stop")
+
+        for rv in rvs_to_write:
             self._write_reg_raw(rv.addr, rv.val)
 
         self._write_reg("main_control", "create")
@@ -443,10 +660,16 @@ class RegSPIClient(BaseClient):
         if status & protocol.STATUS_ERROR_ON_SERVICE_CREATION_MASK:
             raise ClientError("session setup failed")
 
-        info = {}
-        info_regs = utils.get_session_info_regs(mode)
-        for reg in info_regs:
-            info[reg.name] = self._read_reg(reg)
+        if read_info:
+            info = {}
+            info_regs = utils.get_session_info_regs(mode)
+            for reg in info_regs:
+                info[reg.name] = self._read_reg(reg)
+        else:
+            info = dict(self._session_info)
+
+        self._applied_reg_vals = rvs
+        self._session_info = dict(info)
 
         self._num_subsweeps = info.get("number_of_subsweeps")
 
@@ -465,34 +688,40 @@ class RegSPIClient(BaseClient):
         return info
 
     def _start_streaming(self):
+        self._frame_pool.reset()
         self.__cmd_proc("start_streaming")
-        self._seq_num = None
 
     def _get_next(self):
-        ret_cmd, ret_args = self._data_queue.get()
-        if ret_cmd == "error":
-            raise ClientError("exception raised in SPI communcation process")
-        elif ret_cmd != "get_next":
-            raise ClientError
-        info, buffer = ret_args
-
-        data = protocol.decode_output_buffer(buffer, self._mode, self._num_subsweeps)
-
-        if not self._experimental_stitching:
-            cur_seq_num = info.get("sequence_number")
-            if cur_seq_num:
-                if self._seq_num:
-                    if cur_seq_num > self._seq_num + 1:
-                        log.info("missed sweep")
-                    if cur_seq_num <= self._seq_num:
-                        log.info("got same sweep twice")
-                self._seq_num = cur_seq_num
+        info, data = self._decode_next_frame()
 
         if self.squeeze:
             return info, data
         else:
             return [info], np.expand_dims(data, 0)
 
+    def _get_next_into(self, out):
+        info, _ = self._decode_next_frame(out if self.squeeze else out[0])
+        return info if self.squeeze else [info]
+
+    def _decode_next_frame(self, out=None):
+        try:
+            t0 = perf_counter()
+            with self._frame_pool.get() as frame:
+                self._count_received(len(frame), t0)
+
+                if self._frame_tap:
+                    self._frame_tap(frame)
+
+                args = (self._mode, self._num_subsweeps, out, self.output_dtype)
+                info, data = decode_spi_frame(frame, self._sweep_info_decoders, *args)
+        except links.LinkError:
+            ret_cmd, _ = self._data_queue.get()
+            if ret_cmd == "error":
+                raise ClientError("exception raised in SPI communcation process")
+            raise ClientError
+
+        return info, data
+
     def _stop_streaming(self):
         self.__cmd_proc("stop_streaming")
 
@@ -500,6 +729,11 @@ class RegSPIClient(BaseClient):
         self.__cmd_proc("disconnect")
         self._proc.join(1)
 
+        # The module may be reset before the next connection
+        self._mode = protocol.NO_MODE
+        self._applied_reg_vals = None
+        self._session_info = None
+
     def _read_reg(self, reg):
         reg = protocol.get_reg(reg, self._mode)
         enc_val = self._read_reg_raw(reg.addr)
@@ -555,12 +789,43 @@ class RegSPIClient(BaseClient):
 
 
 class SPICommProcess(mp.Process):
-    def __init__(self, cmd_q, data_q):
+    """Talks to the module over SPI and fills the frame pool while streaming
+
+    With ``batch_transactions``, the register and buffer reads of a frame
+    are chained into full-duplex transfers with the chip select held (see
+    :class:`libft4222.SPITransaction`). When busy polling, the clear_status
+    write ending a frame is deferred and chained with the first status read
+    of the next.
+
+    ``data_ready_wait`` selects how to wait for the next frame:
+
+    * ``"busy"`` - read the status register back to back.
+    * ``"backoff"`` - after a first poll, sleep until shortly before the
+      next frame is expected from the sweep rate, then poll with
+      exponentially growing sleeps.
+    * ``"interrupt"`` - as ``"backoff"``, but poll the trigger queue of the
+      FT4222 interrupt input (GPIO3) and only read the status register once
+      it has triggered, or when the backoff has reached its maximum. The
+      GPIO interface of the FT4222 is opened and initialized for this. Not
+      yet tested on hardware, only against a model of the module.
+    """
+
+    def __init__(self, cmd_q, data_q, frame_pool, batch_transactions=False,
+                 data_ready_wait="busy"):
         super().__init__(daemon=True)
         self.cmd_q = cmd_q
         self.data_q = data_q
+        self.frame_pool = frame_pool
+        self.batch_transactions = batch_transactions
+        self.data_ready_wait = data_ready_wait
+        self.sweep_period = None
+        self.max_poll_sleep = SPI_MAX_POLL_SLEEP
+        self.last_ready_t = None
         self.mode = None
         self.consecutive_error_count = 0
+        self.transaction = libft4222.SPITransaction()
+        self.clear_status_pending = False
+        self.gpio_dev = None
 
     def run(self):
         self.log = logging.getLogger(__name__)
@@ -574,6 +839,7 @@ class SPICommProcess(mp.Process):
             traceback.print_exc()
             print("\n\n")
             self.data_q.put(("error", ()))
+            self.frame_pool.close()
 
         while True:
             try:
@@ -600,22 +866,33 @@ class SPICommProcess(mp.Process):
         self.consecutive_error_count = 0
 
         while self.cmd_q.empty():
-            ret = self.get_next()
-            self.data_q.put(("get_next", ret))
+            self.get_next()
 
     def get_next(self):
         poll_t = time()
+        num_polls = 0
         while True:
-            status = self.read_reg("status", do_log=False)
+            backoff_saturated = self.wait_before_poll(num_polls)
+            num_polls += 1
+
+            # the status is also read when the backoff saturates, in case an edge was missed
+            if self.data_ready_wait == "interrupt" and not backoff_saturated:
+                if not self.read_interrupt():
+                    if (time() - poll_t) > self.poll_timeout:
+                        raise ClientError("gave up polling")
+                    continue
+
+            status = self.read_status()
             if not status:
                 if (time() - poll_t) > self.poll_timeout:
                     raise ClientError("gave up polling")
                 continue
             elif status & protocol.STATUS_DATA_READY_MASK:
                 self.consecutive_error_count = 0
+                self.last_ready_t = time()
                 break
             elif status & protocol.STATUS_ERROR_MASK:
-                self.write_reg("main_control", "clear_status")
+                self.clear_status()
                 log.info("lost sweep due to server error")
 
                 self.consecutive_error_count += 1
@@ -624,20 +901,133 @@ class SPICommProcess(mp.Process):
             else:
                 raise ClientError("got unexpected status ({})".format(status))
 
+        frame = None
+        while frame is None:
+            frame = self.frame_pool.reserve(timeout=self.poll_timeout)
+            if frame is None and not self.cmd_q.empty():
+                return  # the consumer is blocked and a command is waiting
+
+        # frame layout: encoded sweep info register values followed by the buffer
+        info_size = protocol.REG_SIZE * len(self.sweep_info_regs)
+
+        if self.batch_transactions:
+            buffer_size = self.read_frame_batched(frame, info_size)
+
+            if self.data_ready_wait == "busy":
+                self.clear_status_pending = True
+            else:
+                self.clear_status()
+
+            self.frame_pool.commit(info_size + buffer_size)
+            return
+
         buffer_size = self.fixed_buf_size or self.read_reg("output_data_buffer_length")
         if buffer_size > 0:
-            buffer = self.read_buf_raw(protocol.MAIN_BUFFER_ADDR, buffer_size)
-        else:
-            buffer = bytearray()
+            out = frame[info_size:info_size+buffer_size]
+            self.read_buf_raw(protocol.MAIN_BUFFER_ADDR, buffer_size, out=out)
 
-        info = {}
-        info_regs = utils.get_sweep_info_regs(self.mode)
-        for reg in info_regs:
-            info[reg.name] = self.read_reg(reg, do_log=False)
+        for i, reg in enumerate(self.sweep_info_regs):
+            out = frame[i*protocol.REG_SIZE:(i+1)*protocol.REG_SIZE]
+            self.read_reg_raw(reg.addr, do_log=False, out=out)
+
+        self.clear_status()
+
+        self.frame_pool.commit(info_size + buffer_size)
+
+    def wait_before_poll(self, num_polls):
+        """Sleeps before a status poll, returning True once the backoff is at its maximum"""
+
+        if self.data_ready_wait == "busy":
+            return True
+
+        if num_polls == 0:
+            return False  # the next frame may already be ready if we are behind
+
+        if num_polls == 1 and self.sweep_period is not None and self.last_ready_t is not None:
+            # wake up a bit before the next frame is expected
+            dt = self.last_ready_t + 0.9 * self.sweep_period - time()
+            if dt > 0:
+                sleep(dt)
+                return False
+
+        dt = SPI_MIN_POLL_SLEEP * 2**min(num_polls - 1, 16)
+        saturated = dt >= self.max_poll_sleep
+        sleep(min(dt, self.max_poll_sleep))
+        return saturated
+
+    def read_interrupt(self):
+        port = libft4222.GPIOPort.PORT3
+        num_events = self.gpio_dev.gpio_get_trigger_status(port)
+        if num_events > 0:
+            self.gpio_dev.gpio_read_trigger_queue(port, num_events)
+            return True
+
+        return False
+
+    def clear_status(self):
+        if not self.batch_transactions:
+            self.write_reg("main_control", "clear_status", do_log=False)
+            return
+
+        self.add_reg_write(self.transaction, "main_control", "clear_status")
+        self.transaction.execute(self.dev)
+
+    def read_status(self):
+        if not self.batch_transactions:
+            return self.read_reg("status", do_log=False)
+
+        t = self.transaction
+        if self.clear_status_pending:
+            self.add_reg_write(t, "main_control", "clear_status")
+            self.clear_status_pending = False
+
+        status_reg = protocol.get_reg("status", self.mode)
+        i = self.add_reg_read(t, status_reg.addr)
+        return protocol.decode_reg_val(status_reg, t.execute(self.dev)[i])
+
+    def read_frame_batched(self, frame, info_size):
+        t = self.transaction
+        info_idxs = [self.add_reg_read(t, reg.addr) for reg in self.sweep_info_regs]
+
+        buffer_size = self.fixed_buf_size
+        if not buffer_size:
+            length_reg = protocol.get_reg("output_data_buffer_length", self.mode)
+            length_idx = self.add_reg_read(t, length_reg.addr)
+            results = t.execute(self.dev)
+            buffer_size = protocol.decode_reg_val(length_reg, results[length_idx])
+            self.copy_sweep_info(frame, info_idxs, results)
+            info_idxs = None
+
+        # a buffer read lasts until the chip select is released, so it goes last
+        header = [protocol.BUF_READ_REQUEST, protocol.MAIN_BUFFER_ADDR, 0, 0]
+        buffer_idx = None
+        if 0 < buffer_size <= t.max_transfer_size - len(header):
+            buffer_idx = t.add(header, buffer_size)
 
-        self.write_reg("main_control", "clear_status", do_log=False)
+        results = t.execute(self.dev)
 
-        return info, buffer
+        if info_idxs is not None:
+            self.copy_sweep_info(frame, info_idxs, results)
+
+        if buffer_idx is not None:
+            frame[info_size:info_size+buffer_size] = results[buffer_idx]
+        elif buffer_size > 0:
+            out = frame[info_size:info_size+buffer_size]
+            self.read_buf_raw(protocol.MAIN_BUFFER_ADDR, buffer_size, out=out)
+
+        return buffer_size
+
+    def copy_sweep_info(self, frame, info_idxs, results):
+        for i, idx in enumerate(info_idxs):
+            frame[i*protocol.REG_SIZE:(i+1)*protocol.REG_SIZE] = results[idx]
+
+    def add_reg_read(self, transaction, addr):
+        return transaction.add([protocol.REG_READ_REQUEST, addr, 0, 0], protocol.REG_SIZE)
+
+    def add_reg_write(self, transaction, reg, val):
+        reg = protocol.get_reg(reg, self.mode)
+        enc_val = protocol.encode_reg_val(reg, val)
+        return transaction.add(bytes([protocol.REG_WRITE_REQUEST, reg.addr, 0, 0]) + enc_val)
 
     def connect(self):
         self.dev = libft4222.Device()
@@ -649,14 +1039,29 @@ class SPICommProcess(mp.Process):
         self.dev.set_suspend_out(False)
         self.dev.set_wake_up_interrupt(False)
 
+        if self.data_ready_wait == "interrupt":
+            # the trigger queue is read through the GPIO interface, which must be initialized
+            self.gpio_dev = libft4222.Device()
+            self.gpio_dev.open_ex(b"FT4222 B")
+            self.gpio_dev.gpio_init([libft4222.GPIODir.INPUT] * 4)
+            self.gpio_dev.set_wake_up_interrupt(True)
+            self.gpio_dev.set_interrupt_trigger(libft4222.GPIOTrigger.RISING)
+
     def set_mode_and_rate(self, mode, sweep_rate):
         self.mode = mode
+        self.sweep_info_regs = utils.get_sweep_info_regs(mode)
         if sweep_rate:
             self.poll_timeout = (2/sweep_rate + 0.5)
+            self.sweep_period = 1 / sweep_rate
+            self.max_poll_sleep = min(SPI_MAX_POLL_SLEEP, self.sweep_period / 10)
         else:
             self.poll_timeout = 1.0
+            self.sweep_period = None
+            self.max_poll_sleep = SPI_MAX_POLL_SLEEP
 
     def start_streaming(self):
+        self.clear_status_pending = False
+        self.last_ready_t = None
         self.write_reg("main_control", "activate")
         sleep(SPI_MAIN_CTRL_SLEEP)
         self.write_reg("main_control", "clear_status")
@@ -670,21 +1075,26 @@ class SPICommProcess(mp.Process):
             self.fixed_buf_size = None
 
     def stop_streaming(self):
+        self.clear_status_pending = False
         self.write_reg("main_control", "stop")
 
     def disconnect(self):
         self.dev.close()
+        if self.gpio_dev is not None:
+            self.gpio_dev.close()
+            self.gpio_dev = None
 
     def read_reg(self, reg, do_log=True):
         reg = protocol.get_reg(reg, self.mode)
         enc_val = self.read_reg_raw(reg.addr, do_log=do_log)
         return protocol.decode_reg_val(reg, enc_val)
 
-    def read_reg_raw(self, addr, do_log=True):
+    def read_reg_raw(self, addr, do_log=True, out=None):
         addr = protocol.get_addr_for_reg(addr)
         b = bytearray([protocol.REG_READ_REQUEST, addr, 0, 0])
         self.dev.spi_master_single_write(b)
-        enc_val = self.dev.spi_master_single_read(4)
+        enc_val = bytearray(protocol.REG_SIZE) if out is None else out
+        self.dev.spi_master_single_read_into(enc_val)
         if do_log:
             log.debug("reg r res: addr: {:3} val: {}".format(addr, utils.fmt_enc_val(enc_val)))
         return enc_val
@@ -702,7 +1112,45 @@ class SPICommProcess(mp.Process):
             log.debug("reg w req: addr: {:3} val: {}".format(addr, utils.fmt_enc_val(enc_val)))
         self.dev.spi_master_single_write(enc_val)
 
-    def read_buf_raw(self, addr, size):
+    def read_buf_raw(self, addr, size, out=None):
+        """Reads a buffer, straight into out if given"""
+
         b = bytearray([protocol.BUF_READ_REQUEST, addr, 0, 0])
         self.dev.spi_master_single_write(b)
-        return self.dev.spi_master_single_read(size)
+
+        out = bytearray(size) if out is None else out
+        self.dev.spi_master_single_read_into(out)
+        return out
+
+
+def decode_spi_frame(frame, sweep_info_decoders, mode, num_subsweeps=None, out=None,
+                     output_dtype="float64"):
+    """Decodes a frame from the SPI communication process
+
+    A frame is the encoded values of the sweep info registers, in the order
+    of the given (name, decoder) pairs, followed by the output buffer.
+    """
+
+    num_info_regs = len(sweep_info_decoders)
+    enc_vals = np.frombuffer(frame, dtype="<u4", count=num_info_regs).tolist()
+    info = {}
+    for (name, decode), x in zip(sweep_info_decoders, enc_vals):
+        info[name] = decode(x)
+
+    buffer = frame[num_info_regs*protocol.REG_SIZE:]
+    data = protocol.decode_output_buffer(buffer, mode, num_subsweeps, out, output_dtype)
+    return info, data
+
+
+def get_sweep_info_decoders(mode):
+    return [
+        (reg.name, protocol.get_reg_val_decoder(reg))
+        for reg in utils.get_sweep_info_regs(mode)
+    ]
+
+
+def check_sensor(config):
+    if len(config.sensor) > 1:
+        raise ValueError("the register protocol does not support multiple sensors")
+    if config.sensor[0] != 1:
+        raise ValueError("the register protocol currently only supports using sensor 1")
@@ -0,0 +1,86 @@
+"""On-disk cache of how register protocol modules were last reached
+
+Profiles are keyed by the port and, for USB serial ports, the serial number
+of the USB device, so that a different module plugged into the same port
+does not hit a stale entry.
+"""
+
+from collections import namedtuple
+import json
+import logging
+import os
+
+import serial.tools.list_ports
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"),
+    ".cache",
+    "acconeer_utils",
+    "connection_profiles.json",
+)
+
+ConnectionProfile = namedtuple("ConnectionProfile", ["product_id", "baudrate"])
+
+
+def get_usb_serial_number(port):
+    try:
+        port_infos = serial.tools.list_ports.comports()
+    except Exception:
+        return None
+
+    for port_info in port_infos:
+        if port_info.device == port:
+            return getattr(port_info, "serial_number", None)
+
+    return None
+
+
+def get_profile_key(port):
+    serial_number = get_usb_serial_number(port)
+    return "{}|{}".format(port, serial_number or "")
+
+
+class ConnectionProfileCache:
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+
+    def get(self, key):
+        profile = self._load().get(key)
+
+        try:
+            return ConnectionProfile(int(profile["product_id"]), int(profile["baudrate"]))
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def put(self, key, profile):
+        profiles = self._load()
+        profiles[key] = dict(profile._asdict())
+        self._save(profiles)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                profiles = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.debug("ignoring unreadable connection profile cache: {}".format(e))
+            return {}
+
+        if not isinstance(profiles, dict):
+            return {}
+
+        return profiles
+
+    def _save(self, profiles):
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(profiles, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.debug("could not write connection profile cache: {}".format(e))
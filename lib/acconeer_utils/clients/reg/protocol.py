@@ -1,6 +1,8 @@
 from collections import namedtuple
 import numpy as np
 
+from acconeer_utils.clients.base import decode_into, get_raw_dtype
+
 
 Reg = namedtuple(
         "Reg",
@@ -509,6 +511,8 @@ for reg in REGS:
         REG_LOOKUP[mode][reg.name] = reg
         REG_LOOKUP[mode][reg.addr] = reg
 
+RESULT_INFO_DTYPE = np.dtype([("addr", "u1"), ("val", "<u4")])
+
 
 def get_mode(mode):
     if isinstance(mode, str):
@@ -574,25 +578,80 @@ def encode_reg_val(reg, val, mode=None):
 def decode_reg_val(reg, enc_val, mode=None):
     reg = get_reg(reg, mode)
 
-    if reg.type == "u":
-        x = int.from_bytes(enc_val, BO)
-    elif reg.type == "i":
-        x = int.from_bytes(enc_val, BO, signed=True)
+    if reg.type not in ["u", "i", "b"]:
+        return enc_val
+
+    return get_reg_val_decoder(reg)(int.from_bytes(enc_val, BO))
+
+
+def get_reg_val_decoder(reg, mode=None):
+    """Returns a function decoding a register value given as an unsigned integer"""
+
+    reg = get_reg(reg, mode)
+
+    try:
+        return REG_VAL_DECODERS[reg.name, reg.addr]
+    except KeyError:
+        return make_reg_val_decoder(reg)
+
+
+def make_reg_val_decoder(reg):
+    if reg.type == "i":
+        def to_val(x):
+            return x - (1 << 32) if x & (1 << 31) else x
     elif reg.type == "b":
-        x = any(enc_val)
+        to_val = bool
     else:
-        x = enc_val
+        to_val = None
 
     if isinstance(reg.val_map, EncFuns):
-        return reg.val_map.decode_fun(x)
+        decode_fun = reg.val_map.decode_fun
+        if to_val is None:
+            return decode_fun
+        return lambda x: decode_fun(to_val(x))
     elif isinstance(reg.val_map, dict):
+        inverted_val_map = {}
         for k, v in reg.val_map.items():
-            if v == x:
-                return k
-        else:
-            raise ProtocolError("could not decode register value (value not in map)")
+            inverted_val_map.setdefault(v, k)
+
+        def decode(x):
+            try:
+                return inverted_val_map[x if to_val is None else to_val(x)]
+            except KeyError:
+                raise ProtocolError("could not decode register value (value not in map)")
+
+        return decode
     else:
-        return x
+        return to_val or int
+
+
+def decode_result_info(result_info, mode):
+    """Decodes stream result info into a dict of register values by name
+
+    Returns the dict and a list of the (address, value) pairs for registers
+    that are unknown in the mode.
+    """
+
+    decoders = RESULT_INFO_DECODERS[get_mode(mode)]
+    info = {}
+    unknown = []
+    for addr, x in result_info.tolist():
+        try:
+            name, decode = decoders[addr]
+            info[name] = decode(x)
+        except (KeyError, ProtocolError):
+            unknown.append((addr, x))
+
+    return info, unknown
+
+
+REG_VAL_DECODERS = {(reg.name, reg.addr): make_reg_val_decoder(reg) for reg in REGS}
+RESULT_INFO_DECODERS = {}
+for mode in REG_LOOKUP.keys():
+    RESULT_INFO_DECODERS[mode] = {}
+    for addr in filter(lambda k: isinstance(k, int), {**REG_LOOKUP[mode], **REG_LOOKUP[NO_MODE]}):
+        reg = get_reg(addr, mode)
+        RESULT_INFO_DECODERS[mode][addr] = (reg.name, REG_VAL_DECODERS[reg.name, reg.addr])
 
 
 def unpack_packet(packet):
@@ -659,16 +718,10 @@ def unpack_stream_data_segment(segment):
 
         if part_type == STREAM_RESULT_INFO:
             s = ADDR_SIZE + REG_SIZE
-            if part_len % s != 0:
+            if part_len % s != 0 or len(part_data) != part_len:
                 raise UnpackError("invalid package length")
 
-            result_info = []
-            num_regs = part_len // s
-            for i in range(num_regs):
-                addr = part_data[s*i]
-                enc_val = part_data[s*i+1:s*(i+1)]
-                rrv = UnpackedRegVal(addr, enc_val)
-                result_info.append(rrv)
+            result_info = np.frombuffer(part_data, dtype=RESULT_INFO_DTYPE)
         elif part_type == STREAM_BUFFER:
             buffer = part_data
         else:
@@ -758,22 +811,54 @@ def insert_packet_into_frame(packet):
     return frame
 
 
-def decode_output_buffer(buffer, mode, number_of_subsweeps=None):
+def get_wire_dtype(mode):
+    """Returns the dtype of the samples of the mode in output buffers"""
+
+    return get_raw_dtype(get_mode(mode), "<")
+
+
+def decode_output_buffer(buffer, mode, number_of_subsweeps=None, out=None, output_dtype="float64"):
+    """Decodes an output buffer, into the array out if given
+
+    With output_dtype set to "raw", the native integers are returned as is,
+    and IQ data gets a trailing axis of length 2 for the real and imaginary
+    parts.
+    """
+
     mode = get_mode(mode)
+    raw_output = output_dtype == "raw"
+    float_dtype = "float32" if output_dtype == "float32" else "float"
+    complex_dtype = "complex64" if output_dtype == "float32" else "complex"
+
     if mode == "power_bin":
-        return np.frombuffer(buffer, dtype="<f4").astype("float")
+        raw = np.frombuffer(buffer, dtype="<f4")
+        return decode_into(raw, out, "f4" if raw_output else float_dtype)
     elif mode == "envelope":
-        return np.frombuffer(buffer, dtype="<u2").astype("float")
+        raw = np.frombuffer(buffer, dtype="<u2")
+        return decode_into(raw, out, "u2" if raw_output else float_dtype)
     elif mode == "iq":
-        sweep = np.frombuffer(buffer, dtype="<i2").astype("float") * 2**(-12)
-        return sweep.reshape((2, -1), order="F").view(dtype="complex").reshape(-1)
+        raw = np.frombuffer(buffer, dtype="<i2").reshape((-1, 2))
+        if raw_output:
+            return decode_into(raw, out, "i2")
+        if out is None:
+            out = np.empty(len(raw), dtype=complex_dtype)
+        out.real = raw[:, 0]
+        out.imag = raw[:, 1]
+        out *= 2**(-12)
+        return out
     elif mode == "sparse":
-        sweep = np.frombuffer(buffer, dtype="<u2").astype("float")
-        sweep -= 2**15
-        sweep = sweep.reshape((number_of_subsweeps, -1))
-        return sweep
+        raw = np.frombuffer(buffer, dtype="<u2").reshape((number_of_subsweeps, -1))
+        if raw_output:
+            return decode_into(raw, out, "u2")
+        out = decode_into(raw, out, float_dtype)
+        out -= 2**15
+        return out
     elif mode == "distance_peak_fix_threshold":
-        sweep = np.frombuffer(buffer, dtype="<f4, <u2")
-        return sweep.astype("float, float").view("float").reshape((-1, 2))
+        raw = np.frombuffer(buffer, dtype="<f4, <u2")
+        if out is None:
+            out = np.empty((len(raw), 2), dtype=float_dtype)
+        out[:, 0] = raw["f0"]
+        out[:, 1] = raw["f1"]
+        return out
     else:
         raise NotImplementedError
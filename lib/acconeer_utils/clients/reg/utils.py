@@ -2,6 +2,15 @@ from acconeer_utils.clients.reg import protocol
 from acconeer_utils.clients.base import decode_version_str
 
 
+# Registers that never change what the session info registers read
+SESSION_INFO_INDEPENDENT_REGS = [
+    "gain",
+    "hw_accelerated_average_samples",
+    "running_average_factor",
+    "compensate_phase",
+]
+
+
 def get_regs_for_mode(mode):
     mode = protocol.get_mode(mode)
     for reg in protocol.REGS:
@@ -35,6 +44,55 @@ def get_reg_vals_for_config(config):
     return reg_vals
 
 
+def get_session_reg_vals(config, streaming_control):
+    """Returns all register values written when setting up a session, in order"""
+
+    mode = protocol.get_mode(config.mode)
+
+    reg_vals = [("mode_selection", mode)]
+
+    if config.experimental_stitching:
+        reg_vals.append(("repetition_mode", "max"))
+    else:
+        reg_vals.append(("repetition_mode", "fixed"))
+
+    reg_vals.append(("streaming_control", streaming_control))
+    reg_vals.append(("sensor_power_mode", "d"))
+
+    if mode == "iq":
+        reg_vals.append(("output_data_compression", 1))
+
+    rvs = []
+    for reg, val in reg_vals:
+        reg = protocol.get_reg(reg, mode)
+        rvs.append(protocol.UnpackedRegVal(reg.addr, protocol.encode_reg_val(reg, val)))
+
+    rvs.extend(get_reg_vals_for_config(config))
+    return rvs
+
+
+def get_changed_reg_vals(applied_rvs, rvs):
+    """Returns the register values in rvs that differ from the applied ones
+
+    Returns None if the registers themselves differ, in which case the
+    session has to be set up from scratch.
+    """
+
+    applied = {addr: bytes(val) for addr, val in applied_rvs}
+    if applied.keys() != {rv.addr for rv in rvs}:
+        return None
+
+    return [rv for rv in rvs if applied[rv.addr] != bytes(rv.val)]
+
+
+def affects_session_info(rvs, mode):
+    for rv in rvs:
+        if protocol.get_reg(rv.addr, mode).name not in SESSION_INFO_INDEPENDENT_REGS:
+            return True
+
+    return False
+
+
 def fmt_enc_val(enc_val):
     return " ".join(["{:02x}".format(x) for x in enc_val])
 
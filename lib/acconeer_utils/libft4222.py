@@ -15,6 +15,8 @@ C_STATUS = C_ULONG
 C_HANDLE = C_PVOID
 C_INT_ENUM = ctypes.c_ulong  # not part of original headers
 
+SMALL_TRANSFER_SIZE = 4096  # transfers up to this size go through scratch buffers
+
 
 class C_DeviceListInfoNode(ctypes.Structure):
     _fields_ = [
@@ -124,6 +126,25 @@ class SPICPHA(enum.IntEnum):
     CLK_TRAILING = 1
 
 
+class GPIOPort(enum.IntEnum):
+    PORT0 = 0
+    PORT1 = enum.auto()
+    PORT2 = enum.auto()
+    PORT3 = enum.auto()
+
+
+class GPIODir(enum.IntEnum):
+    OUTPUT = 0
+    INPUT = enum.auto()
+
+
+class GPIOTrigger(enum.IntEnum):
+    RISING = 0x01
+    FALLING = 0x02
+    LEVEL_HIGH = 0x04
+    LEVEL_LOW = 0x08
+
+
 class DrivingStrength(enum.IntEnum):
     DS_4MA = 0
     DS_8MA = enum.auto()
@@ -142,6 +163,18 @@ FUN_ARGTYPES = {
     "FT_SetTimeouts": [C_HANDLE, C_ULONG, C_ULONG],
     "FT4222_SetSuspendOut": [C_HANDLE, C_BOOL],
     "FT4222_SetWakeUpInterrupt": [C_HANDLE, C_BOOL],
+    "FT4222_SetInterruptTrigger": [C_HANDLE, C_INT_ENUM],
+    "FT4222_GPIO_Init": [C_HANDLE, C_INT_ENUM * 4],
+    "FT4222_GPIO_Read": [C_HANDLE, C_INT_ENUM, POINTER(C_BOOL)],
+    "FT4222_GPIO_Write": [C_HANDLE, C_INT_ENUM, C_BOOL],
+    "FT4222_GPIO_GetTriggerStatus": [C_HANDLE, C_INT_ENUM, POINTER(ctypes.c_uint16)],
+    "FT4222_GPIO_ReadTriggerQueue": [
+        C_HANDLE,
+        C_INT_ENUM,
+        POINTER(C_INT_ENUM),
+        ctypes.c_uint16,
+        POINTER(ctypes.c_uint16),
+    ],
     "FT4222_UnInitialize": [C_HANDLE],
     "FT4222_SPI_SetDrivingStrength": [C_HANDLE, C_INT_ENUM, C_INT_ENUM, C_INT_ENUM],
     "FT4222_SPIMaster_Init": [
@@ -238,10 +271,12 @@ class LibFT4222Error(Exception):
 class Device:
     def __init__(self, handle=None):
         self.handle = handle
+        self._scratch_bufs = {}
         _load_dll()
 
-    def open_ex(self):
-        _locationId = b"FT4222 A"
+    def open_ex(self, description=b"FT4222 A"):
+        """Opens an interface by description, A for SPI and B for GPIO"""
+        _locationId = description
         self.handle = C_HANDLE()
         check_status(funs["FT_OpenEx"](_locationId, OPEN_BY_DESCRIPTION, byref(self.handle)))
 
@@ -269,8 +304,48 @@ class Device:
         check_status(funs["FT4222_SetSuspendOut"](self.handle, enable))
 
     def set_wake_up_interrupt(self, enable):
+        """Enables GPIO3 as the wake-up/interrupt input"""
         check_status(funs["FT4222_SetWakeUpInterrupt"](self.handle, enable))
 
+    def set_interrupt_trigger(self, trigger):
+        check_status(funs["FT4222_SetInterruptTrigger"](self.handle, get_enum_val(trigger)))
+
+    def gpio_init(self, dirs):
+        _dirs = (C_INT_ENUM * 4)(*[get_enum_val(d) for d in dirs])
+        check_status(funs["FT4222_GPIO_Init"](self.handle, _dirs))
+
+    def gpio_read(self, port):
+        _val = C_BOOL()
+        check_status(funs["FT4222_GPIO_Read"](self.handle, get_enum_val(port), byref(_val)))
+        return bool(_val.value)
+
+    def gpio_write(self, port, val):
+        check_status(funs["FT4222_GPIO_Write"](self.handle, get_enum_val(port), val))
+
+    def gpio_get_trigger_status(self, port):
+        """Returns the number of events in the trigger queue of the port"""
+        _queue_size = ctypes.c_uint16()
+        status = funs["FT4222_GPIO_GetTriggerStatus"](
+                self.handle,
+                get_enum_val(port),
+                byref(_queue_size)
+                )
+        check_status(status)
+        return int(_queue_size.value)
+
+    def gpio_read_trigger_queue(self, port, max_num_events):
+        _events = (C_INT_ENUM * max_num_events)()
+        _num_read = ctypes.c_uint16()
+        status = funs["FT4222_GPIO_ReadTriggerQueue"](
+                self.handle,
+                get_enum_val(port),
+                _events,
+                max_num_events,
+                byref(_num_read)
+                )
+        check_status(status)
+        return [GPIOTrigger(e) for e in _events[:_num_read.value]]
+
     def spi_master_init(self, io_line=SPIMode.SPI_IO_SINGLE, clock=SPIClock.CLK_NONE,
                         cpol=SPICPOL.CLK_IDLE_LOW, cpha=SPICPHA.CLK_LEADING, sso_map=1):
         status = funs["FT4222_SPIMaster_Init"](
@@ -294,7 +369,19 @@ class Device:
         check_status(status)
 
     def spi_master_single_read(self, num_bytes, is_end_transaction=True):
-        read_buffer = (ctypes.c_uint8 * num_bytes)()
+        buf = bytearray(num_bytes)
+        self.spi_master_single_read_into(buf, is_end_transaction)
+        return buf
+
+    def spi_master_single_read_into(self, buf, is_end_transaction=True):
+        """Reads len(buf) bytes into the writable byte buffer buf
+
+        Large reads go straight into buf. Small ones go through a scratch
+        buffer, since wrapping buf costs more than copying a few bytes.
+        """
+
+        num_bytes = len(buf)
+        read_buffer, scratch_view = self._get_read_buffer(buf)
         size_transferred = ctypes.c_uint16()
         status = funs["FT4222_SPIMaster_SingleRead"](
                 self.handle,
@@ -307,11 +394,12 @@ class Device:
         assert size_transferred.value == num_bytes
         check_status(status)
 
-        return bytearray(read_buffer)
+        if scratch_view is not None:
+            buf[:] = scratch_view[:num_bytes]
 
     def spi_master_single_write(self, data, is_end_transaction=True):
         num_bytes = len(data)
-        write_buffer = (ctypes.c_uint8 * num_bytes)(*data)
+        write_buffer = self._get_write_buffer(data)
         size_transferred = ctypes.c_uint16()
         status = funs["FT4222_SPIMaster_SingleWrite"](
                 self.handle,
@@ -325,9 +413,19 @@ class Device:
         check_status(status)
 
     def spi_master_single_read_write(self, write_data, is_end_transaction=True):
+        buf = bytearray(len(write_data))
+        self.spi_master_single_read_write_into(write_data, buf, is_end_transaction)
+        return buf
+
+    def spi_master_single_read_write_into(self, write_data, buf, is_end_transaction=True):
+        """Like spi_master_single_read_write, but reads into the byte buffer buf"""
+
         num_bytes = len(write_data)
-        read_buffer = (ctypes.c_uint8 * num_bytes)()
-        write_buffer = (ctypes.c_uint8 * num_bytes)(*write_data)
+        if len(buf) != num_bytes:
+            raise ValueError("read and write sizes differ")
+
+        read_buffer, scratch_view = self._get_read_buffer(buf)
+        write_buffer = self._get_write_buffer(write_data)
         size_transferred = ctypes.c_uint16()
         status = funs["FT4222_SPIMaster_SingleReadWrite"](
                 self.handle,
@@ -341,7 +439,106 @@ class Device:
         assert size_transferred.value == num_bytes
         check_status(status)
 
-        return bytearray(read_buffer)
+        if scratch_view is not None:
+            buf[:] = scratch_view[:num_bytes]
+
+    def _get_read_buffer(self, buf):
+        num_bytes = len(buf)
+        if num_bytes > SMALL_TRANSFER_SIZE:
+            return (ctypes.c_uint8 * num_bytes).from_buffer(buf), None
+
+        return self._get_scratch_buffer("r", num_bytes)
+
+    def _get_write_buffer(self, data):
+        num_bytes = len(data)
+        if num_bytes > SMALL_TRANSFER_SIZE and isinstance(data, bytearray):
+            return (ctypes.c_uint8 * num_bytes).from_buffer(data)
+
+        write_buffer, view = self._get_scratch_buffer("w", num_bytes)
+        try:
+            view[:num_bytes] = data
+        except TypeError:
+            view[:num_bytes] = bytes(data)
+
+        return write_buffer
+
+    def _get_scratch_buffer(self, direction, num_bytes):
+        """Returns a reused buffer of at least num_bytes, and a byte view of it"""
+
+        size = 1 << max(num_bytes - 1, 0).bit_length()
+        try:
+            return self._scratch_bufs[direction, size]
+        except KeyError:
+            buf = (ctypes.c_uint8 * size)()
+            self._scratch_bufs[direction, size] = (buf, memoryview(buf).cast("B"))
+            return self._scratch_bufs[direction, size]
+
+
+class SPITransaction:
+    """Chains several SPI accesses into full-duplex transfers
+
+    Each access writes some bytes and then clocks in a number of bytes, all
+    while the chip select is held. Accesses are packed into as few
+    ``spi_master_single_read_write`` calls as the maximum transfer size
+    allows, so the chip select is only released between transfers.
+
+    The transfers are read into a buffer owned by the transaction, so the
+    results of ``execute`` are only valid until the next call.
+    """
+
+    MAX_TRANSFER_SIZE = 2**16 - 1
+
+    def __init__(self, max_transfer_size=MAX_TRANSFER_SIZE):
+        self.max_transfer_size = max_transfer_size
+        self._accesses = []
+        self._tx = bytearray(max_transfer_size)
+        self._rx = bytearray()
+        self._zeros = memoryview(bytes(max_transfer_size))
+
+    def __len__(self):
+        return len(self._accesses)
+
+    def add(self, write_data, num_read_bytes=0):
+        """Adds an access, returning its index in the results of execute"""
+
+        size = len(write_data) + num_read_bytes
+        if size > self.max_transfer_size:
+            raise ValueError("access is larger than the maximum transfer size")
+
+        self._accesses.append((bytes(write_data), num_read_bytes))
+        return len(self._accesses) - 1
+
+    def execute(self, device):
+        """Returns the bytes read by each access, as memoryviews"""
+
+        total_size = sum(len(write_data) + n for write_data, n in self._accesses)
+        if len(self._rx) < total_size:
+            self._rx = bytearray(total_size)
+
+        tx = memoryview(self._tx)
+        rx = memoryview(self._rx)
+        results = []
+        start = 0  # of the current transfer in rx
+        pos = 0
+        for write_data, num_read_bytes in self._accesses:
+            if pos - start + len(write_data) + num_read_bytes > self.max_transfer_size:
+                device.spi_master_single_read_write_into(tx[:pos-start], rx[start:pos])
+                start = pos
+
+            i = pos - start
+            tx[i:i+len(write_data)] = write_data
+            i += len(write_data)
+            tx[i:i+num_read_bytes] = self._zeros[:num_read_bytes]
+
+            pos += len(write_data)
+            results.append(rx[pos:pos+num_read_bytes])
+            pos += num_read_bytes
+
+        if pos > start:
+            device.spi_master_single_read_write_into(tx[:pos-start], rx[start:pos])
+
+        self._accesses.clear()
+        return results
 
 
 def print_devices():
@@ -0,0 +1,1277 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+import json
+import logging
+import os
+import re
+import time
+
+import h5py
+import numpy as np
+
+from acconeer_utils.clients import configs
+from acconeer_utils.clients.base import RAW_SCALE_AND_OFFSET, decode_raw, encode_raw
+
+
+log = logging.getLogger(__name__)
+
+
+MODE_TO_SERVICE_TYPE_MAP = {
+    "power_bin": "Power bin",
+    "envelope": "Envelope",
+    "iq": "IQ",
+    "sparse": "Sparse",
+}
+
+MODE_TO_CONFIG_CLASS_MAP = {
+    "power_bin": configs.PowerBinServiceConfig,
+    "envelope": configs.EnvelopeServiceConfig,
+    "iq": configs.IQServiceConfig,
+    "sparse": configs.SparseServiceConfig,
+}
+
+# Sensor config attributes stored as int datasets when the config has them
+INT_CONFIG_KEYS = [
+    "bin_count",
+    "number_of_subsweeps",
+    "hw_accelerated_average_samples",
+    "stepsize",
+    "sampling_mode",
+]
+
+# Frames per chunk are picked so that a chunk of the frame dataset is about this size
+CHUNK_BYTES = 2**18
+
+# Datasets of the frames and their info, the rest being metadata
+FRAME_DATASETS = [
+    "real",
+    "imag",
+    "raw",
+    "sequence_number",
+    "data_saturated",
+    "timestamp",
+    "index",
+]
+
+# A row of the index per block of frames written, normally a chunk
+INDEX_DTYPE = np.dtype([
+    ("first_frame", "i8"),
+    ("start_time", "f8"),
+    ("end_time", "f8"),
+    ("first_sequence_number", "i8"),
+    ("last_sequence_number", "i8"),
+])
+
+
+class Recorder:
+    """Writes frames to an HDF5 file as they arrive
+
+    The file has the layout the GUI saves and loads scans in: the frames in
+    the float32 ``real`` and ``imag`` datasets, the sequence numbers and
+    saturation flags in ``sequence_number`` and ``data_saturated`` (one
+    column per sensor), and the sensor config and session info alongside.
+
+    The frame datasets are chunked and grow as frames are added with
+    :meth:`append`. Only one chunk of frames is held in memory before it is
+    written, so memory use doesn't grow with the session length. Pass
+    compression (and compression_opts), as for ``h5py``, to compress the
+    datasets. The ``imag`` dataset is never written for modes other than IQ,
+    so its chunks take no space in the file.
+
+    The host time of each frame is stored in ``timestamp``, and a row per
+    block of frames written (normally a chunk) in ``index``, with the first
+    frame and the time and sequence number ranges of the block. This lets
+    :meth:`RecordingReader.seek` find frames without reading the rest.
+    Frames added without a timestamp or receive time are stamped with the
+    time they are added, which is late by the processing before. Such
+    timestamps, and any set by the caller with ``synthetic_timestamps``,
+    are marked by a true ``synthetic_timestamps`` dataset. With timestamps
+    unset, no times are stored, and the index only has sequence numbers.
+
+    With raw set, the recording is compact: frames are appended as given by
+    a client with ``output_dtype="raw"`` and stored as is, in the native
+    integers of the mode, in the ``raw`` dataset instead of ``real`` and
+    ``imag``. The mode and the scale and offset converting them to floats
+    are stored as ``mode``, ``raw_scale`` and ``raw_offset``.
+    :class:`RecordingReader` decodes such recordings on read.
+
+    The service type defaults to the GUI label of the config mode. Extra
+    datasets, such as the GUI's ``profile`` or ``processing_config_dump``,
+    are written with :meth:`write_metadata`.
+    """
+
+    def __init__(self, filename, sensor_config, session_info=None, service_type=None,
+                 compression=None, compression_opts=None, chunk_frames=None, raw=False,
+                 timestamps=True):
+        self.filename = filename
+        self.sensor_config = sensor_config
+        self.num_sensors = len(sensor_config.sensor)
+        self.is_complex = sensor_config.mode == "iq" and not raw
+        self.raw = raw
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.chunk_frames = chunk_frames
+        self.num_frames = 0
+        self.timestamps = timestamps
+        self.synthetic_timestamps = False
+
+        self._buf = None
+        self._buf_len = 0
+        self._has_info = None
+
+        if service_type is None:
+            service_type = MODE_TO_SERVICE_TYPE_MAP.get(sensor_config.mode)
+
+        self.file = h5py.File(filename, "w")
+        try:
+            self._write_config(sensor_config, session_info, service_type)
+        except Exception:
+            self.file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, info, data, timestamp=None):
+        """Adds a frame, with the info as returned by the client
+
+        The timestamp defaults to the ``receive_time`` of the info, if the
+        client has metrics enabled, else the current time, which marks the
+        timestamps as synthetic.
+        """
+
+        infos = [info] if isinstance(info, dict) else info
+
+        if self._buf is None:
+            self._setup(bool(infos) and "sequence_number" in infos[0], data)
+
+        if not self.timestamps:
+            timestamp = np.nan
+        elif timestamp is None:
+            timestamp = infos[0].get("receive_time") if infos else None
+            if timestamp is None:
+                timestamp = time.time()
+                self.synthetic_timestamps = True
+
+        i = self._buf_len
+        self._buf["data"][i] = data
+        self._buf["timestamp"][i] = timestamp
+
+        if self._has_info:
+            for s, d in enumerate(infos[:self.num_sensors]):
+                self._buf["sequence_number"][i, s] = d.get("sequence_number", -1)
+                self._buf["data_saturated"][i, s] = d.get("data_saturated", False)
+
+        self._buf_len += 1
+        if self._buf_len == len(self._buf["data"]):
+            self.flush()
+
+    def extend(self, data, sequence_number=None, data_saturated=None, timestamp=None):
+        """Adds frames stacked along the first axis, with the info as arrays
+
+        The info arrays have a column per sensor, or are one dimensional for
+        a single sensor. The timestamps default to the current time, which
+        marks them as synthetic. This is quicker than appending frame by
+        frame.
+        """
+
+        data = np.asarray(data)
+        if not len(data):
+            return
+
+        if self._buf is None:
+            self._setup(sequence_number is not None, data[0])
+
+        if not self.timestamps:
+            timestamp = np.full(len(data), np.nan)
+        elif timestamp is None:
+            timestamp = np.full(len(data), time.time())
+            self.synthetic_timestamps = True
+
+        if self._has_info:
+            shape = (len(data), self.num_sensors)
+            sequence_number = np.reshape(sequence_number, shape)
+            if data_saturated is None:
+                data_saturated = np.zeros(shape, dtype=bool)
+            data_saturated = np.reshape(data_saturated, shape)
+
+        i = 0
+        while i < len(data):
+            a = self._buf_len
+            n = min(len(data) - i, len(self._buf["data"]) - a)
+            self._buf["data"][a:a+n] = data[i:i+n]
+            self._buf["timestamp"][a:a+n] = timestamp[i:i+n]
+
+            if self._has_info:
+                self._buf["sequence_number"][a:a+n] = sequence_number[i:i+n]
+                self._buf["data_saturated"][a:a+n] = data_saturated[i:i+n]
+
+            i += n
+            self._buf_len += n
+            if self._buf_len == len(self._buf["data"]):
+                self.flush()
+
+    def flush(self):
+        """Writes the buffered frames to the file"""
+
+        if not self._buf_len:
+            self.file.flush()
+            return
+
+        n = self._buf_len
+        a, b = self.num_frames, self.num_frames + n
+        data = self._buf["data"][:n]
+
+        names = ["raw"] if self.raw else ["real", "imag"]
+        if self.timestamps:
+            names.append("timestamp")
+        if self._has_info:
+            names += ["sequence_number", "data_saturated"]
+
+        for name in names:
+            self.file[name].resize(b, axis=0)
+
+        timestamps = self._buf["timestamp"][:n]
+        if self.timestamps:
+            self.file["timestamp"][a:b] = timestamps
+
+        row = np.zeros(1, dtype=INDEX_DTYPE)
+        row["first_frame"] = a
+        row["start_time"] = timestamps[0]
+        row["end_time"] = timestamps[-1]
+        if self._has_info:
+            row["first_sequence_number"] = self._buf["sequence_number"][0, 0]
+            row["last_sequence_number"] = self._buf["sequence_number"][n - 1, 0]
+        else:
+            row["first_sequence_number"] = row["last_sequence_number"] = -1
+
+        index = self.file["index"]
+        index.resize(len(index) + 1, axis=0)
+        index[-1] = row[0]
+
+        if self.raw:
+            self.file["raw"][a:b] = data
+        elif self.is_complex:
+            self.file["real"][a:b] = data.real
+            self.file["imag"][a:b] = data.imag
+        else:
+            self.file["real"][a:b] = data
+
+        if self._has_info:
+            self.file["sequence_number"][a:b] = self._buf["sequence_number"][:n]
+            self.file["data_saturated"][a:b] = self._buf["data_saturated"][:n]
+
+        self.num_frames = b
+        self._buf_len = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file:
+            return
+
+        try:
+            self.flush()
+            if self.synthetic_timestamps and "synthetic_timestamps" not in self.file:
+                self.write_metadata("synthetic_timestamps", True)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def write_metadata(self, name, value, dtype=None):
+        """Writes a dataset of a single value, strings as variable length strings"""
+
+        if isinstance(value, str):
+            dtype = h5py.special_dtype(vlen=str)
+
+        self.file.create_dataset(name, data=value, dtype=dtype)
+
+    def _write_config(self, sensor_config, session_info, service_type):
+        if sensor_config.sweep_rate is not None:
+            self.write_metadata("sweep_rate", sensor_config.sweep_rate, np.float32)
+
+        self.write_metadata("start", float(sensor_config.range_start), np.float32)
+        self.write_metadata("end", float(sensor_config.range_end), np.float32)
+        self.write_metadata("gain", float(sensor_config.gain), np.float32)
+        self.write_metadata("sensor", sensor_config.sensor, int)
+
+        if service_type is not None:
+            self.write_metadata("service_type", service_type)
+
+        for key in INT_CONFIG_KEYS:
+            val = getattr(sensor_config, key, None)
+            if val is not None:
+                self.write_metadata(key, int(val), int)
+
+        if hasattr(sensor_config, "subsweep_rate"):
+            val = sensor_config.subsweep_rate
+            self.write_metadata("subsweep_rate", -1 if val is None else val, np.float32)
+
+        if session_info is not None:
+            self.write_metadata("session_info", json.dumps(session_info, default=json_default))
+
+        if self.raw:
+            scale, offset = RAW_SCALE_AND_OFFSET[sensor_config.mode]
+            self.write_metadata("mode", sensor_config.mode)
+            self.write_metadata("raw_scale", scale, float)
+            self.write_metadata("raw_offset", offset, float)
+
+    def _setup(self, has_info, data):
+        data = np.asarray(data)
+        frame_shape = data.shape
+
+        if self.raw:
+            if data.dtype.kind == "f" and self.sensor_config.mode != "power_bin":
+                raise ValueError("raw recordings take frames of output dtype raw")
+            frame_dtype = data.dtype
+        else:
+            frame_dtype = np.dtype(np.float32)
+
+        if self.chunk_frames is None:
+            frame_bytes = max(np.prod(frame_shape, dtype=int) * frame_dtype.itemsize, 1)
+            self.chunk_frames = max(CHUNK_BYTES // frame_bytes, 1)
+
+        self._has_info = has_info
+
+        kwargs = dict(compression=self.compression, compression_opts=self.compression_opts)
+        for name in ["raw"] if self.raw else ["real", "imag"]:
+            self.file.create_dataset(
+                name,
+                shape=(0, ) + frame_shape,
+                maxshape=(None, ) + frame_shape,
+                chunks=(self.chunk_frames, ) + frame_shape,
+                dtype=frame_dtype,
+                fillvalue=0,
+                **kwargs,
+            )
+
+        info_shape = (0, self.num_sensors)
+        info_chunks = (max(self.chunk_frames, 1024), self.num_sensors)
+        if self.timestamps:
+            self.file.create_dataset(
+                "timestamp",
+                shape=(0, ),
+                maxshape=(None, ),
+                chunks=info_chunks[:1],
+                dtype="f8",
+                **kwargs,
+            )
+        self.file.create_dataset(
+            "index",
+            shape=(0, ),
+            maxshape=(None, ),
+            chunks=(256, ),
+            dtype=INDEX_DTYPE,
+        )
+
+        if self._has_info:
+            self.file.create_dataset(
+                "sequence_number",
+                shape=info_shape,
+                maxshape=(None, self.num_sensors),
+                chunks=info_chunks,
+                dtype=int,
+                **kwargs,
+            )
+            self.file.create_dataset(
+                "data_saturated",
+                shape=info_shape,
+                maxshape=(None, self.num_sensors),
+                chunks=info_chunks,
+                dtype="u1",
+                **kwargs,
+            )
+
+        buf_dtype = np.complex64 if self.is_complex else frame_dtype
+        self._buf = {
+            "data": np.zeros((self.chunk_frames, ) + frame_shape, dtype=buf_dtype),
+            "sequence_number": np.zeros((self.chunk_frames, self.num_sensors), dtype=int),
+            "data_saturated": np.zeros((self.chunk_frames, self.num_sensors), dtype="u1"),
+            "timestamp": np.full(self.chunk_frames, np.nan),
+        }
+
+
+class RecordingReader:
+    """Reads the frames of an HDF5 recording lazily
+
+    Frames are read from the file when indexed, so recordings larger than
+    memory can be processed. ``reader[i]`` returns frame i and
+    ``reader[a:b]`` an array of the frames, read in one go. Iterating reads
+    a chunk of frames at a time, see :meth:`iter_chunks`. IQ frames are
+    returned as complex.
+
+    Compact recordings, see :class:`Recorder`, are decoded on read to the
+    output dtype, float64 by default. The output dtype raw gives the stored
+    integers. Other recordings are read as stored.
+
+    The info columns, ``sequence_number`` and ``data_saturated``, are read
+    as arrays of one column per sensor, or None if not stored. The sensor
+    config is restored from the file in :attr:`sensor_config`.
+
+    Recordings with an index, see :class:`Recorder`, can be searched by
+    time or sequence number with :meth:`seek` and :meth:`window`, which
+    only read the index and a block of timestamps or sequence numbers.
+
+    For the GUI, :meth:`frame_dicts` gives a lazy sequence of the per-frame
+    dicts it handles.
+    """
+
+    def __init__(self, filename, output_dtype="float64"):
+        self.filename = filename
+        self.output_dtype = output_dtype
+        self.file = h5py.File(filename, "r")
+
+        try:
+            self.is_raw = "raw" in self.file
+            if self.is_raw:
+                self._frames = self.file["raw"]
+                self._imag = None
+            else:
+                self._frames = self.file["real"]
+                self._imag = self.file.get("imag")
+
+            self.service_type = self.read_metadata("service_type")
+            self.mode = self._detect_mode()
+        except Exception:
+            self.file.close()
+            raise
+
+        self.is_complex = self.mode == "iq" and self._imag is not None
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, key):
+        if self.is_raw:
+            raw = self._frames[key]
+            if self.output_dtype == "raw":
+                return raw
+
+            return decode_raw(raw, self.mode, self.output_dtype)
+
+        if self.is_complex:
+            return self._frames[key] + 1j * self._imag[key]
+
+        return self._frames[key]
+
+    def __iter__(self):
+        for _, frames in self.iter_chunks():
+            yield from frames
+
+    def iter_chunks(self, num_frames=None, start=0, stop=None):
+        """Yields (start index, frames) of blocks of frames from start to stop
+
+        Blocks are a chunk of the file long by default, and aligned to the
+        chunks, so that each chunk is read once.
+        """
+
+        if num_frames is None:
+            num_frames = (self._frames.chunks or (1024, ))[0]
+
+        stop = len(self) if stop is None else min(stop, len(self))
+
+        a = start
+        while a < stop:
+            b = min((a // num_frames + 1) * num_frames, stop)
+            yield a, self[a:b]
+            a = b
+
+    @property
+    def index(self):
+        """The index of the recording as a structured array, None if not stored"""
+
+        if "index" not in self._columns:
+            self._columns["index"] = self.file["index"][()] if "index" in self.file else None
+
+        return self._columns["index"]
+
+    @property
+    def timestamp(self):
+        return self._read_column("timestamp")
+
+    @property
+    def synthetic_timestamps(self):
+        """True if the timestamps aren't receive times, see :class:`Recorder`"""
+
+        return bool(self.read_metadata("synthetic_timestamps", False))
+
+    @property
+    def start_time(self):
+        return self.index["start_time"][0] if self._has_times() else None
+
+    @property
+    def end_time(self):
+        return self.index["end_time"][-1] if self._has_times() else None
+
+    @property
+    def duration(self):
+        """Seconds from the first to the last frame, None if not timed or indexed"""
+
+        return self.end_time - self.start_time if self._has_times() else None
+
+    def seek(self, time=None, sequence_number=None):
+        """Returns the index of the first frame at or after a time or sequence number
+
+        The time is host time, as stored in ``timestamp``. Returns the
+        number of frames if all are before. Assumes the timestamps and
+        sequence numbers increase through the recording.
+        """
+
+        if self.index is None:
+            raise ValueError("{} has no index".format(self.filename))
+
+        if time is not None:
+            key, name, value = "end_time", "timestamp", time
+        elif sequence_number is not None:
+            key, name, value = "last_sequence_number", "sequence_number", sequence_number
+        else:
+            raise ValueError("either time or sequence_number must be given")
+
+        if name not in self.file:
+            raise ValueError("{} has no {}".format(self.filename, name))
+
+        row = np.searchsorted(self.index[key], value)
+        if row == len(self.index):
+            return len(self)
+
+        a = int(self.index["first_frame"][row])
+        b = int(self.index["first_frame"][row + 1]) if row + 1 < len(self.index) else len(self)
+        block = self.file[name][a:b]
+        if block.ndim > 1:
+            block = block[:, 0]
+
+        return a + int(np.searchsorted(block, value))
+
+    def window(self, t0, t1):
+        """Returns the frames from time t0 up to t1"""
+
+        return self[self.seek(time=t0):self.seek(time=t1)]
+
+    @property
+    def frame_shape(self):
+        if self.is_raw and self.mode == "iq" and self.output_dtype != "raw":
+            return self._frames.shape[1:-1]
+
+        return self._frames.shape[1:]
+
+    @property
+    def sequence_number(self):
+        return self._read_column("sequence_number")
+
+    @property
+    def data_saturated(self):
+        return self._read_column("data_saturated", dtype=bool)
+
+    @property
+    def num_sensors(self):
+        sensor = self.read_metadata("sensor")
+        return 1 if sensor is None else np.size(sensor)
+
+    @property
+    def session_info(self):
+        s = self.read_metadata("session_info")
+        return None if s is None else json.loads(s)
+
+    @property
+    def sensor_config(self):
+        """The sensor config of the recording, None if the mode is unknown"""
+
+        if self.mode is None:
+            return None
+
+        config = MODE_TO_CONFIG_CLASS_MAP[self.mode]()
+
+        sensor = self.read_metadata("sensor")
+        if sensor is not None:
+            config.sensor = [int(s) for s in np.atleast_1d(sensor)]
+
+        start, end = self.read_metadata("start"), self.read_metadata("end")
+        if start is not None and end is not None:
+            config.range_interval = [float(start), float(end)]
+
+        sweep_rate = self.read_metadata("sweep_rate")
+        if sweep_rate is not None:
+            config.sweep_rate = float(sweep_rate)
+
+        gain = self.read_metadata("gain")
+        if gain is not None:
+            config.gain = float(gain)
+
+        for key in INT_CONFIG_KEYS:
+            val = self.read_metadata(key)
+            if val is not None and hasattr(config, key):
+                setattr(config, key, int(val))
+
+        subsweep_rate = self.read_metadata("subsweep_rate")
+        if subsweep_rate is not None and hasattr(config, "subsweep_rate"):
+            config.subsweep_rate = float(subsweep_rate) if subsweep_rate > 0 else None
+
+        return config
+
+    def read_metadata(self, name, default=None):
+        """Reads a dataset of a single value, strings decoded"""
+
+        if name not in self.file:
+            return default
+
+        val = self.file[name][()]
+        if isinstance(val, bytes):
+            val = val.decode()
+
+        return val
+
+    def frame_dicts(self, start=0, stop=None, **common):
+        """Returns a lazy sequence of the frames as dicts, as used by the GUI
+
+        Each dict has the frame as ``sweep_data``, the info of it (if
+        stored) as ``info``, and the given common items. The sequence has
+        the frames from start to stop, such as a range found with
+        :meth:`seek`.
+        """
+
+        stop = len(self) if stop is None else min(stop, len(self))
+        return FrameDicts(self, common, start, stop)
+
+    def close(self):
+        self.file.close()
+
+    def _has_times(self):
+        return self.index is not None and len(self.index) > 0 and "timestamp" in self.file
+
+    def _read_column(self, name, dtype=None):
+        if name not in self._columns:
+            if name in self.file:
+                col = self.file[name][()]
+                if col.ndim == 1 and name != "timestamp":
+                    col = col[:, None]
+                if dtype is not None:
+                    col = col.astype(dtype)
+            else:
+                col = None
+
+            self._columns[name] = col
+
+        return self._columns[name]
+
+    def _detect_mode(self):
+        if self.is_raw:
+            return self.read_metadata("mode")
+
+        if self.service_type is not None:
+            for mode, label in MODE_TO_SERVICE_TYPE_MAP.items():
+                if self.service_type.lower() in (mode, label.lower()):
+                    return mode
+
+        if "number_of_subsweeps" in self.file:
+            return "sparse"
+        if "bin_count" in self.file:
+            return "power_bin"
+
+        if self._imag is not None and len(self._imag):
+            n = (self._imag.chunks or (1, ))[0]
+            if np.any(self._imag[:n]):
+                return "iq"
+
+        if len(self._frames) and np.iscomplexobj(self._frames[0]):
+            return "iq"
+
+        return None if self.service_type else "envelope"
+
+
+class FrameDicts(Sequence):
+    """Lazy sequence of the frames of a recording as dicts
+
+    Dicts are built when indexed, except the first, which is kept so that
+    items set on it (like the GUI does with ``session_info``) stay. Stored
+    timestamps, unless synthetic, are given as the ``receive_time`` of the
+    info, so that they are kept if the frames are recorded again.
+    """
+
+    def __init__(self, reader, common, start=0, stop=None):
+        self.reader = reader
+        self.common = common
+        self.start = start
+        self.stop = len(reader) if stop is None else stop
+        self._first = None
+        self._timestamps = None if reader.synthetic_timestamps else reader.timestamp
+
+    def __len__(self):
+        return max(self.stop - self.start, 0)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("frame index out of range")
+
+        if i == 0:
+            if self._first is None:
+                self._first = self._make(self.start, self.reader[self.start])
+            return self._first
+
+        return self._make(self.start + i, self.reader[self.start + i])
+
+    def __iter__(self):
+        for a, frames in self.reader.iter_chunks(start=self.start, stop=self.stop):
+            for i, frame in enumerate(frames, start=a):
+                if i == self.start:
+                    yield self[0]
+                else:
+                    yield self._make(i, frame)
+
+    def _make(self, i, frame):
+        d = dict(self.common)
+        d["sweep_data"] = frame
+
+        seq_nums = self.reader.sequence_number
+        if seq_nums is not None:
+            saturated = self.reader.data_saturated
+            d["info"] = [
+                {
+                    "sequence_number": int(seq_nums[i, s]),
+                    "data_saturated": bool(saturated[i, s]) if saturated is not None else False,
+                } for s in range(seq_nums.shape[1])]
+
+            if self._timestamps is not None:
+                for info in d["info"]:
+                    info["receive_time"] = float(self._timestamps[i])
+
+        return d
+
+
+class SegmentedRecorder:
+    """Records to a directory of segment files, rolling over by size or duration
+
+    Each segment is a recording written by :class:`Recorder`, with the
+    given keyword arguments, so it can be opened on its own, for example in
+    the GUI. A new segment is started when the current one has reached
+    max_segment_bytes on disk, or when a frame would make it span
+    max_segment_duration seconds or more. Size is checked as chunks are
+    written to the file, so segments may be up to a chunk larger.
+
+    With max_total_bytes, the oldest segments are deleted once the closed
+    segments take up more space than that, always keeping the latest one.
+
+    A segment is indexed when it is closed: its time range, frame range
+    and sequence number range are written to it as the ``segment_info``
+    dataset and to ``manifest.json`` in the directory, which
+    :class:`SegmentedReader` reads. Recording to a directory with a
+    manifest continues it. Segments left unclosed by an interrupted
+    recording are indexed then, from what was flushed to them, or listed as
+    ``unindexed`` in the manifest if they can't be read. Either way they
+    are never overwritten, and count towards max_total_bytes. The metadata, such as the GUI's
+    ``profile``, is written to every segment.
+    """
+
+    MANIFEST_FILENAME = "manifest.json"
+
+    def __init__(self, directory, sensor_config, session_info=None, max_segment_bytes=None,
+                 max_segment_duration=None, max_total_bytes=None, prefix="segment",
+                 metadata=None, **recorder_kwargs):
+        self.directory = directory
+        self.sensor_config = sensor_config
+        self.session_info = session_info
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_duration = max_segment_duration
+        self.max_total_bytes = max_total_bytes
+        self.prefix = prefix
+        self.metadata = metadata or {}
+        self.recorder_kwargs = recorder_kwargs
+
+        self.recorder = None
+        self.num_frames = 0
+        self.manifest_path = os.path.join(directory, self.MANIFEST_FILENAME)
+
+        os.makedirs(directory, exist_ok=True)
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+
+        self.segments = manifest.get("segments", [])
+        if self.segments:
+            last = self.segments[-1]
+            self.num_frames = last["first_frame"] + last["num_frames"]
+
+        # unreadable segments of an interrupted recording, only deleted by retention
+        self._unindexed = manifest.get("unindexed", [])
+
+        indices = [segment["index"] for segment in self.segments + self._unindexed]
+        self._next_segment_index = max(indices) + 1 if indices else 0
+        self._segment = None
+        self._flushed_frames = 0
+
+        recovered = self._recover_segments()
+        if self._apply_retention() or recovered:
+            self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, info, data, timestamp=None):
+        """Adds a frame, with the info as returned by the client
+
+        The timestamp (host time) defaults as for :meth:`Recorder.append`.
+        """
+
+        infos = [info] if isinstance(info, dict) else info
+        synthetic = False
+        if timestamp is None:
+            timestamp = infos[0].get("receive_time") if infos else None
+            if timestamp is None:
+                timestamp = time.time()
+                synthetic = True
+
+        if self.recorder is not None and self.max_segment_duration is not None:
+            if timestamp - self._segment["start_time"] >= self.max_segment_duration:
+                self._close_segment()
+
+        if self.recorder is None:
+            self._open_segment(timestamp)
+
+        self.recorder.append(info, data, timestamp)
+        if synthetic:
+            self.recorder.synthetic_timestamps = True
+
+        segment = self._segment
+        segment["num_frames"] += 1
+        segment["end_time"] = timestamp
+        if infos and "sequence_number" in infos[0]:
+            seq_num = int(infos[0]["sequence_number"])
+            if segment["first_sequence_number"] is None:
+                segment["first_sequence_number"] = seq_num
+            segment["last_sequence_number"] = seq_num
+
+        self.num_frames += 1
+
+        if self._is_segment_full():
+            self._close_segment()
+
+    def roll_over(self):
+        """Closes the current segment, the next frame starting a new one"""
+
+        if self.recorder is not None:
+            self._close_segment()
+
+    def close(self):
+        self.roll_over()
+
+    def _is_segment_full(self):
+        if self.max_segment_bytes is None:
+            return False
+
+        # the file only grows as chunks are written
+        if self.recorder.num_frames == self._flushed_frames:
+            return False
+
+        self._flushed_frames = self.recorder.num_frames
+        return os.path.getsize(self.recorder.filename) >= self.max_segment_bytes
+
+    def _recover_segments(self):
+        """Indexes the segment files missing from the manifest, returns True if any"""
+
+        pattern = re.compile(r"{}_(\d+)\.h5$".format(re.escape(self.prefix)))
+        found = []
+        for filename in os.listdir(self.directory):
+            match = pattern.match(filename)
+            if match and int(match.group(1)) >= self._next_segment_index:
+                found.append((int(match.group(1)), filename))
+
+        for index, filename in sorted(found):
+            segment = self._index_segment(index, filename)
+            if segment is None:
+                log.warning("could not read unfinished segment {}".format(filename))
+                self._unindexed.append({
+                    "index": index,
+                    "filename": filename,
+                    "num_bytes": os.path.getsize(os.path.join(self.directory, filename)),
+                })
+            else:
+                log.info("indexed unfinished segment {}".format(filename))
+                self.segments.append(segment)
+                self.num_frames += segment["num_frames"]
+
+            self._next_segment_index = index + 1
+
+        return bool(found)
+
+    def _index_segment(self, index, filename):
+        path = os.path.join(self.directory, filename)
+        try:
+            with RecordingReader(path) as reader:
+                if not len(reader) or reader.start_time is None:
+                    return None
+
+                seq_nums = reader.sequence_number
+                return {
+                    "index": index,
+                    "filename": filename,
+                    "start_time": float(reader.start_time),
+                    "end_time": float(reader.end_time),
+                    "first_frame": self.num_frames,
+                    "num_frames": len(reader),
+                    "first_sequence_number": None if seq_nums is None else int(seq_nums[0, 0]),
+                    "last_sequence_number": None if seq_nums is None else int(seq_nums[-1, 0]),
+                    "num_bytes": os.path.getsize(path),
+                }
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _open_segment(self, timestamp):
+        index = self._next_segment_index
+        filename = "{}_{:06d}.h5".format(self.prefix, index)
+
+        self.recorder = Recorder(
+            os.path.join(self.directory, filename),
+            self.sensor_config,
+            session_info=self.session_info,
+            **self.recorder_kwargs,
+        )
+
+        for name, value in self.metadata.items():
+            self.recorder.write_metadata(name, value)
+
+        self._next_segment_index += 1
+        self._flushed_frames = 0
+        self._segment = {
+            "index": index,
+            "filename": filename,
+            "start_time": timestamp,
+            "end_time": timestamp,
+            "first_frame": self.num_frames,
+            "num_frames": 0,
+            "first_sequence_number": None,
+            "last_sequence_number": None,
+        }
+
+    def _close_segment(self):
+        segment = self._segment
+        recorder = self.recorder
+        self.recorder = None
+        self._segment = None
+
+        try:
+            recorder.write_metadata("segment_info", json.dumps(segment))
+        finally:
+            recorder.close()
+
+        segment["num_bytes"] = os.path.getsize(recorder.filename)
+        self.segments.append(segment)
+        self._apply_retention()
+        self._write_manifest()
+
+    def _apply_retention(self):
+        """Deletes the oldest segments while over max_total_bytes, returns True if any"""
+
+        if self.max_total_bytes is None:
+            return False
+
+        deleted = False
+        total = sum(segment["num_bytes"] for segment in self.segments + self._unindexed)
+        while len(self.segments) + len(self._unindexed) > 1 and total > self.max_total_bytes:
+            if self._unindexed and (
+                    not self.segments or self._unindexed[0]["index"] < self.segments[0]["index"]):
+                segment = self._unindexed.pop(0)
+            else:
+                segment = self.segments.pop(0)
+            total -= segment["num_bytes"]
+            try:
+                os.remove(os.path.join(self.directory, segment["filename"]))
+            except FileNotFoundError:
+                pass
+
+            log.info("deleted segment {}".format(segment["filename"]))
+            deleted = True
+
+        return deleted
+
+    def _write_manifest(self):
+        manifest = {"segments": self.segments}
+        if self._unindexed:
+            manifest["unindexed"] = self._unindexed
+
+        # written to a temporary file first, so that readers never see half a manifest
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        os.replace(tmp_path, self.manifest_path)
+
+
+class SegmentedReader:
+    """Reads the frames of a segmented recording as one
+
+    Reads the segments listed in the manifest of the directory, see
+    :class:`SegmentedRecorder`, opening each with :class:`RecordingReader`
+    (with the given keyword arguments) when first read from. Frames are
+    indexed from the first frame of the oldest segment kept.
+    """
+
+    def __init__(self, directory, **reader_kwargs):
+        self.directory = directory
+        self.reader_kwargs = reader_kwargs
+        self.segments = read_manifest(directory)
+
+        self._starts = []
+        n = 0
+        for segment in self.segments:
+            self._starts.append(n)
+            n += segment["num_frames"]
+
+        self._len = n
+        self._readers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            a, b, step = key.indices(len(self))
+            if step != 1:
+                return np.array([self[i] for i in range(a, b, step)])
+
+            blocks = []
+            for i, segment in enumerate(self.segments):
+                start = self._starts[i]
+                lo, hi = max(a - start, 0), min(b - start, segment["num_frames"])
+                if lo < hi:
+                    blocks.append(self.reader(i)[lo:hi])
+
+            return np.concatenate(blocks) if blocks else np.array([])
+
+        i = key + len(self) if key < 0 else key
+        if not 0 <= i < len(self):
+            raise IndexError("frame index out of range")
+
+        segment_index = bisect_right(self._starts, i) - 1
+        return self.reader(segment_index)[i - self._starts[segment_index]]
+
+    def __iter__(self):
+        for _, frames in self.iter_chunks():
+            yield from frames
+
+    def seek(self, time=None, sequence_number=None):
+        """Returns the index of the first frame at or after a time or sequence number
+
+        See :meth:`RecordingReader.seek`. Segments without sequence numbers
+        are skipped when seeking by sequence number.
+        """
+
+        if time is not None:
+            key, value = "end_time", time
+        elif sequence_number is not None:
+            key, value = "last_sequence_number", sequence_number
+        else:
+            raise ValueError("either time or sequence_number must be given")
+
+        idxs = [i for i, segment in enumerate(self.segments) if segment[key] is not None]
+        if not idxs:
+            raise ValueError("{} has no sequence numbers".format(self.directory))
+
+        j = bisect_left([self.segments[i][key] for i in idxs], value)
+        if j == len(idxs):
+            return len(self)
+
+        i = idxs[j]
+
+        offset = self.reader(i).seek(time=time, sequence_number=sequence_number)
+        return self._starts[i] + offset
+
+    def window(self, t0, t1):
+        """Returns the frames from time t0 up to t1"""
+
+        return self[self.seek(time=t0):self.seek(time=t1)]
+
+    def iter_chunks(self):
+        """Yields (start index, frames) of the chunks of all segments in order"""
+
+        for i, start in enumerate(self._starts):
+            for a, frames in self.reader(i).iter_chunks():
+                yield start + a, frames
+
+    @property
+    def sequence_number(self):
+        cols = [self.reader(i).sequence_number for i in range(len(self.segments))]
+        if not cols or any(col is None for col in cols):
+            return None
+
+        return np.concatenate(cols)
+
+    def reader(self, segment_index):
+        """Returns the reader of a segment"""
+
+        if segment_index not in self._readers:
+            filename = os.path.join(self.directory, self.segments[segment_index]["filename"])
+            self._readers[segment_index] = RecordingReader(filename, **self.reader_kwargs)
+
+        return self._readers[segment_index]
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+
+        self._readers = {}
+
+
+def read_manifest(directory):
+    """Returns the segments listed in the manifest of a segmented recording"""
+
+    with open(os.path.join(directory, SegmentedRecorder.MANIFEST_FILENAME)) as f:
+        return json.load(f)["segments"]
+
+
+def convert_recording(src, dst, compression=None, compression_opts=None):
+    """Converts an .h5 or .npy recording to a compact .h5 recording
+
+    The frames are converted to the raw output of the mode, which is
+    lossless for frames from a sensor. Metadata of .h5 recordings is copied.
+    Frames without timestamps are given synthetic times from the sweep rate,
+    starting at zero, or none if the sweep rate isn't set.
+    """
+
+    if str(src).endswith(".npy"):
+        frames = np.load(src, allow_pickle=True)
+        first = frames[0]
+        sensor_config = first["sensor_config"]
+        session_info = first.get("session_info")
+        service_type = first.get("service_type")
+        metadata = {}
+        if first.get("cl_file"):
+            metadata["clutter_file"] = first["cl_file"]
+        if first.get("processing_config_dump"):
+            metadata["processing_config_dump"] = first["processing_config_dump"]
+
+        all_infos = [d.get("info") for d in frames]
+        sweep_rate = getattr(sensor_config, "sweep_rate", None)
+        timestamps, synthetic = info_timestamps(all_infos, sweep_rate)
+
+        def chunks():
+            for a in range(0, len(frames), 1024):
+                b = min(a + 1024, len(frames))
+                data = np.array([d["sweep_data"] for d in frames[a:b]])
+                times = None if timestamps is None else timestamps[a:b]
+                infos = all_infos[a:b]
+                if infos[0] is None:
+                    yield data, None, None, times
+                    continue
+
+                infos = [[info] if isinstance(info, dict) else info for info in infos]
+                seq_nums = [[d["sequence_number"] for d in info] for info in infos]
+                saturated = [[d.get("data_saturated", False) for d in info] for info in infos]
+                yield data, seq_nums, saturated, times
+
+        reader = None
+    else:
+        reader = RecordingReader(src)
+        sensor_config = reader.sensor_config
+        session_info = reader.session_info
+        service_type = reader.service_type
+        metadata = {}
+        for name, dataset in reader.file.items():
+            if name not in FRAME_DATASETS and dataset.shape == ():
+                metadata[name] = reader.read_metadata(name)
+
+        timestamps, synthetic = reader.timestamp, False
+        sweep_rate = getattr(sensor_config, "sweep_rate", None)
+        if timestamps is None and sweep_rate:
+            timestamps, synthetic = np.arange(len(reader)) / sweep_rate, True
+
+        def chunks():
+            for a, data in reader.iter_chunks():
+                b = a + len(data)
+                columns = [reader.sequence_number, reader.data_saturated, timestamps]
+                yield (data, ) + tuple(None if col is None else col[a:b] for col in columns)
+
+    try:
+        if sensor_config is None:
+            raise ValueError("the mode of {} is unknown".format(src))
+
+        mode = sensor_config.mode
+        scale, _ = RAW_SCALE_AND_OFFSET[mode]
+        max_error = 0
+
+        recorder = Recorder(
+            dst,
+            sensor_config,
+            session_info=session_info,
+            service_type=service_type,
+            compression=compression,
+            compression_opts=compression_opts,
+            raw=True,
+            timestamps=timestamps is not None,
+        )
+
+        with recorder:
+            recorder.synthetic_timestamps = synthetic and timestamps is not None
+            for name, value in metadata.items():
+                if name not in recorder.file:
+                    recorder.write_metadata(name, value)
+
+            for data, seq_nums, saturated, times in chunks():
+                raw = encode_raw(data, mode)
+                error = np.abs(decode_raw(raw, mode) - data).max() / scale
+                max_error = max(max_error, error)
+                recorder.extend(raw, seq_nums, saturated, times)
+    finally:
+        if reader is not None:
+            reader.close()
+
+    if max_error > 1e-3:
+        log.warning("frames of {} were rounded by up to {:.3g} steps".format(src, max_error))
+
+    return recorder.num_frames
+
+
+def info_timestamps(infos, sweep_rate=None, first_frame=0):
+    """Returns the timestamps of frames from their infos, and if synthetic
+
+    The timestamps are the ``receive_time`` of the infos. If any frame lacks
+    one, all are instead given synthetic times from the sweep rate,
+    counting from zero at frame zero (the frames given starting at
+    first_frame). The timestamps are None if the sweep rate is unknown too.
+    """
+
+    timestamps = []
+    for info in infos:
+        if isinstance(info, dict):
+            info = [info]
+        timestamps.append(info[0].get("receive_time") if info else None)
+
+    if None not in timestamps:
+        return np.array(timestamps, dtype="f8"), False
+
+    if not sweep_rate:
+        return None, True
+
+    return np.arange(first_frame, first_frame + len(infos)) / sweep_rate, True
+
+
+def json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+
+    raise TypeError("{} is not JSON serializable".format(type(obj).__name__))
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import socket
+import threading
+
+import numpy as np
+
+from acconeer_utils.clients import AsyncSocketClient, MockClient, UARTClient, configs
+from acconeer_utils.clients.base import ExecutorAsyncClient
+from acconeer_utils.clients.emulator.reg_server import RegServer
+from acconeer_utils.clients.json.client import JSONClient
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_executor_client_streams_concurrently():
+    config = configs.EnvelopeServiceConfig()
+    config.sweep_rate = 50
+
+    async def stream_from(client, num_frames):
+        await client.connect()
+        frames = []
+        async for info, data in client.stream(config):
+            frames.append((info, data))
+            if len(frames) == num_frames:
+                break
+        await client.disconnect()
+        return frames
+
+    clients = [MockClient().as_async() for _ in range(2)]
+    assert all(isinstance(c, ExecutorAsyncClient) for c in clients)
+
+    async def stream_from_all():
+        return await asyncio.gather(*[stream_from(c, 5) for c in clients])
+
+    results = run(stream_from_all())
+
+    for client, frames in zip(clients, results):
+        assert len(frames) == 5
+        assert not client._streaming_started
+        assert [info["sequence_number"] for info, _ in frames] == [1, 2, 3, 4, 5]
+
+
+def serve_json(server_sock, num_frames):
+    conn, _ = server_sock.accept()
+    f = conn.makefile("rb")
+
+    def send(header, payload=b""):
+        header["payload_size"] = len(payload)
+        conn.sendall(json.dumps(header).encode("ascii") + b"\n" + payload)
+
+    payload = np.arange(10, dtype=">u2").tobytes()
+    for line in f:
+        cmd = json.loads(line)["cmd"]
+        if cmd == "get_version":
+            send({"status": "ok", "message": "server version v1.10.0"})
+        elif cmd == "get_board_sensor_count":
+            send({"status": "ok", "message": "4"})
+        elif cmd == "envelope_data":
+            send({"status": "ok", "data_length": 10})
+        elif cmd == "start_streaming":
+            send({"status": "start"})
+            for i in range(num_frames):
+                header = {
+                    "status": "ok",
+                    "type": "envelope_data",
+                    "data_size": 10,
+                    "data_sensors": 1,
+                    "sequence_number": [i],
+                    "data_saturated": [False],
+                }
+                send(header, payload)
+        elif cmd == "stop_streaming":
+            send({"status": "end"})
+            break
+
+    conn.close()
+
+
+def test_async_json_client():
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_sock.bind(("127.0.0.1", 0))
+    server_sock.listen(1)
+    port = server_sock.getsockname()[1]
+
+    thread = threading.Thread(target=serve_json, args=(server_sock, 5))
+    thread.start()
+
+    client = JSONClient("127.0.0.1", metrics=True).as_async()
+    assert isinstance(client, AsyncSocketClient)
+    client._link._PORT = port
+    tapped = []
+    client._frame_tap = lambda header, payload: tapped.append((header, payload))
+
+    async def session():
+        info = await client.connect()
+        assert info["board_sensor_count"] == 4
+
+        frames = []
+        async for info, data in client.stream(configs.EnvelopeServiceConfig()):
+            frames.append((info, data))
+            if len(frames) == 3:
+                break
+
+        batch = await client.get_next_batch(2)
+        await client.disconnect()
+        return frames, batch
+
+    frames, (batch_info, batch_data) = run(session())
+    thread.join()
+    server_sock.close()
+
+    assert [info["sequence_number"] for info, _ in frames] == [0, 1, 2]
+    assert np.array_equal(frames[0][1], np.arange(10))
+    assert list(batch_info["sequence_number"]) == [3, 4]
+    assert np.array_equal(batch_data, [np.arange(10)] * 2)
+
+    assert len(tapped) == 5
+    assert tapped[0][1] == np.arange(10, dtype=">u2").tobytes()
+    snapshot = client.metrics.snapshot()
+    assert snapshot["frames_decoded"] == 5
+    assert snapshot["bytes_received"] == sum(len(h) + len(p) for h, p in tapped)
+    assert np.all(batch_info["timestamp"] >= frames[-1][0]["receive_time"])
+
+
+def test_executor_client_reports_frame_loss():
+    config = configs.EnvelopeServiceConfig()
+
+    with RegServer(frame_rate=2000, corruption=0.1, seed=0) as server:
+        host, port = server.listen()
+        losses = []
+        client = UARTClient(host, socket_port=port, metrics=True,
+                            on_frames_lost=lambda n, info: losses.append(n))
+        async_client = client.as_async()
+
+        async def stream():
+            infos = []
+            await async_client.start_streaming(config)
+            for _ in range(100):
+                infos.append((await async_client.get_next())[0])
+
+            server.corruption = 0
+            for _ in range(20):
+                await async_client.get_next()
+
+            await async_client.disconnect()
+            return infos
+
+        infos = run(stream())
+
+    lost = [info["frames_lost_since_last"] for info in infos]
+    assert sum(lost) > 0
+    assert lost[1:] == [
+        b["sequence_number"] - a["sequence_number"] - 1 for a, b in zip(infos, infos[1:])]
+    assert sum(losses) == client.num_frames_lost == sum(lost)
+    snapshot = client.metrics.snapshot()
+    assert snapshot["missed_frames"] == sum(lost)
+    assert snapshot["frames_decoded"] == 120
+    assert snapshot["decode_seconds"]["count"] == 120
+    assert all("receive_time" in info for info in infos)
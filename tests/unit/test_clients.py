@@ -0,0 +1,184 @@
+from time import perf_counter, sleep, time
+
+import numpy as np
+import pytest
+
+from acconeer_utils.clients import ClientMetrics, MockClient, configs
+from acconeer_utils.clients.base import OUTPUT_DTYPES, ClientError, Prefetcher
+
+
+def test_get_next_batch():
+    config = configs.IQServiceConfig()
+    config.sweep_rate = 100
+
+    client = MockClient()
+    session_info = client.start_streaming(config)
+    info, data = client.get_next_batch(4)
+    client.disconnect()
+
+    assert data.shape == (4, session_info["data_length"])
+    assert data.dtype == np.complex128
+    assert info.shape == (4, )
+    assert list(info["sequence_number"]) == [1, 2, 3, 4]
+    assert not info["data_saturated"].any()
+    assert np.all(np.diff(info["timestamp"]) >= 0)
+
+
+def test_get_next_batch_prefetched_timestamps():
+    config = configs.EnvelopeServiceConfig()
+    config.sweep_rate = 50
+
+    client = MockClient()
+    client.start_streaming(config, prefetch=10, overflow="block")
+    sleep(0.2)
+    t0 = time()
+    info, _ = client.get_next_batch(5)
+    client.disconnect()
+
+    assert np.all(info["timestamp"] < t0)
+    assert np.all(np.diff(info["timestamp"]) > 0.01)
+
+
+def test_get_next_batch_not_squeezed():
+    config = configs.EnvelopeServiceConfig()
+    config.sensor = [1, 2]
+    config.sweep_rate = 100
+
+    client = MockClient()
+    client.start_streaming(config)
+    info, data = client.get_next_batch(3, timeout=0)
+    client.disconnect()
+
+    assert data.shape[:2] == (1, 2)
+    assert info.shape == (1, 2)
+
+
+@pytest.mark.parametrize("overflow", Prefetcher.OVERFLOW_POLICIES)
+def test_prefetch_overflow(overflow):
+    config = configs.EnvelopeServiceConfig()
+    config.sweep_rate = 100
+
+    client = MockClient()
+    client.start_streaming(config, prefetch=2, overflow=overflow)
+    sleep(0.1)
+
+    seq_nums = [client.get_next()[0]["sequence_number"] for _ in range(2)]
+
+    if overflow == "error":
+        with pytest.raises(ClientError):
+            client.get_next()
+    else:
+        seq_nums.append(client.get_next()[0]["sequence_number"])
+
+    client.disconnect()
+
+    if overflow == "block":
+        assert seq_nums == [1, 2, 3]
+        assert client.num_dropped_frames == 0
+    elif overflow == "drop_oldest":
+        assert seq_nums[0] > 1
+        assert client.num_dropped_frames >= seq_nums[0] - 1
+    else:
+        assert seq_nums == [1, 2]
+        assert client.num_dropped_frames == 1
+
+
+def test_shared_metrics():
+    config = configs.EnvelopeServiceConfig()
+    metrics = ClientMetrics()
+    client_a = MockClient(paced=False, metrics=metrics)
+    client_b = MockClient(paced=False, metrics=metrics)
+    client_a.start_streaming(config)
+    client_b.start_streaming(config)
+
+    # as a link client reports a frame before decoding it
+    client_a._count_received(100, perf_counter())
+    receive_time = metrics.last_receive_time
+    sleep(0.01)
+
+    info_b, _ = client_b.get_next()
+    info_a, _ = client_a.get_next()
+    client_a.disconnect()
+    client_b.disconnect()
+
+    assert info_a["receive_time"] == receive_time
+    assert info_b["receive_time"] > receive_time
+    assert metrics.snapshot()["frames_decoded"] == 2
+
+
+def test_frame_loss_tracking():
+    config = configs.EnvelopeServiceConfig()
+    config.sweep_rate = 100
+
+    losses = []
+    client = MockClient(paced=False, on_frames_lost=lambda n, info: losses.append(n))
+    client.start_streaming(config, prefetch=2)
+    first_info, _ = client.get_next()
+    sleep(0.1)
+    infos = [client.get_next()[0] for _ in range(2)]
+    batch_info, _ = client.get_next_batch(3)
+    client.disconnect()
+
+    assert first_info["frames_lost_since_last"] == 0
+    assert infos[0]["frames_lost_since_last"] == (
+        infos[0]["sequence_number"] - first_info["sequence_number"] - 1)
+    assert infos[1]["frames_lost_since_last"] == 0
+    assert losses[0] == infos[0]["frames_lost_since_last"]
+    assert sum(losses) == client.num_frames_lost
+    assert client.loss_stats["loss_events"] == len(losses)
+    assert list(batch_info["frames_lost_since_last"]) == list(
+        np.diff(batch_info["sequence_number"], prepend=infos[1]["sequence_number"]) - 1)
+
+
+@pytest.mark.parametrize("output_dtype", OUTPUT_DTYPES)
+def test_output_dtype(output_dtype):
+    config = configs.IQServiceConfig()
+    config.sweep_rate = 100
+
+    client = MockClient(output_dtype=output_dtype)
+    session_info = client.start_streaming(config)
+    _, data = client.get_next()
+    _, batch_data = client.get_next_batch(2)
+    client.disconnect()
+
+    assert batch_data.dtype == data.dtype
+
+    if output_dtype == "raw":
+        assert data.dtype == np.int16
+        assert data.shape == (session_info["data_length"], 2)
+        assert session_info["raw_scale"] == 2**-12
+        assert session_info["raw_offset"] == 0
+    else:
+        complex_dtype = np.complex64 if output_dtype == "float32" else np.complex128
+        assert data.dtype == complex_dtype
+        assert "raw_scale" not in session_info
+
+
+@pytest.mark.parametrize("frame_bank_size", [None, 8])
+def test_mock_client_unpaced_and_seeded(frame_bank_size):
+    config = configs.SparseServiceConfig()
+    config.sensor = [1, 2]
+    config.sweep_rate = 10
+
+    results = []
+    for _ in range(2):
+        client = MockClient(paced=False, seed=1, frame_bank_size=frame_bank_size)
+        client.start_streaming(config)
+        t0 = time()
+        info, data = client.get_next_batch(20)
+        dt = time() - t0
+        _, next_data = client.get_next()
+        client.disconnect()
+        results.append(data)
+
+        assert dt < 1
+        assert data.shape[:3] == (20, 2, config.number_of_subsweeps)
+        assert list(info["sequence_number"][:, 0]) == list(range(1, 21))
+
+    assert np.array_equal(results[0], results[1])
+
+    if frame_bank_size:
+        assert np.array_equal(data[0], data[frame_bank_size])
+        assert np.array_equal(next_data, data[20 % frame_bank_size])
+    else:
+        assert not np.array_equal(data[0], data[1])
@@ -0,0 +1,163 @@
+import sys
+
+import pytest
+
+import numpy as np
+
+from acconeer_utils.clients import MockClient, SocketClient, UARTClient, configs
+from acconeer_utils.clients.base import RAW_DTYPES
+from acconeer_utils.clients.emulator.json_server import JSONServer
+from acconeer_utils.clients.emulator.reg_server import RegServer
+from acconeer_utils.clients.reg import protocol, utils
+
+
+CONFIG_CLASSES = [
+    configs.PowerBinServiceConfig,
+    configs.EnvelopeServiceConfig,
+    configs.IQServiceConfig,
+    configs.SparseServiceConfig,
+]
+
+
+def stream(client, config, num_frames):
+    session_info = client.start_streaming(config)
+    frames = [client.get_next() for _ in range(num_frames)]
+    client.disconnect()
+    return session_info, frames
+
+
+@pytest.mark.parametrize("config_class", CONFIG_CLASSES)
+def test_json_server(config_class):
+    config = config_class()
+    config.sensor = [1, 2]
+
+    with JSONServer(paced=False, seed=0) as server:
+        host, port = server.listen()
+        client = SocketClient(host, socket_port=port, squeeze=False)
+        session_info, frames = stream(client, config, 10)
+
+    assert server.num_frames_sent >= 10
+    assert [info[1]["sequence_number"] for info, _ in frames] == list(range(1, 11))
+    assert all(data.shape == frames[0][1].shape for _, data in frames)
+    assert frames[0][1].shape[0] == 2
+
+
+@pytest.mark.parametrize("transport", ["tcp", "pty"])
+@pytest.mark.parametrize("config_class", CONFIG_CLASSES)
+def test_reg_server(config_class, transport):
+    if transport == "pty" and sys.platform == "win32":
+        pytest.skip("pty is not supported on this platform")
+
+    config = config_class()
+
+    with RegServer(paced=False, num_depths=100, seed=0) as server:
+        if transport == "tcp":
+            host, port = server.listen()
+            client = UARTClient(host, socket_port=port)
+        else:
+            client = UARTClient(server.open_pty())
+
+        session_info, frames = stream(client, config, 10)
+
+    assert [info["sequence_number"] for info, _ in frames] == list(range(1, 11))
+    assert all(data.shape == frames[0][1].shape for _, data in frames)
+    assert frames[0][1].size % 100 == 0
+
+
+@pytest.mark.parametrize("config_class", CONFIG_CLASSES)
+def test_raw_dtypes_agree(config_class):
+    config = config_class()
+
+    with JSONServer(paced=False, seed=0) as json_server, \
+            RegServer(paced=False, seed=0) as reg_server:
+        json_host, json_port = json_server.listen()
+        reg_host, reg_port = reg_server.listen()
+        clients = [
+            MockClient(paced=False, output_dtype="raw"),
+            SocketClient(json_host, socket_port=json_port, output_dtype="raw"),
+            UARTClient(reg_host, socket_port=reg_port, output_dtype="raw"),
+        ]
+        dtypes = [stream(client, config, 1)[1][0][1].dtype for client in clients]
+
+    assert dtypes == [np.dtype(RAW_DTYPES[config.mode])] * 3
+
+
+def test_reg_reconfigure_after_reconnect():
+    config = configs.EnvelopeServiceConfig()
+
+    with RegServer(paced=False) as server:
+        host, port = server.listen()
+        client = UARTClient(host, socket_port=port)
+        client.setup_session(config)
+        client.disconnect()
+
+        # every connection is served a fresh module, without the session set up
+        config.gain = 0.8
+        client.connect()
+        session_info = client.reconfigure(config)
+        client.start_streaming()
+        client.get_next()
+        client.disconnect()
+
+    assert session_info["data_length"] > 0
+
+
+def test_reg_server_corruption_recovery():
+    config = configs.EnvelopeServiceConfig()
+
+    with RegServer(frame_rate=2000, corruption=0.1, seed=0) as server:
+        host, port = server.listen()
+        client = UARTClient(host, socket_port=port)
+        client.start_streaming(config)
+
+        sequence_numbers = [client.get_next()[0]["sequence_number"] for _ in range(200)]
+        num_corrupted = server.num_frames_corrupted
+
+        # let the corrupted frames in flight drain before stopping
+        server.corruption = 0
+        for _ in range(20):
+            client.get_next()
+
+        client.disconnect()
+
+    assert num_corrupted > 0
+    assert sequence_numbers == sorted(sequence_numbers)
+    assert len(sequence_numbers) + num_corrupted >= sequence_numbers[-1]
+
+
+def test_metrics():
+    config = configs.EnvelopeServiceConfig()
+
+    with RegServer(frame_rate=2000, corruption=0.1, seed=0) as server:
+        host, port = server.listen()
+        client = UARTClient(host, socket_port=port, metrics=True)
+        session_info = client.start_streaming(config)
+        infos = [client.get_next()[0] for _ in range(100)]
+        client.get_next_batch(10)
+
+        server.corruption = 0
+        for _ in range(20):
+            client.get_next()
+
+        client.disconnect()
+
+    # start and end markers, length field, packet type, and the result info
+    # and buffer parts with their type and length fields
+    result_info_size = len(utils.get_sweep_info_regs("envelope")) * (1 + protocol.REG_SIZE)
+    packet_size = 1 + (3 + result_info_size) + (3 + 2 * session_info["data_length"])
+    frame_size = 1 + protocol.LEN_FIELD_SIZE + packet_size + 1
+
+    snapshot = client.metrics.snapshot()
+    assert snapshot["frames_decoded"] == 130
+    assert snapshot["frames_received"] == 130
+    assert snapshot["bytes_received"] == 130 * frame_size
+    assert snapshot["recoveries"] > 0
+    assert snapshot["missed_frames"] == client.num_frames_lost
+    assert snapshot["duplicate_frames"] == 0
+    assert snapshot["link_wait_seconds"]["count"] == 130
+    assert snapshot["decode_seconds"]["buckets"][-1][1] == 130
+    assert all(a["receive_time"] <= b["receive_time"] for a, b in zip(infos, infos[1:]))
+
+    text = client.metrics.to_prometheus(labels={"unit": "a"})
+    assert 'acconeer_client_frames_decoded_total{unit="a"} 130\n' in text
+    assert 'acconeer_client_decode_seconds_bucket{unit="a",le="+Inf"} 130\n' in text
@@ -0,0 +1,160 @@
+import os
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+try:
+    import pty
+    import tty
+except ImportError:
+    pty = None
+
+from acconeer_utils.clients import links
+
+
+def test_recv_buffer_consume_and_find():
+    buf = links.RecvBuffer(8)
+
+    view = buf.reserve(4)
+    view[:4] = b"ab\nc"
+    buf.commit(4)
+
+    assert buf.find(b"\n") == 2
+    assert bytes(buf.consume(3)) == b"ab\n"
+    assert len(buf) == 1
+    assert buf.find(b"\n") == -1
+
+
+def test_recv_buffer_compacts_and_grows():
+    buf = links.RecvBuffer(8)
+
+    buf.reserve(8)[:8] = b"01234567"
+    buf.commit(8)
+    assert bytes(buf.consume(6)) == b"012345"
+
+    # fits after moving the leftover to the front
+    buf.reserve(6)[:6] = b"abcdef"
+    buf.commit(6)
+    assert bytes(buf.consume(8)) == b"67abcdef"
+
+    buf.reserve(4)[:4] = b"wxyz"
+    buf.commit(4)
+    buf.reserve(20)[:20] = bytes(range(20))
+    buf.commit(20)
+    assert bytes(buf.consume(4)) == b"wxyz"
+    assert bytes(buf.consume(20)) == bytes(range(20))
+    assert len(buf) == 0
+
+
+def test_socket_link_recv():
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_sock.bind(("127.0.0.1", 0))
+    server_sock.listen(1)
+
+    class Link(links.SocketLink):
+        _PORT = server_sock.getsockname()[1]
+
+    payload = np.arange(2**16, dtype=">u2").tobytes()
+    frames = [b"header\n" + payload] * 5
+
+    def serve():
+        conn, _ = server_sock.accept()
+        for frame in frames:
+            conn.sendall(frame)
+        conn.close()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+
+    link = Link("127.0.0.1")
+    link.connect()
+
+    for _ in frames:
+        assert bytes(link.recv_until(b"\n")) == b"header\n"
+        data = np.frombuffer(link.recv(len(payload)), dtype=">u2")
+        assert np.array_equal(data, np.arange(2**16))
+
+    thread.join()
+    server_sock.close()
+
+
+def test_byte_ring_wraps_around():
+    ring = links.ByteRing(8)
+    buf = links.RecvBuffer(16)
+
+    assert ring.write(b"012345") == 6
+    assert ring.read_into(buf) == 6
+    assert ring.write(b"abcdefghij") == 8
+    assert len(ring) == 8
+    assert ring.wait(0)
+    assert ring.read_into(buf) == 8
+    assert not ring.wait(0)
+
+    assert bytes(buf.consume(14)) == b"012345abcdefgh"
+
+
+@pytest.mark.skipif(pty is None, reason="requires pty")
+@pytest.mark.parametrize("transport", links.SerialProcessLink.TRANSPORTS)
+def test_serial_process_link_recv(transport):
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+
+    link = links.SerialProcessLink(os.ttyname(slave), transport=transport)
+    link.connect()
+
+    payload = bytes(range(256)) * 64
+    for _ in range(5):
+        os.write(master, b"header\n" + payload)
+        assert bytes(link.recv_until(b"\n")) == b"header\n"
+        assert bytes(link.recv(len(payload))) == payload
+
+    link.disconnect()
+    os.close(master)
+    os.close(slave)
+
+
+def fill_frame_pool(pool, payloads):
+    for payload in payloads:
+        frame = pool.reserve(timeout=0)
+        if frame is None:
+            return False
+        frame[:len(payload)] = payload
+        pool.commit(len(payload))
+    return True
+
+
+def test_frame_pool_drop_oldest():
+    pool = links.FramePool(3, 4, overflow="drop_oldest")
+
+    assert fill_frame_pool(pool, [b"a", b"bb", b"ccc", b"dddd", b"e"])
+    assert pool.num_overwritten == 2
+
+    for expected in [b"ccc", b"dddd", b"e"]:
+        with pool.get(timeout=0) as frame:
+            assert bytes(frame) == expected
+
+    with pytest.raises(links.LinkError):
+        with pool.get(timeout=0):
+            pass
+
+
+def test_frame_pool_block():
+    pool = links.FramePool(2, 4, overflow="block")
+
+    assert fill_frame_pool(pool, [b"a", b"b"])
+    assert not fill_frame_pool(pool, [b"c"])
+
+    with pool.get(timeout=0) as frame:
+        assert bytes(frame) == b"a"
+
+    assert fill_frame_pool(pool, [b"c"])
+    assert pool.num_overwritten == 0
+
+    pool.reset()
+    pool.close()
+    with pytest.raises(links.LinkError):
+        with pool.get():
+            pass
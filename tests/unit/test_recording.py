@@ -0,0 +1,405 @@
+import json
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+from acconeer_utils.clients import MockClient, configs
+from acconeer_utils.clients.base import decode_raw
+from acconeer_utils.clients.reg.protocol import decode_output_buffer
+from acconeer_utils.recording import (
+    Recorder,
+    RecordingReader,
+    SegmentedReader,
+    SegmentedRecorder,
+    convert_recording,
+    info_timestamps,
+    read_manifest,
+)
+
+
+CONFIG_CLASSES = [
+    configs.PowerBinServiceConfig,
+    configs.EnvelopeServiceConfig,
+    configs.IQServiceConfig,
+    configs.SparseServiceConfig,
+]
+
+
+def stream(config, num_frames, output_dtype="float64"):
+    client = MockClient(paced=False, squeeze=False, seed=0, output_dtype=output_dtype)
+    session_info = client.start_streaming(config)
+    frames = [client.get_next() for _ in range(num_frames)]
+    client.disconnect()
+    return session_info, frames
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_recorder(tmp_path, compression):
+    config = configs.IQServiceConfig()
+    config.sensor = [1, 3]
+    config.sweep_rate = 100
+    session_info, frames = stream(config, 25)
+
+    filename = str(tmp_path / "recording.h5")
+    with Recorder(filename, config, session_info, compression=compression,
+                  chunk_frames=10) as recorder:
+        recorder.write_metadata("profile", 2, int)
+        for info, data in frames:
+            recorder.append(info, data)
+
+        assert recorder.num_frames == 20
+
+    with h5py.File(filename, "r") as f:
+        sweeps = f["real"][()] + 1j * f["imag"][()]
+        assert f["real"].chunks[0] == 10
+        assert f["real"].compression == compression
+        assert np.allclose(sweeps, [data for _, data in frames], atol=1e-6)
+
+        seq_nums = f["sequence_number"][()]
+        assert seq_nums.shape == (25, 2)
+        assert list(seq_nums[:, 1]) == [info[1]["sequence_number"] for info, _ in frames]
+        assert not f["data_saturated"][()].any()
+
+        assert f["service_type"][()].decode() == "IQ"
+        assert list(f["sensor"][()]) == [1, 3]
+        assert f["sweep_rate"][()] == 100
+        assert f["profile"][()] == 2
+        assert json.loads(f["session_info"][()]) == session_info
+
+
+def test_recorder_real_mode(tmp_path):
+    config = configs.EnvelopeServiceConfig()
+    session_info, frames = stream(config, 5)
+
+    filename = str(tmp_path / "recording.h5")
+    with Recorder(filename, config, session_info) as recorder:
+        for info, data in frames:
+            recorder.append(info, data)
+
+    with h5py.File(filename, "r") as f:
+        assert np.allclose(f["real"][()], [data for _, data in frames])
+        assert not f["imag"][()].any()
+        assert f["imag"].id.get_storage_size() == 0
+
+
+def test_reader(tmp_path):
+    config = configs.SparseServiceConfig()
+    config.sensor = [2, 4]
+    config.number_of_subsweeps = 8
+    session_info, frames = stream(config, 23)
+    expected = np.array([data for _, data in frames])
+
+    filename = str(tmp_path / "recording.h5")
+    with Recorder(filename, config, session_info, chunk_frames=5) as recorder:
+        for info, data in frames:
+            recorder.append(info, data)
+
+    with RecordingReader(filename) as reader:
+        assert len(reader) == 23
+        assert reader.mode == "sparse"
+        assert reader.session_info == session_info
+        assert np.allclose(reader[3], expected[3])
+        assert np.allclose(reader[-1], expected[-1])
+        assert np.allclose(reader[4:17], expected[4:17])
+        assert np.allclose(list(reader), expected)
+        assert [len(frames) for _, frames in reader.iter_chunks()] == [5, 5, 5, 5, 3]
+
+        assert reader.sequence_number.shape == (23, 2)
+        assert list(reader.sequence_number[:, 0]) == [
+            info[0]["sequence_number"] for info, _ in frames]
+
+        restored = reader.sensor_config
+        assert restored.sensor == [2, 4]
+        assert restored.number_of_subsweeps == 8
+        assert np.allclose(restored.range_interval, config.range_interval)
+
+        data = reader.frame_dicts(sensor_config=restored)
+        data[0]["session_info"] = session_info
+        assert data[0]["session_info"] == session_info
+        assert len(list(data)) == 23
+        assert data[22]["info"][1] == {
+            "sequence_number": frames[22][0][1]["sequence_number"],
+            "data_saturated": False,
+        }
+
+
+@pytest.mark.parametrize("config_class", CONFIG_CLASSES)
+def test_compact_recording(tmp_path, config_class):
+    config = config_class()
+    config.sensor = [1, 2]
+    session_info, frames = stream(config, 12, output_dtype="raw")
+
+    filename = str(tmp_path / "recording.h5")
+    with Recorder(filename, config, session_info, chunk_frames=5, raw=True) as recorder:
+        for info, data in frames:
+            recorder.append(info, data)
+
+    with RecordingReader(filename) as reader:
+        assert reader.is_raw
+        assert reader.mode == config.mode
+        assert reader.file["raw"].dtype == frames[0][1].dtype
+
+        for i in [0, 7]:
+            expected = [
+                decode_output_buffer(sensor_data.tobytes(), config.mode, 8)
+                for sensor_data in frames[i][1]]
+            assert np.array_equal(reader[i].reshape(2, -1), np.reshape(expected, (2, -1)))
+
+        assert np.array_equal(reader[:], [reader[i] for i in range(12)])
+
+    with RecordingReader(filename, output_dtype="raw") as reader:
+        assert np.array_equal(reader[:], [data for _, data in frames])
+
+
+@pytest.mark.parametrize("ext", [".h5", ".npy"])
+def test_convert_recording(tmp_path, ext):
+    config = configs.IQServiceConfig()
+    config.sensor = [1, 2]
+    session_info, frames = stream(config, 30, output_dtype="raw")
+    expected = decode_raw([data for _, data in frames], "iq", "float32")
+
+    src = str(tmp_path / ("recording" + ext))
+    dst = str(tmp_path / "compact.h5")
+    if ext == ".h5":
+        with Recorder(src, config, session_info) as recorder:
+            recorder.write_metadata("profile", 3, int)
+            recorder.extend(
+                expected,
+                [[info[0]["sequence_number"]] * 2 for info, _ in frames],
+            )
+    else:
+        np.save(src, [
+            {
+                "sweep_data": data,
+                "sensor_config": config,
+                "service_type": "IQ",
+                "info": info,
+            } for data, (info, _) in zip(expected, frames)])
+
+    assert convert_recording(src, dst) == 30
+
+    with RecordingReader(dst, output_dtype="raw") as reader:
+        assert np.array_equal(reader[:], [data for _, data in frames])
+        assert reader.sensor_config.sensor == [1, 2]
+        assert list(reader.sequence_number[:, 1]) == [
+            info[0]["sequence_number"] for info, _ in frames]
+        if ext == ".h5":
+            assert reader.read_metadata("profile") == 3
+            assert reader.session_info == session_info
+
+
+@pytest.mark.parametrize("sweep_rate", [None, 20])
+def test_convert_recording_without_timestamps(tmp_path, sweep_rate):
+    config = configs.EnvelopeServiceConfig()
+    _, frames = stream(config, 5)
+    config._sweep_rate = sweep_rate  # as in configs saved by old versions
+
+    src = str(tmp_path / "recording.npy")
+    dst = str(tmp_path / "compact.h5")
+    np.save(src, [
+        {"sweep_data": data, "sensor_config": config, "info": info} for info, data in frames])
+
+    assert convert_recording(src, dst) == 5
+
+    with RecordingReader(dst) as reader:
+        assert len(reader.index) == 1
+        if sweep_rate is None:
+            assert reader.timestamp is None
+            assert reader.start_time is None
+            assert reader.duration is None
+            assert reader.seek(sequence_number=frames[3][0][0]["sequence_number"]) == 3
+            with pytest.raises(ValueError):
+                reader.seek(time=0)
+        else:
+            assert reader.synthetic_timestamps
+            assert np.allclose(reader.timestamp, [0, 0.05, 0.1, 0.15, 0.2])
+            assert np.isclose(reader.duration, 0.2)
+
+
+def test_segmented_recording(tmp_path):
+    config = configs.EnvelopeServiceConfig()
+    session_info, frames = stream(config, 50)
+    expected = np.array([data for _, data in frames])
+
+    directory = str(tmp_path / "segments")
+    recorder = SegmentedRecorder(
+        directory,
+        config,
+        session_info,
+        max_segment_duration=2.0,
+        metadata={"profile": 2},
+        chunk_frames=4,
+    )
+    with recorder:
+        for i, (info, data) in enumerate(frames):
+            recorder.append(info, data, timestamp=0.25 * i)
+
+    segments = read_manifest(directory)
+    assert [s["num_frames"] for s in segments] == [8] * 6 + [2]
+    assert segments[1]["first_frame"] == 8
+    assert segments[1]["first_sequence_number"] == frames[8][0][0]["sequence_number"]
+    assert segments[1]["end_time"] == 3.75
+
+    with RecordingReader(os.path.join(directory, segments[2]["filename"])) as reader:
+        assert np.allclose(reader[:], expected[16:24])
+        assert reader.read_metadata("profile") == 2
+        segment_info = json.loads(reader.read_metadata("segment_info"))
+        assert segment_info["first_frame"] == segments[2]["first_frame"] == 16
+
+    with SegmentedReader(directory) as reader:
+        assert len(reader) == 50
+        assert np.allclose(reader[5:35], expected[5:35])
+        assert np.allclose(reader[-1], expected[-1])
+        assert np.allclose(list(reader), expected)
+        assert list(reader.sequence_number[:, 0]) == [
+            info[0]["sequence_number"] for info, _ in frames]
+
+    # continuing the recording, keeping about two segments
+    num_bytes = segments[0]["num_bytes"]
+    with SegmentedRecorder(directory, config, max_segment_duration=2.0,
+                           max_total_bytes=2.5 * num_bytes, chunk_frames=4) as recorder:
+        for i, (info, data) in enumerate(frames[:24]):
+            recorder.append(info, data, timestamp=20 + 0.25 * i)
+
+    segments = read_manifest(directory)
+    assert [s["index"] for s in segments] == [8, 9]
+    assert segments[0]["first_frame"] == 58
+    assert sorted(os.listdir(directory)) == [
+        "manifest.json", "segment_000008.h5", "segment_000009.h5"]
+
+
+def test_segmented_recording_resumes_after_interruption(tmp_path):
+    config = configs.EnvelopeServiceConfig()
+    _, frames = stream(config, 30)
+    expected = np.array([data for _, data in frames])
+
+    directory = str(tmp_path / "segments")
+    recorder = SegmentedRecorder(directory, config, max_segment_duration=2.0, chunk_frames=4)
+    for i, (info, data) in enumerate(frames[:12]):
+        recorder.append(info, data, timestamp=0.25 * i)
+
+    # interrupted with segment 1 open, of which 4 frames were flushed
+    recorder.recorder.file.close()
+    with open(os.path.join(directory, "segment_000002.h5"), "wb") as f:
+        f.write(b"cut short")
+
+    num_bytes = read_manifest(directory)[0]["num_bytes"]
+    with SegmentedRecorder(directory, config, max_segment_duration=2.0,
+                           max_total_bytes=10 * num_bytes, chunk_frames=4) as recorder:
+        for i, (info, data) in enumerate(frames[12:], start=12):
+            recorder.append(info, data, timestamp=0.25 * i)
+
+    segments = read_manifest(directory)
+    assert [s["index"] for s in segments] == [0, 1, 3, 4, 5]
+    assert [s["num_frames"] for s in segments] == [8, 4, 8, 8, 2]
+    assert "segment_000002.h5" in os.listdir(directory)
+
+    with SegmentedReader(directory) as reader:
+        assert np.allclose(reader[:12], expected[:12])
+        assert np.allclose(reader[12:], expected[12:])
+
+    # retention deletes the unreadable segment in turn
+    with SegmentedRecorder(directory, config, max_total_bytes=2 * num_bytes) as recorder:
+        pass
+
+    assert "segment_000002.h5" not in os.listdir(directory)
+    assert [s["index"] for s in read_manifest(directory)] == [4, 5]
+
+
+def test_seek_and_window(tmp_path):
+    config = configs.EnvelopeServiceConfig()
+    session_info, frames = stream(config, 100)
+    expected = np.array([data for _, data in frames])
+    times = 1000 + 0.5 * np.arange(100)
+
+    filename = str(tmp_path / "recording.h5")
+    with Recorder(filename, config, session_info, chunk_frames=8) as recorder:
+        for (info, data), t in zip(frames, times):
+            recorder.append(info, data, timestamp=t)
+
+    with RecordingReader(filename) as reader:
+        assert len(reader.index) == 13
+        assert list(reader.index["first_frame"][:3]) == [0, 8, 16]
+        assert reader.start_time == 1000
+        assert reader.end_time == times[-1]
+
+        assert reader.seek(time=0) == 0
+        assert reader.seek(time=1020) == 40
+        assert reader.seek(time=1020.2) == 41
+        assert reader.seek(time=2000) == 100
+        assert reader.seek(sequence_number=frames[57][0][0]["sequence_number"]) == 57
+        assert np.allclose(reader.window(1010, 1012), expected[20:24])
+
+        data = reader.frame_dicts(start=30, stop=45)
+        assert len(data) == 15
+        assert np.allclose([d["sweep_data"] for d in data], expected[30:45])
+        assert [a for a, _ in reader.iter_chunks(start=30, stop=45)] == [30, 32, 40]
+
+    directory = str(tmp_path / "segments")
+    with SegmentedRecorder(directory, config, max_segment_duration=10) as recorder:
+        for (info, data), t in zip(frames, times):
+            recorder.append(info, data, timestamp=t)
+
+    with SegmentedReader(directory) as reader:
+        assert reader.seek(time=1020.2) == 41
+        assert np.allclose(reader.window(1018, 1022), expected[36:44])
+
+
+def test_synthetic_timestamps(tmp_path):
+    config = configs.EnvelopeServiceConfig()
+    config.sweep_rate = 10
+    session_info, frames = stream(config, 5)
+
+    filename = str(tmp_path / "recording.h5")
+    with Recorder(filename, config, session_info) as recorder:
+        for info, data in frames:
+            recorder.append(info, data)
+
+    with RecordingReader(filename) as reader:
+        assert reader.synthetic_timestamps
+        infos = [d["info"] for d in reader.frame_dicts()]
+        assert "receive_time" not in infos[0][0]
+
+    timestamps, synthetic = info_timestamps(infos, config.sweep_rate)
+    assert synthetic
+    assert np.allclose(timestamps, [0, 0.1, 0.2, 0.3, 0.4])
+    assert info_timestamps(infos) == (None, True)
+
+    for i, info in enumerate(infos):
+        info[0]["receive_time"] = 1000.0 + i
+
+    filename = str(tmp_path / "received.h5")
+    with Recorder(filename, config, session_info) as recorder:
+        for info, (_, data) in zip(infos, frames):
+            recorder.append(info, data)
+
+    with RecordingReader(filename) as reader:
+        assert not reader.synthetic_timestamps
+        assert list(reader.timestamp) == [1000, 1001, 1002, 1003, 1004]
+        infos = [d["info"] for d in reader.frame_dicts()]
+        assert info_timestamps(infos)[1] is False
+        assert infos[2][0]["receive_time"] == 1002
+
+
+def test_segmented_receive_time_and_missing_sequence_numbers(tmp_path):
+    config = configs.EnvelopeServiceConfig()
+    _, frames = stream(config, 20)
+
+    directory = str(tmp_path / "segments")
+    with SegmentedRecorder(directory, config, max_segment_duration=5) as recorder:
+        for i, (info, data) in enumerate(frames[:10]):
+            recorder.append({"receive_time": 1000.0 + i}, data)
+        for i, (info, data) in enumerate(frames[10:], start=10):
+            info[0]["receive_time"] = 1000.0 + i
+            recorder.append(info, data)
+
+    segments = read_manifest(directory)
+    assert [s["start_time"] for s in segments] == [1000, 1005, 1010, 1015]
+    assert segments[0]["last_sequence_number"] is None
+
+    with SegmentedReader(directory) as reader:
+        assert not reader.reader(0).synthetic_timestamps
+        assert reader.seek(time=1012) == 12
+        assert reader.seek(sequence_number=frames[17][0][0]["sequence_number"]) == 17
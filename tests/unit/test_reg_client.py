@@ -0,0 +1,241 @@
+import numpy as np
+import pytest
+
+from acconeer_utils import SDK_VERSION
+from acconeer_utils.clients import RecordingClient, ReplayClient, UARTClient, configs
+from acconeer_utils.clients.base import ClientError
+from acconeer_utils.clients.links import LinkError
+from acconeer_utils.clients.reg import client as reg_client
+from acconeer_utils.clients.reg import protocol
+
+
+class FakeRegLink:
+    """Answers register protocol frames like a module would
+
+    Frames sent at another baudrate than the module's are dropped. On
+    activation, num_stream_packets envelope stream packets are queued.
+    """
+
+    DEFAULT_TIMEOUT = 2
+
+    def __init__(self, module_baudrate=3000000, num_stream_packets=0):
+        self.baudrate = module_baudrate
+        self.module_baudrate = module_baudrate
+        self.timeout = self._timeout = self.DEFAULT_TIMEOUT
+        self.regs = {}
+        self.writes = []
+        self.reads = []
+        self.num_sends = 0
+        self.num_dropped_sends = 0
+        self.num_stream_packets = num_stream_packets
+        self._out = bytearray()
+
+        product_id_addr = protocol.get_addr_for_reg("product_id")
+        self.regs[product_id_addr] = protocol.encode_reg_val("product_id", 0xACC0)
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def send(self, data):
+        self.num_sends += 1
+        if self.baudrate != self.module_baudrate:
+            self.num_dropped_sends += 1
+            return
+
+        data = bytearray(data)
+        while data:
+            frame_len = 1 + protocol.LEN_FIELD_SIZE + int.from_bytes(data[1:3], "little") + 2
+            packet = protocol.extract_packet_from_frame(data[:frame_len])
+            del data[:frame_len]
+            self._handle(packet)
+
+    def recv(self, num_bytes):
+        if len(self._out) < num_bytes:
+            raise LinkError("recv timeout")
+
+        data = bytes(self._out[:num_bytes])
+        del self._out[:num_bytes]
+        return data
+
+    def recv_until(self, bs):
+        i = self._out.find(bs)
+        if i < 0:
+            raise LinkError("recv timeout")
+
+        return self.recv(i + len(bs))
+
+    def _handle(self, packet):
+        addr = packet[1]
+        if packet[0] == protocol.REG_WRITE_REQUEST:
+            enc_val = bytes(packet[2:])
+            self.regs[addr] = enc_val
+            self.writes.append((addr, enc_val))
+            res = protocol.UnpackedRegWriteResponse(protocol.UnpackedRegVal(addr, enc_val))
+
+            if addr == protocol.get_addr_for_reg("uart_baudrate"):
+                self.module_baudrate = protocol.decode_reg_val("uart_baudrate", enc_val)
+        elif packet[0] == protocol.REG_READ_REQUEST:
+            enc_val = self.regs.get(addr, bytes(protocol.REG_SIZE))
+            self.reads.append(addr)
+            res = protocol.UnpackedRegReadResponse(protocol.UnpackedRegVal(addr, enc_val))
+        elif packet[0] == protocol.BUF_READ_REQUEST:
+            version = "v{}".format(SDK_VERSION).encode("ascii")
+            res = bytearray([protocol.BUF_READ_RESPONSE, addr]) + version
+            self._out.extend(protocol.insert_packet_into_frame(res))
+            return
+        else:
+            raise NotImplementedError
+
+        self._out.extend(protocol.insert_packet_into_frame(protocol.pack_packet(res)))
+
+        activate = protocol.UnpackedRegVal(
+            protocol.get_addr_for_reg("main_control"),
+            protocol.encode_reg_val("main_control", "activate"),
+        )
+        if packet[0] == protocol.REG_WRITE_REQUEST and res.reg_val == activate:
+            for i in range(self.num_stream_packets):
+                self._out.extend(protocol.insert_packet_into_frame(self._stream_packet(i)))
+
+    def _stream_packet(self, sequence_number):
+        result_info = bytearray(protocol.get_addr_for_reg("sequence_number", "envelope").to_bytes(
+            protocol.ADDR_SIZE, protocol.BO))
+        result_info.extend(protocol.encode_reg_val("sequence_number", sequence_number))
+        buffer = np.arange(sequence_number, sequence_number + 100, dtype="<u2").tobytes()
+
+        packet = bytearray([protocol.STREAM_PACKET])
+        for part_type, part in [(protocol.STREAM_RESULT_INFO, result_info),
+                                (protocol.STREAM_BUFFER, buffer)]:
+            packet.append(part_type)
+            packet.extend(len(part).to_bytes(protocol.LEN_FIELD_SIZE, protocol.BO))
+            packet.extend(part)
+
+        return packet
+
+
+@pytest.mark.parametrize("mode", ["envelope", "iq", "sparse"])
+def test_pipelined_session_setup(mode):
+    config = {
+        "envelope": configs.EnvelopeServiceConfig,
+        "iq": configs.IQServiceConfig,
+        "sparse": configs.SparseServiceConfig,
+    }[mode]()
+
+    results = []
+    for pipeline in [False, True]:
+        client = UARTClient("127.0.0.1", pipeline_reg_writes=pipeline)
+        client._link = link = FakeRegLink()
+        client._connected = True
+
+        info = client.setup_session(config)
+        results.append((info, link.writes, link.num_sends))
+
+        assert list(client.session_setup_timings) == ["stop", "writes", "create", "info_reads"]
+
+    (info, writes, num_sends), (pl_info, pl_writes, pl_num_sends) = results
+
+    assert pl_info == info
+    assert pl_writes == writes
+    assert pl_num_sends < num_sends
+
+
+def test_reconfigure_writes_changed_regs():
+    config = configs.EnvelopeServiceConfig()
+    config.range_interval = [0.2, 0.5]
+    config.gain = 0.5
+
+    client = UARTClient("127.0.0.1")
+    client._link = link = FakeRegLink()
+    client._connected = True
+
+    info = client.setup_session(config)
+
+    def reg_addr(name):
+        return protocol.get_addr_for_reg(name, "envelope")
+
+    def accesses():
+        writes = [addr for addr, _ in link.writes]
+        reads = list(link.reads)
+        link.writes.clear()
+        link.reads.clear()
+        return writes, reads
+
+    main_control = reg_addr("main_control")
+    accesses()
+
+    assert client.reconfigure(config) == info
+    assert accesses() == ([], [])
+
+    config.gain = 0.6
+    assert client.reconfigure(config) == info
+    writes, reads = accesses()
+    assert writes == [main_control, reg_addr("gain"), main_control]
+    assert reg_addr("actual_range_start") not in reads
+
+    config.range_interval = [0.3, 0.6]
+    client.reconfigure(config)
+    writes, reads = accesses()
+    assert writes == [main_control, reg_addr("range_start"), main_control]
+    assert reg_addr("actual_range_start") in reads
+
+    client.reconfigure(configs.IQServiceConfig())
+    writes, _ = accesses()
+    assert reg_addr("mode_selection") in writes
+
+
+def test_connection_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(reg_client, "sleep", lambda t: None)
+    cache_path = str(tmp_path / "connection_profiles.json")
+
+    def connect(link):
+        client = UARTClient("127.0.0.1", connection_cache=cache_path)
+        client._link = link
+        link.num_dropped_sends = 0
+        info = client.connect()
+        assert link.module_baudrate == link.baudrate == 3000000
+        assert info["connect_time"] >= 0
+        return info["connection_cache_hit"], link.num_dropped_sends
+
+    link = FakeRegLink(module_baudrate=115200)
+    assert connect(link) == (False, 0)
+    assert connect(link) == (True, 0)
+
+    link.module_baudrate = 115200  # module reset since the profile was cached
+    hit, num_dropped_sends = connect(link)
+    assert not hit
+    assert num_dropped_sends > 0
+    assert connect(link) == (True, 0)
+
+
+def test_record_and_replay(tmp_path, monkeypatch):
+    monkeypatch.setattr(reg_client, "sleep", lambda t: None)
+    path = str(tmp_path / "capture.bin")
+    config = configs.EnvelopeServiceConfig()
+    config.range_interval = [0.3, 0.6]
+
+    uart_client = UARTClient("127.0.0.1")
+    uart_client._link = FakeRegLink(num_stream_packets=3)
+    client = RecordingClient(uart_client, path)
+    session_info = client.start_streaming(config)
+    frames = [client.get_next() for _ in range(3)]
+    client.disconnect()
+
+    for output_dtype in ["float64", "raw"]:
+        replay_client = ReplayClient(path, output_dtype=output_dtype)
+        replay_session_info = replay_client.setup_session()
+        assert {k: replay_session_info[k] for k in session_info} == session_info
+        assert vars(replay_client.recorded_configs[0]) == vars(config)
+
+        replay_client.start_streaming()
+        for info, data in frames:
+            replay_info, replay_data = replay_client.get_next()
+            assert replay_info == info
+            assert np.array_equal(replay_data, data)
+            assert replay_data.dtype == ("uint16" if output_dtype == "raw" else data.dtype)
+
+        with pytest.raises(ClientError):
+            replay_client.get_next()
+
+        replay_client.disconnect()
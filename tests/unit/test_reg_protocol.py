@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 import acconeer_utils.clients.reg.protocol as ptcl
@@ -79,9 +80,7 @@ def test_unpack_reg_read_res_segment():
 def test_unpack_stream_data_segment():
     rv_addr = ptcl.get_addr_for_reg(test_mode_reg)
     rv_enc_val = ptcl.encode_reg_val(test_mode_reg, 123)
-    rvs = [ptcl.UnpackedRegVal(rv_addr, rv_enc_val)]
     buffer = bytearray(b'\x12\x34\x56')
-    unp_stream_data = ptcl.UnpackedStreamData(rvs, buffer)
 
     pkd_stream_data_segment = bytearray()
     pkd_stream_data_segment.append(ptcl.STREAM_BUFFER)
@@ -93,7 +92,31 @@ def test_unpack_stream_data_segment():
     pkd_stream_data_segment.extend(rv_enc_val)
 
     unpacked = ptcl.unpack_stream_data_segment(pkd_stream_data_segment)
-    assert unpacked == unp_stream_data
+    assert unpacked.buffer == buffer
+    assert unpacked.result_info.dtype == ptcl.RESULT_INFO_DTYPE
+    rv_x = int.from_bytes(rv_enc_val, "little")
+    assert unpacked.result_info.tolist() == [(rv_addr, rv_x)]
+
+    info, unknown = ptcl.decode_result_info(unpacked.result_info, test_mode)
+    assert info == {test_mode_reg.name: 123}
+    assert unknown == []
+
+    _, unknown = ptcl.decode_result_info(unpacked.result_info, ptcl.NO_MODE)
+    assert unknown == [(rv_addr, rv_x)]
+
+
+def test_reg_val_decoders():
+    for reg in ptcl.REGS:
+        decode = ptcl.get_reg_val_decoder(reg)
+        if isinstance(reg.val_map, dict):
+            for val, x in reg.val_map.items():
+                assert decode(x) == val
+        elif reg.type == "i":
+            enc_val = (-5).to_bytes(4, "little", signed=True)
+            assert decode(2**32 - 5) == ptcl.decode_reg_val(reg, enc_val)
+
+    with pytest.raises(ptcl.ProtocolError):
+        ptcl.decode_reg_val("mode_selection", b"\xff\x00\x00\x00")
 
 
 def test_pack_packet():
@@ -109,3 +132,25 @@ def test_extract_packet_from_frame():
 def test_insert_packet_into_frame():
     frame = ptcl.insert_packet_into_frame(unp_reg_write_req)
     assert frame == pkd_reg_write_req_frame
+
+
+def test_decode_output_buffer_dtypes():
+    raw = np.array([[4096, -8192], [0, 2048]], dtype="<i2")
+    buffer = raw.tobytes()
+
+    data = ptcl.decode_output_buffer(buffer, "iq")
+    assert data.dtype == np.complex128
+    assert np.allclose(data, [1 - 2j, 0.5j])
+
+    data = ptcl.decode_output_buffer(buffer, "iq", output_dtype="float32")
+    assert data.dtype == np.complex64
+    assert np.allclose(data, [1 - 2j, 0.5j])
+
+    data = ptcl.decode_output_buffer(buffer, "iq", output_dtype="raw")
+    assert data.dtype == np.int16
+    assert np.array_equal(data, raw)
+
+    buffer = np.array([2**15 + 1, 2**15 - 1], dtype="<u2").tobytes()
+    data = ptcl.decode_output_buffer(buffer, "sparse", 1, output_dtype="float32")
+    assert data.dtype == np.float32
+    assert np.array_equal(data, [[1, -1]])
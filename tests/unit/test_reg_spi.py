@@ -0,0 +1,262 @@
+from time import perf_counter
+
+import pytest
+
+from acconeer_utils import libft4222
+from acconeer_utils.clients import links
+from acconeer_utils.clients.reg import client as reg_client
+from acconeer_utils.clients.reg import protocol
+
+
+class FakeSPIDevice:
+    """Answers the SPI register protocol like a module would
+
+    The response to a header is clocked out either in the rest of the same
+    transfer or in the next one. A buffer read lasts until the end of the
+    transfer it is clocked out in.
+
+    With a sweep period, a frame becomes ready one period after the
+    previous one (or after activation), which also queues a rising edge on
+    the interrupt input. Otherwise data is always ready.
+    """
+
+    BUFFER_LENGTH = 200
+
+    def __init__(self, mode="envelope", sweep_period=None):
+        self.mode = mode
+        self.sweep_period = sweep_period
+        self.num_transfers = 0
+        self.num_status_reads = 0
+        self.sequence_number = 0
+        self._pending = None
+        self._ready_t = 0
+        self._triggered = False
+
+    def gpio_get_trigger_status(self, port):
+        assert port == libft4222.GPIOPort.PORT3
+        return int(self._data_ready() and not self._triggered)
+
+    def gpio_read_trigger_queue(self, port, max_num_events):
+        num_events = self.gpio_get_trigger_status(port)
+        self._triggered = True
+        return [libft4222.GPIOTrigger.RISING] * min(num_events, max_num_events)
+
+    def _data_ready(self):
+        return perf_counter() >= self._ready_t
+
+    def spi_master_single_write(self, data, is_end_transaction=True):
+        self._transfer(data)
+
+    def spi_master_single_read_into(self, buf, is_end_transaction=True):
+        buf[:] = self._transfer(bytes(len(buf)))
+
+    def spi_master_single_read_write_into(self, write_data, buf, is_end_transaction=True):
+        buf[:] = self._transfer(write_data)
+
+    def _transfer(self, tx):
+        self.num_transfers += 1
+        rx = bytearray(len(tx))
+        i = 0
+        while i < len(tx):
+            if self._pending is None:
+                self._pending = (tx[i], tx[i+1])
+                i += 4
+                continue
+
+            request, addr = self._pending
+            self._pending = None
+            if request == protocol.REG_WRITE_REQUEST:
+                self._write_reg(addr, bytes(tx[i:i+protocol.REG_SIZE]))
+                i += protocol.REG_SIZE
+            elif request == protocol.REG_READ_REQUEST:
+                rx[i:i+protocol.REG_SIZE] = self._read_reg(addr)
+                i += protocol.REG_SIZE
+            elif request == protocol.BUF_READ_REQUEST:
+                buffer = bytes(x % 256 for x in range(self.BUFFER_LENGTH))
+                rx[i:] = buffer[:len(tx) - i]
+                i = len(tx)
+
+        return rx
+
+    def _read_reg(self, addr):
+        name = protocol.get_reg(addr, self.mode).name
+        if name == "status":
+            self.num_status_reads += 1
+
+        val = {
+            "status": protocol.STATUS_DATA_READY_MASK if self._data_ready() else 0,
+            "output_data_buffer_length": self.BUFFER_LENGTH,
+            "sequence_number": self.sequence_number,
+        }.get(name, 0)
+        return protocol.encode_reg_val(name, val, self.mode)
+
+    def _write_reg(self, addr, enc_val):
+        name = protocol.get_reg(addr, self.mode).name
+        if name != "main_control":
+            return
+
+        main_control = protocol.decode_reg_val(name, enc_val, self.mode)
+        if main_control == "activate" and self.sweep_period is not None:
+            self._ready_t = perf_counter() + self.sweep_period
+        elif main_control == "clear_status" and self._data_ready():
+            self.sequence_number += 1
+            self._triggered = False
+            if self.sweep_period is not None:
+                self._ready_t += self.sweep_period
+
+
+@pytest.mark.parametrize("fixed_buf_size", [True, False])
+def test_batched_frame_reads(monkeypatch, fixed_buf_size):
+    monkeypatch.setattr(reg_client, "SPI_MAIN_CTRL_SLEEP", 0)
+
+    results = []
+    for batch_transactions in [False, True]:
+        frame_pool = links.FramePool(2, reg_client.SPI_MAX_FRAME_SIZE)
+        proc = reg_client.SPICommProcess(None, None, frame_pool, batch_transactions)
+        proc.dev = dev = FakeSPIDevice()
+        proc.set_mode_and_rate("envelope", None)
+        proc.start_streaming()
+        if not fixed_buf_size:
+            proc.fixed_buf_size = None
+
+        dev.num_transfers = 0
+        frames = []
+        for _ in range(3):
+            proc.get_next()
+            with frame_pool.get() as frame:
+                frames.append(bytes(frame))
+
+        results.append((frames, dev.num_transfers))
+
+    (frames, num_transfers), (batched_frames, batched_num_transfers) = results
+
+    assert batched_frames == frames
+    assert batched_num_transfers == (2 if fixed_buf_size else 3) * len(frames)
+    assert num_transfers >= 10 * len(frames)
+
+
+@pytest.mark.parametrize("data_ready_wait", reg_client.SPI_DATA_READY_WAITS)
+def test_data_ready_wait(monkeypatch, data_ready_wait):
+    monkeypatch.setattr(reg_client, "SPI_MAIN_CTRL_SLEEP", 0)
+    sweep_rate = 200
+    num_frames = 10
+
+    frame_pool = links.FramePool(2, reg_client.SPI_MAX_FRAME_SIZE)
+    proc = reg_client.SPICommProcess(None, None, frame_pool, False, data_ready_wait)
+    proc.dev = proc.gpio_dev = dev = FakeSPIDevice(sweep_period=1/sweep_rate)
+    proc.set_mode_and_rate("envelope", sweep_rate)
+    proc.start_streaming()
+
+    sequence_numbers = []
+    for _ in range(num_frames):
+        proc.get_next()
+        with frame_pool.get() as frame:
+            sequence_numbers.append(int.from_bytes(frame[4:8], protocol.BO))
+
+    assert sequence_numbers == list(range(num_frames))
+
+    if data_ready_wait == "busy":
+        assert dev.num_status_reads > 10 * num_frames
+    elif data_ready_wait == "backoff":
+        assert dev.num_status_reads < 10 * num_frames
+    else:
+        assert dev.num_status_reads <= 2 * num_frames
+
+
+@pytest.mark.parametrize("data_ready_wait", reg_client.SPI_DATA_READY_WAITS)
+def test_connect_initializes_gpio_for_interrupt(monkeypatch, data_ready_wait):
+    devices = []
+
+    class RecordingDevice:
+        def __init__(self):
+            self.calls = []
+            devices.append(self)
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: self.calls.append((name, ) + args)
+
+    monkeypatch.setattr(reg_client.libft4222, "Device", RecordingDevice)
+
+    frame_pool = links.FramePool(2, reg_client.SPI_MAX_FRAME_SIZE)
+    proc = reg_client.SPICommProcess(None, None, frame_pool, False, data_ready_wait)
+    proc.connect()
+    proc.disconnect()
+
+    spi_calls = [name for name, *_ in devices[0].calls]
+    assert "gpio_init" not in spi_calls
+    assert ("set_wake_up_interrupt", False) in devices[0].calls
+
+    if data_ready_wait != "interrupt":
+        assert len(devices) == 1
+        return
+
+    gpio_dev, = devices[1:]
+    assert gpio_dev.calls == [
+        ("open_ex", b"FT4222 B"),
+        ("gpio_init", [libft4222.GPIODir.INPUT] * 4),
+        ("set_wake_up_interrupt", True),
+        ("set_interrupt_trigger", libft4222.GPIOTrigger.RISING),
+        ("close", ),
+    ]
+
+
+def test_spi_transaction_splits_between_accesses():
+    dev = FakeSPIDevice()
+    sizes = []
+    transfer = dev.spi_master_single_read_write_into
+
+    def read_write_into(tx, rx):
+        sizes.append(len(tx))
+        transfer(tx, rx)
+
+    dev.spi_master_single_read_write_into = read_write_into
+
+    t = libft4222.SPITransaction(max_transfer_size=20)
+    read_reg = [protocol.REG_READ_REQUEST, protocol.get_addr_for_reg("status"), 0, 0]
+    idxs = [t.add(read_reg, protocol.REG_SIZE) for _ in range(3)]
+    results = t.execute(dev)
+
+    assert sizes == [16, 8]
+    assert len(t) == 0
+    for idx in idxs:
+        assert bytes(results[idx]) == protocol.encode_reg_val("status", 1)
+
+    with pytest.raises(ValueError):
+        t.add(bytes(16), 8)
+
+
+def test_device_reads_into_caller_buffers(monkeypatch):
+    written = []
+
+    def single_read(handle, read_buffer, num_bytes, size_transferred, is_end_transaction):
+        read_buffer[:num_bytes] = [i % 256 for i in range(num_bytes)]
+        size_transferred._obj.value = num_bytes
+        return libft4222.Status.OK.value
+
+    def single_write(handle, write_buffer, num_bytes, size_transferred, is_end_transaction):
+        written.append(bytes(write_buffer[:num_bytes]))
+        size_transferred._obj.value = num_bytes
+        return libft4222.Status.OK.value
+
+    monkeypatch.setattr(libft4222, "funs", {
+        "FT4222_SPIMaster_SingleRead": single_read,
+        "FT4222_SPIMaster_SingleWrite": single_write,
+    })
+    dev = libft4222.Device()
+
+    # small reads go through a scratch buffer, large ones straight into the frame
+    large = libft4222.SMALL_TRANSFER_SIZE + 1
+    frame_pool = links.FramePool(2, 16 + large)
+    frame = frame_pool.reserve()
+    dev.spi_master_single_read_into(frame[8:16])
+    dev.spi_master_single_read_into(frame[16:])
+    frame_pool.commit(16 + large)
+    with frame_pool.get() as frame:
+        assert bytes(frame[8:16]) == bytes(range(8))
+        assert bytes(frame[16:]) == bytes(i % 256 for i in range(large))
+
+    assert dev.spi_master_single_read(3) == bytearray([0, 1, 2])
+
+    for data in [b"\x01\x02", bytearray([3]), [4, 5, 6]]:
+        dev.spi_master_single_write(data)
+    assert written == [b"\x01\x02", b"\x03", b"\x04\x05\x06"]